@@ -1,14 +1,171 @@
 import sys
+from array import array
+from bisect import bisect_right
 
-class Token:
-    def __init__(self, type_, value, line=0, col=0):
-        self.type = type_
-        self.value = value
+# token 种类号 -> 名字（与 parser.py / tokens.py 一致，名字只用于诊断）
+TOKEN_NAMES = ['$', 'WS', 'COMMENT', 'INT', 'FLOAT', 'VOID', 'RETURN', 'IF', 'ELSE', 'WHILE', 'EQ', 'NEQ', 'LE', 'GE', 'ASSIGN', 'LT', 'GT', 'PLUS', 'MINUS', 'STAR', 'DIV', 'LPAREN', 'RPAREN', 'LBRACE', 'RBRACE', 'SEMI', 'COMMA', 'FLOAT_LITERAL', 'INT_LITERAL', 'IDENTIFIER']
+TOKEN_TABLE_HASH = '299a51811ee621c5'
+
+def _check_token_names():
+    """
+    与同目录的 tokens.py 核对种类号表的摘要：lexer.py、parser.py、tokens.py 须出自同一次生成（见 generator_main），
+    否则 parser 会把 token 认错。旁边没有 tokens.py（单独生成，或从源码字符串加载）时不检查。
+    """
+    import os
+    here = globals().get("__file__")
+    path = os.path.join(os.path.dirname(os.path.abspath(here)), "tokens.py") if here else None
+    if path is None or not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("TOKEN_TABLE_HASH = "):
+                if line[len("TOKEN_TABLE_HASH = "):].strip() != repr(TOKEN_TABLE_HASH):
+                    raise ValueError(f"{path} has a different token numbering; "
+                                     f"regenerate lexer.py, parser.py and tokens.py together")
+                return
+
+_check_token_names()
+
+KIND_OF = {name: kind for kind, name in enumerate(TOKEN_NAMES)}
+EOF = 0
+SKIP_KINDS = frozenset([1, 2])    # 不输出的 token：WS, COMMENT
+
+# 关键字折叠：标识符规则匹配到的串再查表，命中则改判为关键字（关键字规则不进 DFA）
+# CASELESS_KEYWORDS 是大小写不敏感的关键字，按 token 值的小写查（只转换 ASCII 字母，见 ASCII_LOWER）
+KEYWORDS = {
+    29: {  # IDENTIFIER
+        'else': 8,
+        'float': 4,
+        'if': 7,
+        'int': 3,
+        'return': 6,
+        'void': 5,
+        'while': 9,
+    },
+}
+BYTE_KEYWORDS = {ident: {word.encode('ascii'): kind for word, kind in table.items()}
+                 for ident, table in KEYWORDS.items()}
+CASELESS_KEYWORDS = {
+}
+BYTE_CASELESS_KEYWORDS = {ident: {word.encode('ascii'): kind for word, kind in table.items()}
+                          for ident, table in CASELESS_KEYWORDS.items()}
+ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+class LineIndex:
+    """
+    换行符位置索引：首次查询时用 find 循环一次性建好，之后按偏移二分查找 (行, 列)。
+    line / col 是 text 开头的行列号（流式扫描时缓冲区不从输入开头算起）。
+    bytes / mmap 输入的偏移是字节数，列号仍按字符计：保留原文，查询时把所在行开头到 offset 的字节按 UTF-8 解码计数。
+    """
+    def __init__(self, text, line=1, col=1):
+        self.text = text
         self.line = line
         self.col = col
+        self.newlines = None
+
+    def build(self):
+        text = self.text
+        nl = '\n' if isinstance(text, str) else b'\n'
+        newlines = array('I' if len(text) < 1 << 32 else 'Q')
+        i = text.find(nl)
+        while i >= 0:
+            newlines.append(i)
+            i = text.find(nl, i + 1)
+        self.newlines = newlines
+        if isinstance(text, str):
+            self.text = None    # 建好索引后不再持有原文
+        return newlines
+
+    def line_col(self, offset):
+        newlines = self.newlines if self.newlines is not None else self.build()
+        k = bisect_right(newlines, offset - 1)
+        start = newlines[k - 1] + 1 if k else 0
+        width = offset - start
+        if self.text is not None and width:
+            width = len(self.text[start:offset].decode('utf-8', 'replace'))
+        if k:
+            return self.line + k, width + 1
+        return self.line, self.col + width
+
+class Token:
+    # 只记录 token 结束位置 offset 和所在缓冲区的换行索引 lines，行列号在访问时才二分查找
+    def __init__(self, kind, value, offset=0, lines=None):
+        self.kind = kind
+        self.value = value
+        self.offset = offset
+        self.lines = lines
+    @property
+    def type(self):
+        return TOKEN_NAMES[self.kind]
+    @property
+    def line(self):
+        return self.lines.line_col(self.offset)[0] if self.lines is not None else 0
+    @property
+    def col(self):
+        return self.lines.line_col(self.offset)[1] if self.lines is not None else 0
     def __repr__(self):
         return f"Token({self.type}, {self.value!r})"
 
+class TokenSpans:
+    """
+    tokenize_spans 的结果：kinds（token 种类号）、starts、ends（token 在原文中的 [start, end)）三个平行数组。
+    Token 对象、token 值和行列号都只在访问时才生成。
+    """
+    def __init__(self, text, kinds, starts, ends):
+        self.text = text
+        self.kinds = kinds
+        self.starts = starts
+        self.ends = ends
+        self.lines = LineIndex(text)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def type(self, i):
+        return TOKEN_NAMES[self.kinds[i]]
+
+    def value(self, i):
+        value = self.text[self.starts[i] : self.ends[i]]
+        return value if isinstance(value, str) else value.decode('utf-8')
+
+    def line_col(self, offset):
+        return self.lines.line_col(offset)
+
+    def __getitem__(self, i):
+        # 与 tokenize 一致，Token 的行列号取 token 结束处
+        return Token(self.kinds[i], self.value(i), self.ends[i], self.lines)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self.kinds)))
+
+import re
+
+# 自环加速：状态 -> 该状态自环字符的连续段，匹配时走过一步自环后用一次 re 匹配整段吃掉
+RUN_PATTERNS = {
+    1: '[\\t-\\n\\r\\ ]*',
+    10: '[0-9]*',
+    15: '[0-9A-Z_a-z]*',
+    19: '[\\x00-\\t\\v-\\f\\x0e-\\U0010ffff]*',
+    24: '[0-9]*',
+}
+BYTE_RUN_PATTERNS = {
+    1: '[\\t-\\n\\r\\ ]*',
+    10: '[0-9]*',
+    15: '[0-9A-Z_a-z]*',
+    19: '[\\x00-\\t\\v-\\f\\x0e-\\x7f]*',
+    31: '[0-9]*',
+}
+RUNS = {state: re.compile(p).match for state, p in RUN_PATTERNS.items()}
+BYTE_RUNS = {state: re.compile(p.encode('ascii')).match for state, p in BYTE_RUN_PATTERNS.items()}
+
+# 线性时间最长匹配：在这些状态上记录 / 检查失败的 (状态, 位置)，键为 位置 * NSTATES + 状态
+MEMO_STATES = frozenset([20])
+NSTATES = 25
+
+# 线性时间最长匹配：在这些状态上记录 / 检查失败的 (状态, 位置)，键为 位置 * BYTE_NSTATES + 状态
+BYTE_MEMO_STATES = frozenset([20, 24, 25, 26, 27, 28, 29, 30])
+BYTE_NSTATES = 32
+
 class Lexer:
     def __init__(self, text):
         self.text = text
@@ -16,2223 +173,941 @@ class Lexer:
         self.line = 1
         self.col = 1
 
+    # 最长匹配在 token 结束后最多再读入的字符（字节）数（None 为没有上界），relex 据此找到不受编辑影响的 token 边界
+    MAX_LOOKAHEAD = 1
+    BYTE_MAX_LOOKAHEAD = 3
+
     def tokenize(self):
+        return self._scan(True) if isinstance(self.text, str) else self._scan_bytes(True)
+
+    def _scan(self, final):
+        """扫描 self.text 中已确定的 token；final 为假时在可能受后续输入影响的 token 前停下。"""
         tokens = []
-        while self.pos < len(self.text):
+        n = len(self.text)
+        index = self.index = LineIndex(self.text, self.line, self.col)
+        skip_kinds = SKIP_KINDS
+        failed, memo = set(), MEMO_STATES
+        keywords_29 = KEYWORDS[29].get
+        while self.pos < n:
             state = 0
             last_accept = None
             last_len = 0
             current_len = 0
             i = self.pos
+            trail = []
 
             while i < len(self.text):
                 char = self.text[i]
-                if char not in TRANS[state]:
+                row = TRANS[state]
+                if char not in row and (char < '\u0100' or not wide_step(state, char)):
                     break
-                state = TRANS[state][char]
+                next_state = row[char]
                 current_len += 1
                 i += 1
+                if next_state == state:
+                    i = RUNS[state](self.text, i).end()
+                    current_len = i - self.pos
+                state = next_state
                 if state in ACCEPT:
                     last_accept = ACCEPT[state]
                     last_len = current_len
+                elif state in memo:
+                    key = i * NSTATES + state
+                    if key in failed:
+                        break
+                    trail.append(key)
+            if trail:
+                failed.update(key for key in trail if key >= (self.pos + last_len + 1) * NSTATES)
+            scan_end = i
 
+            if not final and scan_end >= n:
+                break
+            if last_accept in skip_kinds:
+                self.pos += last_len
+                continue
             if last_accept is None:
-                raise SyntaxError(f"Unexpected character at line {self.line}, col {self.col}: {self.text[self.pos]!r}")
+                line, col = index.line_col(self.pos)
+                raise SyntaxError(f"Unexpected character at line {line}, col {col}: {self.text[self.pos]!r}")
 
             value = self.text[self.pos : self.pos + last_len]
-            lines_count = value.count('\n')
-            if lines_count > 0:
-                self.line += lines_count
-                self.col = len(value) - value.rfind('\n')
-            else:
-                self.col += len(value)
+            if last_accept == 29:
+                last_accept = keywords_29(value, 29)
             self.pos += last_len
+            tokens.append(Token(last_accept, value, self.pos, index))
+
+        return tokens
 
-            if last_accept not in ['WS', 'SKIP', 'COMMENT', 'WHITESPACE']:
-                tokens.append(Token(last_accept, value, self.line, self.col))
+    def _scan_bytes(self, final):
+        """扫描 self.text 中已确定的 token；final 为假时在可能受后续输入影响的 token 前停下。"""
+        tokens = []
+        n = len(self.text)
+        index = self.index = LineIndex(self.text, self.line, self.col)
+        skip_kinds = SKIP_KINDS
+        text = self.text
+        trans, accept = BYTE_TRANS, BYTE_ACCEPT
+        failed, memo = set(), BYTE_MEMO_STATES
+        keywords_29 = BYTE_KEYWORDS[29].get
+        while self.pos < n:
+            state = 0
+            last_accept = None
+            last_len = 0
+            i = self.pos
+            trail = []
+
+            while i < n:
+                byte = text[i]
+                row = trans[state]
+                if byte not in row:
+                    break
+                next_state = row[byte]
+                i += 1
+                if next_state == state:
+                    i = BYTE_RUNS[state](text, i).end()
+                state = next_state
+                if state in accept:
+                    last_accept = accept[state]
+                    last_len = i - self.pos
+                elif state in memo:
+                    key = i * BYTE_NSTATES + state
+                    if key in failed:
+                        break
+                    trail.append(key)
+            if trail:
+                failed.update(key for key in trail if key >= (self.pos + last_len + 1) * BYTE_NSTATES)
+            scan_end = i
+
+            if not final and scan_end >= n:
+                break
+            if last_accept in skip_kinds:
+                self.pos += last_len
+                continue
+            if last_accept is None:
+                if not final and self.pos + 4 > n:
+                    break       # 出错的字符可能还没读全（UTF-8 最长 4 字节），等下一块再报告
+                line, col = index.line_col(self.pos)
+                raise SyntaxError(f"Unexpected character at line {line}, col {col}: {self.text[self.pos : self.pos + 4].decode('utf-8', 'replace')[0]!r}")
+
+            value = self.text[self.pos : self.pos + last_len]
+            if last_accept == 29:
+                last_accept = keywords_29(value, 29)
+            self.pos += last_len
+            tokens.append(Token(last_accept, value.decode('utf-8'), self.pos, index))
 
         return tokens
 
+    def tokenize_spans(self):
+        """与 tokenize 相同的扫描，但结果是 TokenSpans（平行数组），不为每个 token 创建对象。"""
+        return self._spans() if isinstance(self.text, str) else self._spans_bytes()
+
+    def _spans(self, stop=None, out=None, resync=None):
+        text = self.text
+        n = len(text)
+        stop = n if stop is None else stop
+        final = True
+        offset_code = 'I' if n < 1 << 32 else 'Q'
+        kinds, starts, ends = out if out is not None else (array('H'), array(offset_code), array(offset_code))
+        skip_kinds = SKIP_KINDS
+        failed, memo = set(), MEMO_STATES
+        keywords_29 = KEYWORDS[29].get
+        while stop is not None:
+            while self.pos < stop:
+                state = 0
+                last_accept = None
+                last_len = 0
+                current_len = 0
+                i = self.pos
+                trail = []
+
+                while i < len(self.text):
+                    char = self.text[i]
+                    row = TRANS[state]
+                    if char not in row and (char < '\u0100' or not wide_step(state, char)):
+                        break
+                    next_state = row[char]
+                    current_len += 1
+                    i += 1
+                    if next_state == state:
+                        i = RUNS[state](self.text, i).end()
+                        current_len = i - self.pos
+                    state = next_state
+                    if state in ACCEPT:
+                        last_accept = ACCEPT[state]
+                        last_len = current_len
+                    elif state in memo:
+                        key = i * NSTATES + state
+                        if key in failed:
+                            break
+                        trail.append(key)
+                if trail:
+                    failed.update(key for key in trail if key >= (self.pos + last_len + 1) * NSTATES)
+                scan_end = i
+
+                if last_accept in skip_kinds:
+                    self.pos += last_len
+                    continue
+                if last_accept is None:
+                    line, col = LineIndex(text, self.line, self.col).line_col(self.pos)
+                    raise SyntaxError(f"Unexpected character at line {line}, col {col}: {text[self.pos]!r}")
+
+                if last_accept == 29:
+                    last_accept = keywords_29(text[self.pos : self.pos + last_len], 29)
+                kinds.append(last_accept)
+                starts.append(self.pos)
+                ends.append(self.pos + last_len)
+                self.pos += last_len
+            stop = resync(self.pos) if resync is not None else None
+
+        return TokenSpans(text, kinds, starts, ends)
+
+    def _spans_bytes(self, stop=None, out=None, resync=None):
+        text = self.text
+        n = len(text)
+        stop = n if stop is None else stop
+        final = True
+        offset_code = 'I' if n < 1 << 32 else 'Q'
+        kinds, starts, ends = out if out is not None else (array('H'), array(offset_code), array(offset_code))
+        skip_kinds = SKIP_KINDS
+        text = self.text
+        trans, accept = BYTE_TRANS, BYTE_ACCEPT
+        failed, memo = set(), BYTE_MEMO_STATES
+        keywords_29 = BYTE_KEYWORDS[29].get
+        while stop is not None:
+            while self.pos < stop:
+                state = 0
+                last_accept = None
+                last_len = 0
+                i = self.pos
+                trail = []
+
+                while i < n:
+                    byte = text[i]
+                    row = trans[state]
+                    if byte not in row:
+                        break
+                    next_state = row[byte]
+                    i += 1
+                    if next_state == state:
+                        i = BYTE_RUNS[state](text, i).end()
+                    state = next_state
+                    if state in accept:
+                        last_accept = accept[state]
+                        last_len = i - self.pos
+                    elif state in memo:
+                        key = i * BYTE_NSTATES + state
+                        if key in failed:
+                            break
+                        trail.append(key)
+                if trail:
+                    failed.update(key for key in trail if key >= (self.pos + last_len + 1) * BYTE_NSTATES)
+                scan_end = i
+
+                if last_accept in skip_kinds:
+                    self.pos += last_len
+                    continue
+                if last_accept is None:
+                    line, col = LineIndex(text, self.line, self.col).line_col(self.pos)
+                    raise SyntaxError(f"Unexpected character at line {line}, col {col}: {text[self.pos : self.pos + 4].decode('utf-8', 'replace')[0]!r}")
+
+                if last_accept == 29:
+                    last_accept = keywords_29(text[self.pos : self.pos + last_len], 29)
+                kinds.append(last_accept)
+                starts.append(self.pos)
+                ends.append(self.pos + last_len)
+                self.pos += last_len
+            stop = resync(self.pos) if resync is not None else None
+
+        return TokenSpans(text, kinds, starts, ends)
+
+    @classmethod
+    def stream(cls, source, chunk_size=1 << 16):
+        """
+        流式词法分析：source 为文件对象（按 chunk_size 读取）或产生 str / bytes 块的可迭代对象，
+        token 一旦确定即产出。块之间只保留未消费的尾部（未完成的 token），内存占用与输入总长无关。
+        """
+        if hasattr(source, 'read'):
+            read = source.read
+            source = iter(lambda: read(chunk_size) or None, None)
+        lexer = None
+        pending, size = [], 0    # 上次扫描之后读入、还没有拼进缓冲区的块
+        for chunk in source:
+            if lexer is None:
+                lexer = cls(chunk)
+                scan = lexer._scan if isinstance(chunk, str) else lexer._scan_bytes
+            else:
+                pending.append(chunk)
+                size += len(chunk)
+                # 未消费的尾部是一个未完成的 token，新输入不比它长时先攒着：每次重扫前缓冲区至少翻倍
+                if size < len(lexer.text) - lexer.pos:
+                    continue
+                lexer._refill(pending)
+                pending, size = [], 0
+            yield from scan(False)
+        if lexer is not None:
+            if pending:
+                lexer._refill(pending)
+            yield from scan(True)
+
+    def _refill(self, chunks):
+        """stream 用：丢掉已消费的部分，把 chunks 接在未消费的尾部之后作为新缓冲区。"""
+        # 新缓冲区从 self.pos 开始，它的开头行列号由上一块的换行索引算出
+        self.line, self.col = self.index.line_col(self.pos)
+        self.text = self.text[self.pos:] + self.text[:0].join(chunks)
+        self.pos = 0
+
+    @classmethod
+    def from_path(cls, path):
+        """mmap 整个文件并按 UTF-8 字节扫描，省去读入和解码整个文件。"""
+        import mmap
+        with open(path, 'rb') as f:
+            try:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            except ValueError:      # 空文件不能 mmap
+                return cls(b'')
+
+    @classmethod
+    def _lex_chunk(cls, path, start, stop):
+        """parallel_spans 的 worker：从 start 起投机扫描到第一个不小于 stop 的 token 边界，返回 (kinds, starts, ends, 停下的位置)。"""
+        lexer = cls.from_path(path)
+        lexer.pos = start
+        offset_code = 'I' if len(lexer.text) < 1 << 32 else 'Q'
+        out = (array('H'), array(offset_code), array(offset_code))
+        try:
+            lexer._spans_bytes(stop, out)
+        except SyntaxError:
+            pass    # 块首可能落在 token 中间；停下处之后由 parallel_spans 串行重扫，真正的错误在那里报告
+        return (*out, lexer.pos)
+
+    @classmethod
+    def parallel_spans(cls, path, workers=None, min_chunk=1 << 20):
+        """
+        多进程扫描单个大文件，结果与 from_path(path).tokenize_spans() 相同。
+        文件在换行处切成至多 workers 块（每块至少 min_chunk 字节），各块在 worker 进程中从块首按 token 起点投机扫描；
+        本进程按顺序拼接：已确定的扫描位置 pos 恰是该块某个 token 的起点时，之后两边的扫描完全相同，直接接上该块其余的 token；
+        否则（块首落在跨行的注释、字符串中间，或 pos 处是跳过的 token）从 pos 串行重扫到该块下一个 token 起点再比较。
+        worker 进程按模块名找到 Lexer，生成的 lexer 须是可 import 的模块。
+        """
+        import os
+        from bisect import bisect_left
+        from concurrent.futures import ProcessPoolExecutor
+        lexer = cls.from_path(path)
+        text = lexer.text
+        n = len(text)
+        count = max(1, min(workers or os.cpu_count() or 1, n // max(min_chunk, 1)))
+        bounds = [0]
+        for k in range(1, count):
+            cut = text.find(b'\n', k * n // count) + 1
+            if bounds[-1] < cut < n:
+                bounds.append(cut)
+        if len(bounds) == 1:
+            return lexer.tokenize_spans()
+        bounds.append(n)
+        offset_code = 'I' if n < 1 << 32 else 'Q'
+        out = kinds, starts, ends = array('H'), array(offset_code), array(offset_code)
+        with ProcessPoolExecutor(len(bounds) - 1) as pool:
+            chunks = pool.map(cls._lex_chunk, [path] * (len(bounds) - 1), bounds[:-1], bounds[1:])
+            for stop, (chunk_kinds, chunk_starts, chunk_ends, chunk_end) in zip(bounds[1:], chunks):
+                while lexer.pos < stop:
+                    k = bisect_left(chunk_starts, lexer.pos)
+                    if k == len(chunk_starts):
+                        lexer._spans_bytes(stop, out)
+                    elif chunk_starts[k] == lexer.pos:
+                        kinds.extend(chunk_kinds[k:])
+                        starts.extend(chunk_starts[k:])
+                        ends.extend(chunk_ends[k:])
+                        lexer.pos = chunk_end
+                        lexer._spans_bytes(stop, out)     # worker 因出错提前停下时从出错处接着扫
+                    else:
+                        lexer._spans_bytes(chunk_starts[k], out)
+        return TokenSpans(text, kinds, starts, ends)
+
+    @classmethod
+    def relex(cls, spans, offset, deleted, inserted):
+        """
+        增量重扫：spans 是编辑前的文本 spans.text 的 tokenize_spans 结果，编辑把 [offset, offset + deleted) 换成 inserted。
+        结束位置早于 offset - MAX_LOOKAHEAD（bytes 输入为 BYTE_MAX_LOOKAHEAD）的旧 token 不会读到被编辑的字符，
+        原样保留，从最后一个这样的 token 结束处重扫（前瞻为 None 时从头重扫）；越过编辑处后一旦停在某个旧 token 平移后的起点，之后的原文相同，扫描也相同，
+        其余旧 token 平移后直接接上。
+        返回 (新的 TokenSpans, (first, old_stop, new_stop))：旧 token [first, old_stop) 被新 token [first, new_stop) 取代。
+        """
+        from bisect import bisect_left
+        text = spans.text
+        if not 0 <= offset <= offset + deleted <= len(text):
+            raise ValueError(f"edit [{offset}, {offset + deleted}) is outside the text (length {len(text)})")
+        new_text = text[:offset] + inserted + text[offset + deleted:]
+        delta = len(inserted) - deleted
+        old_kinds, old_starts, old_ends = spans.kinds, spans.starts, spans.ends
+        lookahead = cls.MAX_LOOKAHEAD if isinstance(text, str) else cls.BYTE_MAX_LOOKAHEAD
+        first = bisect_left(old_ends, offset - lookahead) if lookahead is not None else 0
+        lexer = cls(new_text)
+        lexer.pos = old_ends[first - 1] if first else 0
+        scan = lexer._spans if isinstance(new_text, str) else lexer._spans_bytes
+        offset_code = 'I' if len(new_text) < 1 << 32 else 'Q'
+        kinds, starts, ends = out = array('H'), array(offset_code), array(offset_code)
+        stop = bisect_left(old_starts, offset + deleted)
+
+        def resync(pos):
+            # 下一个要追赶的旧 token 平移后的起点；正好停在上面（或旧 token 已用完且扫到了末尾）时返回 None
+            nonlocal stop
+            stop = bisect_left(old_starts, pos - delta, stop)
+            if stop == len(old_starts):
+                return len(new_text) if pos < len(new_text) else None
+            target = old_starts[stop] + delta
+            return target if target != pos else None
+
+        # 整个追赶过程是一次扫描（见 _spans 的 resync），不按旧 token 逐个重新进入扫描方法
+        target = resync(lexer.pos)
+        if target is not None:
+            scan(target, out, resync)
+
+        def splice(old, new, shift):
+            tail = old[stop:] if not shift else map(shift.__add__, old[stop:])
+            return array(new.typecode, old[:first]) + new + array(new.typecode, tail)
+        result = TokenSpans(new_text, splice(old_kinds, kinds, 0), splice(old_starts, starts, delta),
+                            splice(old_ends, ends, delta))
+        return result, (first, stop, first + len(kinds))
+# 字节值 -> 类 ID（bytes / mmap 输入用，按 UTF-8 字节驱动字节自动机）
+BYTE_OTHER = 31
+BYTE_CLASS = [0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 2, 0, 0, 2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 3, 0, 0, 0, 0, 0, 0, 4, 5, 6, 7, 8, 9, 10, 11, 12, 12, 12, 12, 12, 12, 12, 12, 12, 12, 0, 13, 14, 15, 16, 0, 0, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 0, 0, 0, 0, 17, 0, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 17, 18, 0, 19, 0, 0, 20, 20, 20, 20, 20, 20, 20, 20, 20, 20, 20, 20, 20, 20, 20, 20, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 21, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 22, 31, 31, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 23, 24, 25, 25, 25, 25, 25, 25, 25, 25, 25, 25, 25, 25, 26, 27, 27, 28, 29, 29, 29, 30, 31, 31, 31, 31, 31, 31, 31, 31, 31, 31, 31]
+
 TRANS = {
     0: {
-        'G': 4,
-        'S': 4,
-        'e': 8,
-        'F': 4,
-        'T': 4,
-        '=': 25,
-        ';': 26,
-        '}': 27,
-        'I': 4,
-        'd': 4,
-        ',': 28,
-        '<': 29,
-        'x': 4,
-        'r': 3,
-        'Y': 4,
-        '9': 30,
-        'J': 4,
-        '2': 30,
-        'b': 4,
-        '-': 31,
-        ' ': 32,
-        '\t': 32,
-        '/': 33,
-        '\n': 32,
-        '1': 30,
-        'g': 4,
-        'z': 4,
-        'i': 18,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 30,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 30,
-        'k': 4,
-        'O': 4,
-        'w': 6,
-        'p': 4,
-        '4': 30,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        '*': 34,
-        'v': 11,
-        '0': 30,
-        '8': 30,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        '(': 35,
-        '+': 36,
-        'X': 4,
-        'V': 4,
-        '{': 37,
-        't': 4,
-        '\r': 32,
-        'c': 4,
-        'h': 4,
-        '5': 30,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        ')': 38,
-        'f': 7,
-        'W': 4,
-        '7': 30,
-        '>': 39,
-        'u': 4,
-        'B': 4,
+        '\t': 1,
+        ' ': 1,
+        '\n': 1,
+        '\r': 1,
         '!': 2,
+        '(': 3,
+        ')': 4,
+        '*': 5,
+        '+': 6,
+        ',': 7,
+        '-': 8,
+        '/': 9,
+        '0': 10,
+        '1': 10,
+        '2': 10,
+        '3': 10,
+        '4': 10,
+        '5': 10,
+        '6': 10,
+        '7': 10,
+        '8': 10,
+        '9': 10,
+        ';': 11,
+        '<': 12,
+        '=': 13,
+        '>': 14,
+        'A': 15,
+        'B': 15,
+        'C': 15,
+        'D': 15,
+        'E': 15,
+        'F': 15,
+        'G': 15,
+        'H': 15,
+        'I': 15,
+        'J': 15,
+        'K': 15,
+        'L': 15,
+        'M': 15,
+        'N': 15,
+        'O': 15,
+        'P': 15,
+        'Q': 15,
+        'R': 15,
+        'S': 15,
+        'T': 15,
+        'U': 15,
+        'V': 15,
+        'W': 15,
+        'X': 15,
+        'Y': 15,
+        'Z': 15,
+        '_': 15,
+        'a': 15,
+        'b': 15,
+        'c': 15,
+        'd': 15,
+        'e': 15,
+        'f': 15,
+        'g': 15,
+        'h': 15,
+        'i': 15,
+        'j': 15,
+        'k': 15,
+        'l': 15,
+        'm': 15,
+        'n': 15,
+        'o': 15,
+        'p': 15,
+        'q': 15,
+        'r': 15,
+        's': 15,
+        't': 15,
+        'u': 15,
+        'v': 15,
+        'w': 15,
+        'x': 15,
+        'y': 15,
+        'z': 15,
+        '{': 16,
+        '}': 17,
     },
     1: {
-        '9': 48,
-        '2': 48,
-        '1': 48,
-        '6': 48,
-        '3': 48,
-        '4': 48,
-        '0': 48,
-        '8': 48,
-        '5': 48,
-        '7': 48,
+        '\t': 1,
+        ' ': 1,
+        '\n': 1,
+        '\r': 1,
     },
     2: {
-        '=': 40,
-    },
-    3: {
-        'G': 4,
-        'S': 4,
-        'e': 5,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    4: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    5: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 10,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    6: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 9,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    7: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 12,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    8: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 15,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
+        '=': 18,
     },
     9: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 13,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
+        '/': 19,
     },
     10: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 14,
-        'B': 4,
-    },
-    11: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 17,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
+        '.': 20,
+        '0': 10,
+        '1': 10,
+        '2': 10,
+        '3': 10,
+        '4': 10,
+        '5': 10,
+        '6': 10,
+        '7': 10,
+        '8': 10,
+        '9': 10,
     },
     12: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 16,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
+        '=': 21,
     },
     13: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 21,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
+        '=': 22,
     },
     14: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 23,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
+        '=': 23,
     },
     15: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 24,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    16: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 19,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    17: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 20,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    18: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 22,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 45,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
+        '0': 15,
+        '1': 15,
+        '2': 15,
+        '3': 15,
+        '4': 15,
+        '5': 15,
+        '6': 15,
+        '7': 15,
+        '8': 15,
+        '9': 15,
+        'A': 15,
+        'B': 15,
+        'C': 15,
+        'D': 15,
+        'E': 15,
+        'F': 15,
+        'G': 15,
+        'H': 15,
+        'I': 15,
+        'J': 15,
+        'K': 15,
+        'L': 15,
+        'M': 15,
+        'N': 15,
+        'O': 15,
+        'P': 15,
+        'Q': 15,
+        'R': 15,
+        'S': 15,
+        'T': 15,
+        'U': 15,
+        'V': 15,
+        'W': 15,
+        'X': 15,
+        'Y': 15,
+        'Z': 15,
+        '_': 15,
+        'a': 15,
+        'b': 15,
+        'c': 15,
+        'd': 15,
+        'e': 15,
+        'f': 15,
+        'g': 15,
+        'h': 15,
+        'i': 15,
+        'j': 15,
+        'k': 15,
+        'l': 15,
+        'm': 15,
+        'n': 15,
+        'o': 15,
+        'p': 15,
+        'q': 15,
+        'r': 15,
+        's': 15,
+        't': 15,
+        'u': 15,
+        'v': 15,
+        'w': 15,
+        'x': 15,
+        'y': 15,
+        'z': 15,
     },
     19: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 42,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
+        '\x00': 19,
+        '\x01': 19,
+        '\x02': 19,
+        '\x03': 19,
+        '\x04': 19,
+        '\x05': 19,
+        '\x06': 19,
+        '\x07': 19,
+        '\x08': 19,
+        '\x0b': 19,
+        '\x0c': 19,
+        '\x0e': 19,
+        '\x0f': 19,
+        '\x10': 19,
+        '\x11': 19,
+        '\x12': 19,
+        '\x13': 19,
+        '\x14': 19,
+        '\x15': 19,
+        '\x16': 19,
+        '\x17': 19,
+        '\x18': 19,
+        '\x19': 19,
+        '\x1a': 19,
+        '\x1b': 19,
+        '\x1c': 19,
+        '\x1d': 19,
+        '\x1e': 19,
+        '\x1f': 19,
+        '"': 19,
+        '#': 19,
+        '$': 19,
+        '%': 19,
+        '&': 19,
+        "'": 19,
+        ':': 19,
+        '?': 19,
+        '@': 19,
+        '[': 19,
+        '\\': 19,
+        ']': 19,
+        '^': 19,
+        '`': 19,
+        '|': 19,
+        '~': 19,
+        '\x7f': 19,
+        '\x80': 19,
+        '\x81': 19,
+        '\x82': 19,
+        '\x83': 19,
+        '\x84': 19,
+        '\x85': 19,
+        '\x86': 19,
+        '\x87': 19,
+        '\x88': 19,
+        '\x89': 19,
+        '\x8a': 19,
+        '\x8b': 19,
+        '\x8c': 19,
+        '\x8d': 19,
+        '\x8e': 19,
+        '\x8f': 19,
+        '\x90': 19,
+        '\x91': 19,
+        '\x92': 19,
+        '\x93': 19,
+        '\x94': 19,
+        '\x95': 19,
+        '\x96': 19,
+        '\x97': 19,
+        '\x98': 19,
+        '\x99': 19,
+        '\x9a': 19,
+        '\x9b': 19,
+        '\x9c': 19,
+        '\x9d': 19,
+        '\x9e': 19,
+        '\x9f': 19,
+        '\xa0': 19,
+        '¡': 19,
+        '¢': 19,
+        '£': 19,
+        '¤': 19,
+        '¥': 19,
+        '¦': 19,
+        '§': 19,
+        '¨': 19,
+        '©': 19,
+        'ª': 19,
+        '«': 19,
+        '¬': 19,
+        '\xad': 19,
+        '®': 19,
+        '¯': 19,
+        '°': 19,
+        '±': 19,
+        '²': 19,
+        '³': 19,
+        '´': 19,
+        'µ': 19,
+        '¶': 19,
+        '·': 19,
+        '¸': 19,
+        '¹': 19,
+        'º': 19,
+        '»': 19,
+        '¼': 19,
+        '½': 19,
+        '¾': 19,
+        '¿': 19,
+        'À': 19,
+        'Á': 19,
+        'Â': 19,
+        'Ã': 19,
+        'Ä': 19,
+        'Å': 19,
+        'Æ': 19,
+        'Ç': 19,
+        'È': 19,
+        'É': 19,
+        'Ê': 19,
+        'Ë': 19,
+        'Ì': 19,
+        'Í': 19,
+        'Î': 19,
+        'Ï': 19,
+        'Ð': 19,
+        'Ñ': 19,
+        'Ò': 19,
+        'Ó': 19,
+        'Ô': 19,
+        'Õ': 19,
+        'Ö': 19,
+        '×': 19,
+        'Ø': 19,
+        'Ù': 19,
+        'Ú': 19,
+        'Û': 19,
+        'Ü': 19,
+        'Ý': 19,
+        'Þ': 19,
+        'ß': 19,
+        'à': 19,
+        'á': 19,
+        'â': 19,
+        'ã': 19,
+        'ä': 19,
+        'å': 19,
+        'æ': 19,
+        'ç': 19,
+        'è': 19,
+        'é': 19,
+        'ê': 19,
+        'ë': 19,
+        'ì': 19,
+        'í': 19,
+        'î': 19,
+        'ï': 19,
+        'ð': 19,
+        'ñ': 19,
+        'ò': 19,
+        'ó': 19,
+        'ô': 19,
+        'õ': 19,
+        'ö': 19,
+        '÷': 19,
+        'ø': 19,
+        'ù': 19,
+        'ú': 19,
+        'û': 19,
+        'ü': 19,
+        'ý': 19,
+        'þ': 19,
+        'ÿ': 19,
+        '\t': 19,
+        ' ': 19,
+        '!': 19,
+        '(': 19,
+        ')': 19,
+        '*': 19,
+        '+': 19,
+        ',': 19,
+        '-': 19,
+        '.': 19,
+        '/': 19,
+        '0': 19,
+        '1': 19,
+        '2': 19,
+        '3': 19,
+        '4': 19,
+        '5': 19,
+        '6': 19,
+        '7': 19,
+        '8': 19,
+        '9': 19,
+        ';': 19,
+        '<': 19,
+        '=': 19,
+        '>': 19,
+        'A': 19,
+        'B': 19,
+        'C': 19,
+        'D': 19,
+        'E': 19,
+        'F': 19,
+        'G': 19,
+        'H': 19,
+        'I': 19,
+        'J': 19,
+        'K': 19,
+        'L': 19,
+        'M': 19,
+        'N': 19,
+        'O': 19,
+        'P': 19,
+        'Q': 19,
+        'R': 19,
+        'S': 19,
+        'T': 19,
+        'U': 19,
+        'V': 19,
+        'W': 19,
+        'X': 19,
+        'Y': 19,
+        'Z': 19,
+        '_': 19,
+        'a': 19,
+        'b': 19,
+        'c': 19,
+        'd': 19,
+        'e': 19,
+        'f': 19,
+        'g': 19,
+        'h': 19,
+        'i': 19,
+        'j': 19,
+        'k': 19,
+        'l': 19,
+        'm': 19,
+        'n': 19,
+        'o': 19,
+        'p': 19,
+        'q': 19,
+        'r': 19,
+        's': 19,
+        't': 19,
+        'u': 19,
+        'v': 19,
+        'w': 19,
+        'x': 19,
+        'y': 19,
+        'z': 19,
+        '{': 19,
+        '}': 19,
     },
     20: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 43,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    21: {
-        'G': 4,
-        'S': 4,
-        'e': 44,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    22: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 46,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    23: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 49,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
+        '0': 24,
+        '1': 24,
+        '2': 24,
+        '3': 24,
+        '4': 24,
+        '5': 24,
+        '6': 24,
+        '7': 24,
+        '8': 24,
+        '9': 24,
     },
     24: {
-        'G': 4,
-        'S': 4,
-        'e': 52,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    25: {
-        '=': 51,
-    },
-    29: {
-        '=': 50,
-    },
-    30: {
-        '.': 1,
-        '9': 30,
-        '2': 30,
-        '1': 30,
-        '6': 30,
-        '3': 30,
-        '4': 30,
-        '0': 30,
-        '8': 30,
-        '5': 30,
-        '7': 30,
-    },
-    32: {
-        ' ': 32,
-        '\t': 32,
-        '\n': 32,
-        '\r': 32,
-    },
-    33: {
-        '/': 47,
-    },
-    39: {
-        '=': 41,
-    },
-    42: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    43: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    44: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    45: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    46: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    47: {
-        'G': 47,
-        'S': 47,
-        'e': 47,
-        '.': 47,
-        'F': 47,
-        '@': 47,
-        'T': 47,
-        '=': 47,
-        ';': 47,
-        '}': 47,
-        ']': 47,
-        'I': 47,
-        'd': 47,
-        ',': 47,
-        '`': 47,
-        '<': 47,
-        'x': 47,
-        'r': 47,
-        'Y': 47,
-        '9': 47,
-        'J': 47,
-        "'": 47,
-        '2': 47,
-        'b': 47,
-        '-': 47,
-        '?': 47,
-        ' ': 47,
-        '\t': 47,
-        '/': 47,
-        '1': 47,
-        '\\': 47,
-        '&': 47,
-        ':': 47,
-        'g': 47,
-        'z': 47,
-        'i': 47,
-        'm': 47,
-        'K': 47,
-        'C': 47,
-        'U': 47,
-        'M': 47,
-        '6': 47,
-        's': 47,
-        'P': 47,
-        'Q': 47,
-        '\x0c': 47,
-        'n': 47,
-        'l': 47,
-        'D': 47,
-        'N': 47,
-        'y': 47,
-        '3': 47,
-        'k': 47,
-        'O': 47,
-        '[': 47,
-        '^': 47,
-        'w': 47,
-        'p': 47,
-        '4': 47,
-        'E': 47,
-        '#': 47,
-        'q': 47,
-        'A': 47,
-        'a': 47,
-        '*': 47,
-        'v': 47,
-        '0': 47,
-        '8': 47,
-        '|': 47,
-        '"': 47,
-        '$': 47,
-        '_': 47,
-        'L': 47,
-        'Z': 47,
-        'R': 47,
-        '(': 47,
-        '+': 47,
-        'X': 47,
-        'V': 47,
-        '{': 47,
-        't': 47,
-        'c': 47,
-        '~': 47,
-        'h': 47,
-        '5': 47,
-        '\x0b': 47,
-        'H': 47,
-        'j': 47,
-        'o': 47,
-        ')': 47,
-        'f': 47,
-        'W': 47,
-        '7': 47,
-        '>': 47,
-        'u': 47,
-        '%': 47,
-        'B': 47,
-        '!': 47,
-    },
-    48: {
-        '9': 48,
-        '2': 48,
-        '1': 48,
-        '6': 48,
-        '3': 48,
-        '4': 48,
-        '0': 48,
-        '8': 48,
-        '5': 48,
-        '7': 48,
-    },
-    49: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
-    },
-    52: {
-        'G': 4,
-        'S': 4,
-        'e': 4,
-        'F': 4,
-        'T': 4,
-        'I': 4,
-        'd': 4,
-        'x': 4,
-        'r': 4,
-        'Y': 4,
-        '9': 4,
-        'J': 4,
-        '2': 4,
-        'b': 4,
-        '1': 4,
-        'g': 4,
-        'z': 4,
-        'i': 4,
-        'm': 4,
-        'K': 4,
-        'C': 4,
-        'U': 4,
-        'M': 4,
-        '6': 4,
-        's': 4,
-        'P': 4,
-        'Q': 4,
-        'n': 4,
-        'l': 4,
-        'D': 4,
-        'N': 4,
-        'y': 4,
-        '3': 4,
-        'k': 4,
-        'O': 4,
-        'w': 4,
-        'p': 4,
-        '4': 4,
-        'E': 4,
-        'q': 4,
-        'A': 4,
-        'a': 4,
-        'v': 4,
-        '0': 4,
-        '8': 4,
-        '_': 4,
-        'L': 4,
-        'Z': 4,
-        'R': 4,
-        'X': 4,
-        'V': 4,
-        't': 4,
-        'c': 4,
-        'h': 4,
-        '5': 4,
-        'H': 4,
-        'j': 4,
-        'o': 4,
-        'f': 4,
-        'W': 4,
-        '7': 4,
-        'u': 4,
-        'B': 4,
+        '0': 24,
+        '1': 24,
+        '2': 24,
+        '3': 24,
+        '4': 24,
+        '5': 24,
+        '6': 24,
+        '7': 24,
+        '8': 24,
+        '9': 24,
     },
 }
-for i in range(53):
+for i in range(25):
     if i not in TRANS: TRANS[i] = {}
+# 字节自动机：状态 -> {字节值: 后继状态}
+BYTE_TRANS = {
+    0: {9: 1, 10: 1, 13: 1, 32: 1, 33: 2, 40: 3, 41: 4, 42: 5, 43: 6, 44: 7, 45: 8, 47: 9, 48: 10, 49: 10, 50: 10, 51: 10, 52: 10, 53: 10, 54: 10, 55: 10, 56: 10, 57: 10, 59: 11, 60: 12, 61: 13, 62: 14, 65: 15, 66: 15, 67: 15, 68: 15, 69: 15, 70: 15, 71: 15, 72: 15, 73: 15, 74: 15, 75: 15, 76: 15, 77: 15, 78: 15, 79: 15, 80: 15, 81: 15, 82: 15, 83: 15, 84: 15, 85: 15, 86: 15, 87: 15, 88: 15, 89: 15, 90: 15, 95: 15, 97: 15, 98: 15, 99: 15, 100: 15, 101: 15, 102: 15, 103: 15, 104: 15, 105: 15, 106: 15, 107: 15, 108: 15, 109: 15, 110: 15, 111: 15, 112: 15, 113: 15, 114: 15, 115: 15, 116: 15, 117: 15, 118: 15, 119: 15, 120: 15, 121: 15, 122: 15, 123: 16, 125: 17},
+    1: {9: 1, 10: 1, 13: 1, 32: 1},
+    2: {61: 18},
+    3: {},
+    4: {},
+    5: {},
+    6: {},
+    7: {},
+    8: {},
+    9: {47: 19},
+    10: {46: 20, 48: 10, 49: 10, 50: 10, 51: 10, 52: 10, 53: 10, 54: 10, 55: 10, 56: 10, 57: 10},
+    11: {},
+    12: {61: 21},
+    13: {61: 22},
+    14: {61: 23},
+    15: {48: 15, 49: 15, 50: 15, 51: 15, 52: 15, 53: 15, 54: 15, 55: 15, 56: 15, 57: 15, 65: 15, 66: 15, 67: 15, 68: 15, 69: 15, 70: 15, 71: 15, 72: 15, 73: 15, 74: 15, 75: 15, 76: 15, 77: 15, 78: 15, 79: 15, 80: 15, 81: 15, 82: 15, 83: 15, 84: 15, 85: 15, 86: 15, 87: 15, 88: 15, 89: 15, 90: 15, 95: 15, 97: 15, 98: 15, 99: 15, 100: 15, 101: 15, 102: 15, 103: 15, 104: 15, 105: 15, 106: 15, 107: 15, 108: 15, 109: 15, 110: 15, 111: 15, 112: 15, 113: 15, 114: 15, 115: 15, 116: 15, 117: 15, 118: 15, 119: 15, 120: 15, 121: 15, 122: 15},
+    16: {},
+    17: {},
+    18: {},
+    19: {0: 19, 1: 19, 2: 19, 3: 19, 4: 19, 5: 19, 6: 19, 7: 19, 8: 19, 9: 19, 11: 19, 12: 19, 14: 19, 15: 19, 16: 19, 17: 19, 18: 19, 19: 19, 20: 19, 21: 19, 22: 19, 23: 19, 24: 19, 25: 19, 26: 19, 27: 19, 28: 19, 29: 19, 30: 19, 31: 19, 32: 19, 33: 19, 34: 19, 35: 19, 36: 19, 37: 19, 38: 19, 39: 19, 40: 19, 41: 19, 42: 19, 43: 19, 44: 19, 45: 19, 46: 19, 47: 19, 48: 19, 49: 19, 50: 19, 51: 19, 52: 19, 53: 19, 54: 19, 55: 19, 56: 19, 57: 19, 58: 19, 59: 19, 60: 19, 61: 19, 62: 19, 63: 19, 64: 19, 65: 19, 66: 19, 67: 19, 68: 19, 69: 19, 70: 19, 71: 19, 72: 19, 73: 19, 74: 19, 75: 19, 76: 19, 77: 19, 78: 19, 79: 19, 80: 19, 81: 19, 82: 19, 83: 19, 84: 19, 85: 19, 86: 19, 87: 19, 88: 19, 89: 19, 90: 19, 91: 19, 92: 19, 93: 19, 94: 19, 95: 19, 96: 19, 97: 19, 98: 19, 99: 19, 100: 19, 101: 19, 102: 19, 103: 19, 104: 19, 105: 19, 106: 19, 107: 19, 108: 19, 109: 19, 110: 19, 111: 19, 112: 19, 113: 19, 114: 19, 115: 19, 116: 19, 117: 19, 118: 19, 119: 19, 120: 19, 121: 19, 122: 19, 123: 19, 124: 19, 125: 19, 126: 19, 127: 19, 194: 24, 195: 24, 196: 24, 197: 24, 198: 24, 199: 24, 200: 24, 201: 24, 202: 24, 203: 24, 204: 24, 205: 24, 206: 24, 207: 24, 208: 24, 209: 24, 210: 24, 211: 24, 212: 24, 213: 24, 214: 24, 215: 24, 216: 24, 217: 24, 218: 24, 219: 24, 220: 24, 221: 24, 222: 24, 223: 24, 224: 25, 225: 26, 226: 26, 227: 26, 228: 26, 229: 26, 230: 26, 231: 26, 232: 26, 233: 26, 234: 26, 235: 26, 236: 26, 237: 27, 238: 26, 239: 26, 240: 28, 241: 29, 242: 29, 243: 29, 244: 30},
+    20: {48: 31, 49: 31, 50: 31, 51: 31, 52: 31, 53: 31, 54: 31, 55: 31, 56: 31, 57: 31},
+    21: {},
+    22: {},
+    23: {},
+    24: {128: 19, 129: 19, 130: 19, 131: 19, 132: 19, 133: 19, 134: 19, 135: 19, 136: 19, 137: 19, 138: 19, 139: 19, 140: 19, 141: 19, 142: 19, 143: 19, 144: 19, 145: 19, 146: 19, 147: 19, 148: 19, 149: 19, 150: 19, 151: 19, 152: 19, 153: 19, 154: 19, 155: 19, 156: 19, 157: 19, 158: 19, 159: 19, 160: 19, 161: 19, 162: 19, 163: 19, 164: 19, 165: 19, 166: 19, 167: 19, 168: 19, 169: 19, 170: 19, 171: 19, 172: 19, 173: 19, 174: 19, 175: 19, 176: 19, 177: 19, 178: 19, 179: 19, 180: 19, 181: 19, 182: 19, 183: 19, 184: 19, 185: 19, 186: 19, 187: 19, 188: 19, 189: 19, 190: 19, 191: 19},
+    25: {160: 24, 161: 24, 162: 24, 163: 24, 164: 24, 165: 24, 166: 24, 167: 24, 168: 24, 169: 24, 170: 24, 171: 24, 172: 24, 173: 24, 174: 24, 175: 24, 176: 24, 177: 24, 178: 24, 179: 24, 180: 24, 181: 24, 182: 24, 183: 24, 184: 24, 185: 24, 186: 24, 187: 24, 188: 24, 189: 24, 190: 24, 191: 24},
+    26: {128: 24, 129: 24, 130: 24, 131: 24, 132: 24, 133: 24, 134: 24, 135: 24, 136: 24, 137: 24, 138: 24, 139: 24, 140: 24, 141: 24, 142: 24, 143: 24, 144: 24, 145: 24, 146: 24, 147: 24, 148: 24, 149: 24, 150: 24, 151: 24, 152: 24, 153: 24, 154: 24, 155: 24, 156: 24, 157: 24, 158: 24, 159: 24, 160: 24, 161: 24, 162: 24, 163: 24, 164: 24, 165: 24, 166: 24, 167: 24, 168: 24, 169: 24, 170: 24, 171: 24, 172: 24, 173: 24, 174: 24, 175: 24, 176: 24, 177: 24, 178: 24, 179: 24, 180: 24, 181: 24, 182: 24, 183: 24, 184: 24, 185: 24, 186: 24, 187: 24, 188: 24, 189: 24, 190: 24, 191: 24},
+    27: {128: 24, 129: 24, 130: 24, 131: 24, 132: 24, 133: 24, 134: 24, 135: 24, 136: 24, 137: 24, 138: 24, 139: 24, 140: 24, 141: 24, 142: 24, 143: 24, 144: 24, 145: 24, 146: 24, 147: 24, 148: 24, 149: 24, 150: 24, 151: 24, 152: 24, 153: 24, 154: 24, 155: 24, 156: 24, 157: 24, 158: 24, 159: 24},
+    28: {144: 26, 145: 26, 146: 26, 147: 26, 148: 26, 149: 26, 150: 26, 151: 26, 152: 26, 153: 26, 154: 26, 155: 26, 156: 26, 157: 26, 158: 26, 159: 26, 160: 26, 161: 26, 162: 26, 163: 26, 164: 26, 165: 26, 166: 26, 167: 26, 168: 26, 169: 26, 170: 26, 171: 26, 172: 26, 173: 26, 174: 26, 175: 26, 176: 26, 177: 26, 178: 26, 179: 26, 180: 26, 181: 26, 182: 26, 183: 26, 184: 26, 185: 26, 186: 26, 187: 26, 188: 26, 189: 26, 190: 26, 191: 26},
+    29: {128: 26, 129: 26, 130: 26, 131: 26, 132: 26, 133: 26, 134: 26, 135: 26, 136: 26, 137: 26, 138: 26, 139: 26, 140: 26, 141: 26, 142: 26, 143: 26, 144: 26, 145: 26, 146: 26, 147: 26, 148: 26, 149: 26, 150: 26, 151: 26, 152: 26, 153: 26, 154: 26, 155: 26, 156: 26, 157: 26, 158: 26, 159: 26, 160: 26, 161: 26, 162: 26, 163: 26, 164: 26, 165: 26, 166: 26, 167: 26, 168: 26, 169: 26, 170: 26, 171: 26, 172: 26, 173: 26, 174: 26, 175: 26, 176: 26, 177: 26, 178: 26, 179: 26, 180: 26, 181: 26, 182: 26, 183: 26, 184: 26, 185: 26, 186: 26, 187: 26, 188: 26, 189: 26, 190: 26, 191: 26},
+    30: {128: 26, 129: 26, 130: 26, 131: 26, 132: 26, 133: 26, 134: 26, 135: 26, 136: 26, 137: 26, 138: 26, 139: 26, 140: 26, 141: 26, 142: 26, 143: 26},
+    31: {48: 31, 49: 31, 50: 31, 51: 31, 52: 31, 53: 31, 54: 31, 55: 31, 56: 31, 57: 31},
+}
+
+# 码位 >= 0x100 的字符按 CLASS_STARTS（区间起点）二分查找，CLASS_IDS 为对应区间的类 ID
+CLASS_STARTS = [0, 256]
+CLASS_IDS = [None, 0]
+
+# 状态 -> {含非 Latin-1 字符的类 ID: 后继状态}
+WIDE_TRANS = {19: {0: 19}}
+
+def wide_step(state, char):
+    """码位 >= 0x100 的字符：state 在它所属的类上有转移时记入 TRANS[state]（之后直接命中），返回是否有转移。"""
+    to = WIDE_TRANS.get(state, {}).get(CLASS_IDS[bisect_right(CLASS_STARTS, ord(char)) - 1])
+    if to is None:
+        return False
+    TRANS[state][char] = to
+    return True
 
 ACCEPT = {
-    3: 'IDENTIFIER',
-    4: 'IDENTIFIER',
-    5: 'IDENTIFIER',
-    6: 'IDENTIFIER',
-    7: 'IDENTIFIER',
-    8: 'IDENTIFIER',
-    9: 'IDENTIFIER',
-    10: 'IDENTIFIER',
-    11: 'IDENTIFIER',
-    12: 'IDENTIFIER',
-    13: 'IDENTIFIER',
-    14: 'IDENTIFIER',
-    15: 'IDENTIFIER',
-    16: 'IDENTIFIER',
-    17: 'IDENTIFIER',
-    18: 'IDENTIFIER',
-    19: 'IDENTIFIER',
-    20: 'IDENTIFIER',
-    21: 'IDENTIFIER',
-    22: 'IDENTIFIER',
-    23: 'IDENTIFIER',
-    24: 'IDENTIFIER',
-    25: 'ASSIGN',
-    26: 'SEMI',
-    27: 'RBRACE',
-    28: 'COMMA',
-    29: 'LT',
-    30: 'INT_LITERAL',
-    31: 'MINUS',
-    32: 'WS',
-    33: 'DIV',
-    34: 'STAR',
-    35: 'LPAREN',
-    36: 'PLUS',
-    37: 'LBRACE',
-    38: 'RPAREN',
-    39: 'GT',
-    40: 'NEQ',
-    41: 'GE',
-    42: 'FLOAT',
-    43: 'VOID',
-    44: 'WHILE',
-    45: 'IF',
-    46: 'INT',
-    47: 'COMMENT',
-    48: 'FLOAT_LITERAL',
-    49: 'RETURN',
-    50: 'LE',
-    51: 'EQ',
-    52: 'ELSE',
-}
\ No newline at end of file
+    1: 1,  # WS
+    3: 21,  # LPAREN
+    4: 22,  # RPAREN
+    5: 19,  # STAR
+    6: 17,  # PLUS
+    7: 26,  # COMMA
+    8: 18,  # MINUS
+    9: 20,  # DIV
+    10: 28,  # INT_LITERAL
+    11: 25,  # SEMI
+    12: 15,  # LT
+    13: 14,  # ASSIGN
+    14: 16,  # GT
+    15: 29,  # IDENTIFIER
+    16: 23,  # LBRACE
+    17: 24,  # RBRACE
+    18: 11,  # NEQ
+    19: 2,  # COMMENT
+    21: 12,  # LE
+    22: 10,  # EQ
+    23: 13,  # GE
+    24: 27,  # FLOAT_LITERAL
+}
+BYTE_ACCEPT = {1: 1, 3: 21, 4: 22, 5: 19, 6: 17, 7: 26, 8: 18, 9: 20, 10: 28, 11: 25, 12: 15, 13: 14, 14: 16, 15: 29, 16: 23, 17: 24, 18: 11, 19: 2, 21: 12, 22: 10, 23: 13, 31: 27}
\ No newline at end of file
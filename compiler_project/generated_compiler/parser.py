@@ -1,5 +1,5 @@
-nonterminals = ['<expression_stmt>', '<decl_list>', '<local_decls>', '<param_tail>', '<id_tail>', '<decl_suffix>', '<expr_tail>', '<stmt>', '<arg_tail>', '<term_tail>', '<declaration>', '<program>', '<params>', '<expression>', '<compound_stmt>', '<mulop>', '<args>', '<param_list>', '<relop_expr>', '<term>', '<var_decl>', '<factor>', '<return_val>', '<arg_list>', '<selection_stmt>', '<iteration_stmt>', '<type_spec>', '<add_expr_tail>', '<stmt_list>', '<return_stmt>', '<additive_expression>', '<else_part>', '<relop>', '<addop>']
-terminals = ['LE', 'NEQ', 'EQ', 'PLUS', 'FLOAT', 'DIV', 'STAR', 'LPAREN', 'IF', 'LBRACE', 'FLOAT_LITERAL', 'WHILE', 'GE', 'ELSE', 'ASSIGN', 'GT', 'IDENTIFIER', 'RBRACE', 'INT_LITERAL', 'RETURN', 'SEMI', 'MINUS', 'VOID', 'RPAREN', 'LT', 'COMMA', 'INT']
+nonterminals = ['<decl_suffix>', '<var_decl>', '<term>', '<expression_stmt>', '<local_decls>', '<additive_expression>', '<type_spec>', '<relop_expr>', '<compound_stmt>', '<expression>', '<add_expr_tail>', '<id_tail>', '<factor>', '<addop>', '<param_tail>', '<params>', '<relop>', '<arg_tail>', '<arg_list>', '<mulop>', '<return_val>', '<return_stmt>', '<declaration>', '<args>', '<term_tail>', '<stmt_list>', '<program>', '<decl_list>', '<selection_stmt>', '<stmt>', '<else_part>', '<iteration_stmt>', '<param_list>', '<expr_tail>']
+terminals = ['GE', 'FLOAT_LITERAL', 'SEMI', 'IDENTIFIER', 'MINUS', 'WHILE', 'IF', 'ELSE', 'GT', 'NEQ', 'PLUS', 'FLOAT', 'LE', 'VOID', 'INT', 'ASSIGN', 'RBRACE', 'LBRACE', 'LT', 'INT_LITERAL', 'RPAREN', 'DIV', 'STAR', 'EQ', 'COMMA', 'LPAREN', 'RETURN']
 start_symbol = '<program>'
 parse_table = {
     ('<add_expr_tail>', 'ASSIGN'): ([], ''),
@@ -186,29 +186,71 @@ parse_table = {
     ('<var_decl>', 'VOID'): (['<type_spec>', 'IDENTIFIER', 'SEMI'], ''),
 }
 
+# token 种类号 -> 名字（与 lexer.py / tokens.py 一致，名字只用于诊断）
+TOKEN_NAMES = ['$', 'WS', 'COMMENT', 'INT', 'FLOAT', 'VOID', 'RETURN', 'IF', 'ELSE', 'WHILE', 'EQ', 'NEQ', 'LE', 'GE', 'ASSIGN', 'LT', 'GT', 'PLUS', 'MINUS', 'STAR', 'DIV', 'LPAREN', 'RPAREN', 'LBRACE', 'RBRACE', 'SEMI', 'COMMA', 'FLOAT_LITERAL', 'INT_LITERAL', 'IDENTIFIER']
+TOKEN_TABLE_HASH = '299a51811ee621c5'
+
+def _check_token_names():
+    """
+    与同目录的 tokens.py 核对种类号表的摘要：lexer.py、parser.py、tokens.py 须出自同一次生成（见 generator_main），
+    否则 parser 会把 token 认错。旁边没有 tokens.py（单独生成，或从源码字符串加载）时不检查。
+    """
+    import os
+    here = globals().get("__file__")
+    path = os.path.join(os.path.dirname(os.path.abspath(here)), "tokens.py") if here else None
+    if path is None or not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("TOKEN_TABLE_HASH = "):
+                if line[len("TOKEN_TABLE_HASH = "):].strip() != repr(TOKEN_TABLE_HASH):
+                    raise ValueError(f"{path} has a different token numbering; "
+                                     f"regenerate lexer.py, parser.py and tokens.py together")
+                return
+
+_check_token_names()
+
+EOF = 0
+
+# 符号编号：终结符即 token 种类号，非终结符排在其后；分析时栈里只有整数
+NTERMS = len(TOKEN_NAMES)
+KIND_OF = {name: k for k, name in enumerate(TOKEN_NAMES)}
+SYMBOL_NAMES = TOKEN_NAMES + nonterminals
+SYMBOL_ID = {name: k for k, name in enumerate(SYMBOL_NAMES)}
+START = SYMBOL_ID[start_symbol]
+
+# TABLE[(非终结符编号 - NTERMS) * NTERMS + 终结符编号] = 逆序的右部符号编号，None 表示无表项
+TABLE = [None] * (len(nonterminals) * NTERMS)
+for (_lhs, _term), (_rhs, _) in parse_table.items():
+    TABLE[(SYMBOL_ID[_lhs] - NTERMS) * NTERMS + SYMBOL_ID[_term]] = tuple(SYMBOL_ID[s] for s in reversed(_rhs))
+
+def _name(kind):
+    return TOKEN_NAMES[kind] if 0 <= kind < NTERMS else '?'
+
 def parse(token_list, verbose=True):
-    if not token_list or token_list[-1] != '$':
-        token_list = list(token_list) + ['$']
-    stack = ['$']
-    stack.append(start_symbol)
+    # token_list 为 token 种类号序列；也接受 token 名序列（先换成种类号）
+    if token_list and isinstance(token_list[0], str):
+        token_list = [KIND_OF.get(t, -1) for t in token_list]
+    if not token_list or token_list[-1] != EOF:
+        token_list = list(token_list) + [EOF]
+    stack = [EOF, START]
     ip = 0
     while stack:
         top = stack.pop()
         lookahead = token_list[ip]
-        if verbose: print(f'STACK TOP: {top}, LOOKAHEAD: {lookahead}')
+        if verbose: print(f'STACK TOP: {SYMBOL_NAMES[top]}, LOOKAHEAD: {_name(lookahead)}')
         
-        if top == '$': return True if lookahead == '$' else False
+        if top == EOF: return lookahead == EOF
         
-        if top not in nonterminals:
+        if top < NTERMS:
             if top == lookahead: ip += 1
             else: 
-                if verbose: print(f'Error: Expected {top}, got {lookahead}')
+                if verbose: print(f'Error: Expected {SYMBOL_NAMES[top]}, got {_name(lookahead)}')
                 return False
         else:
-            key = (top, lookahead)
-            if key not in parse_table:
-                if verbose: print(f'No table entry for {key}')
+            rhs = TABLE[(top - NTERMS) * NTERMS + lookahead] if 0 <= lookahead < NTERMS else None
+            if rhs is None:
+                if verbose: print(f'No table entry for {(SYMBOL_NAMES[top], _name(lookahead))}')
                 return False
-            rhs, _ = parse_table[key]
-            for sym in reversed(rhs): stack.append(sym)
+            stack.extend(rhs)
     return True
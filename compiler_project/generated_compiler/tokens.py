@@ -0,0 +1,36 @@
+"""lexer.py 与 parser.py 共用的 token 种类号（由生成器输出，请勿手工修改）。名字只用于诊断。"""
+
+TOKEN_TABLE_HASH = '299a51811ee621c5'
+NAMES = ['$', 'WS', 'COMMENT', 'INT', 'FLOAT', 'VOID', 'RETURN', 'IF', 'ELSE', 'WHILE', 'EQ', 'NEQ', 'LE', 'GE', 'ASSIGN', 'LT', 'GT', 'PLUS', 'MINUS', 'STAR', 'DIV', 'LPAREN', 'RPAREN', 'LBRACE', 'RBRACE', 'SEMI', 'COMMA', 'FLOAT_LITERAL', 'INT_LITERAL', 'IDENTIFIER']
+KIND_OF = {name: kind for kind, name in enumerate(NAMES)}
+
+EOF = 0
+WS = 1
+COMMENT = 2
+INT = 3
+FLOAT = 4
+VOID = 5
+RETURN = 6
+IF = 7
+ELSE = 8
+WHILE = 9
+EQ = 10
+NEQ = 11
+LE = 12
+GE = 13
+ASSIGN = 14
+LT = 15
+GT = 16
+PLUS = 17
+MINUS = 18
+STAR = 19
+DIV = 20
+LPAREN = 21
+RPAREN = 22
+LBRACE = 23
+RBRACE = 24
+SEMI = 25
+COMMA = 26
+FLOAT_LITERAL = 27
+INT_LITERAL = 28
+IDENTIFIER = 29
@@ -11,7 +11,7 @@ PROJECT_ROOT = os.path.abspath(os.path.join(GEN_DIR, ".."))
 sys.path.insert(0, PROJECT_ROOT)
 sys.path.insert(0, GEN_DIR)
 
-from generator.lex_builder import LexBuilder
+from generator.lex_builder import LexBuilder, tokens_module
 from generator.yacc_builder import YaccBuilder
 
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "generated_compiler")
@@ -55,13 +55,19 @@ def main():
 
     ensure_output_dir()
 
+    # lexer 与 parser 共用一张 token 种类号表（见 shared_token_names），同时写成 tokens.py
+    grammar = YaccBuilder(YACC_RULES, lex_rules=LEX_RULES)
+    grammar.parse_bnf()
+    token_names = grammar.resolve_token_names()
+    with open(os.path.join(OUTPUT_DIR, "tokens.py"), "w", encoding="utf-8") as f:
+        f.write(tokens_module(token_names))
+
     print(f"\n[A] 生成 lexer.py (from {lex_filename})...")
-    lex_builder = LexBuilder(LEX_RULES)
-    with open(os.path.join(OUTPUT_DIR, "lexer.py"), "w", encoding="utf-8") as f:
-        f.write(lex_builder.build())
+    lex_builder = LexBuilder(LEX_RULES, token_names=token_names)
+    lex_builder.run(out_path=os.path.join(OUTPUT_DIR, "lexer.py"))
 
     print(f"[B] 生成 parser.py (from {yacc_filename})...")
-    yacc_builder = YaccBuilder(YACC_RULES)
+    yacc_builder = YaccBuilder(YACC_RULES, token_names=token_names)
     yacc_builder.run(out_path=os.path.join(OUTPUT_DIR, "parser.py"))
 
     print("\n🎉 编译器生成完成！")
@@ -1,5 +1,12 @@
 import string
+import keyword
 import os
+import re
+import random
+import struct
+import hashlib
+from array import array
+from bisect import bisect_left, bisect_right
 
 ###############################################################################
 # 1. 基础 NFA 结构
@@ -11,7 +18,7 @@ class NFAState:
     def __init__(self):
         self.id = NFAState._id_counter
         NFAState._id_counter += 1
-        self.transitions = {}       # char -> set(states)
+        self.transitions = {}       # 区间元组 -> set(states)
         self.epsilon = set()        # ε-transitions
         self.accepting = None       # (priority, name)
 
@@ -26,13 +33,137 @@ class NFA:
 # 2. 正则解析器
 ###############################################################################
 
+# 正则 AST 节点用元组表示：
+#   ('chars', ranges)       匹配区间集合中任一码位的字符（见 ranges_of）
+#   ('empty',)              空串
+#   ('cat', left, right)    连接
+#   ('alt', left, right)    选择
+#   ('star' | 'plus' | 'opt', child)
+
+# 字符集合（'chars' 节点、NFA 边、字符类）用码位闭区间的元组表示：按 lo 升序，互不相交也不相邻，
+# 例如 [a-z_] -> ((95, 95), (97, 122))。字母表是全部 Unicode 码位，'.' 也只有 3 个区间
+MAX_CODE = 0x10FFFF
+LATIN1 = 0x100      # 生成的 lexer 对低于此码位的字符直接查表，其余字符按区间二分查找
+
+def ranges_of(pairs):
+    """(lo, hi) 序列 -> 规范化的区间元组（排序并合并重叠、相邻的区间，丢弃 lo > hi 的空区间）。"""
+    merged = []
+    for lo, hi in sorted(pairs):
+        if lo > hi:
+            continue
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return tuple((lo, hi) for lo, hi in merged)
+
+def chars_ranges(chars):
+    return ranges_of((ord(ch), ord(ch)) for ch in chars)
+
+def ranges_union(*sets):
+    return ranges_of(pair for ranges in sets for pair in ranges)
+
+def ranges_complement(ranges):
+    result = []
+    nxt = 0
+    for lo, hi in ranges:
+        if lo > nxt:
+            result.append((nxt, lo - 1))
+        nxt = hi + 1
+    if nxt <= MAX_CODE:
+        result.append((nxt, MAX_CODE))
+    return tuple(result)
+
+def ranges_contains(ranges, code):
+    k = bisect_right(ranges, (code, MAX_CODE)) - 1
+    return k >= 0 and ranges[k][1] >= code
+
+def ranges_clip(ranges, limit):
+    """只保留码位低于 limit 的部分（bytes 输入的元素只有 0~255）。"""
+    return tuple((lo, min(hi, limit - 1)) for lo, hi in ranges if lo < limit)
+
+def ranges_size(ranges):
+    return sum(hi - lo + 1 for lo, hi in ranges)
+
+def ranges_codes(ranges):
+    """逐个枚举码位，只用于已知很小的集合。"""
+    for lo, hi in ranges:
+        yield from range(lo, hi + 1)
+
+DOT = ranges_complement(chars_ranges('\n\r'))
+
+# bytes / mmap 输入按 UTF-8 字节驱动另一个自动机：把规则中的每个码位集合换成其 UTF-8 编码的字节序列，
+# 同样经 NFA / DFA 构造得到按字节值转移的自动机，多字节字符的中间字节落在中间状态上（见 ast_utf8）
+def utf8_sequences(lo, hi):
+    """
+    码位区间 [lo, hi] 的 UTF-8 编码拆成若干字节区间序列 [((lo1, hi1), (lo2, hi2), ...)]，
+    每个序列各位置的字节区间之积恰好是一段连续码位的编码，序列之间互不相交。代理区间 D800~DFFF 没有 UTF-8 编码，略去。
+    """
+    sequences = []
+
+    def split(lo, hi):
+        if lo > hi:
+            return
+        if lo <= 0xDFFF and hi >= 0xD800:
+            split(lo, 0xD7FF)
+            split(0xE000, hi)
+            return
+        for limit in (0x7F, 0x7FF, 0xFFFF):      # 编码长度不同的部分分开
+            if lo <= limit < hi:
+                split(lo, limit)
+                split(limit + 1, hi)
+                return
+        for k in range(1, 4):                     # 后 k 个字节不是整段 80~BF 时拆开，使各位置的区间可以独立取值
+            mask = (1 << (6 * k)) - 1
+            if lo & ~mask != hi & ~mask:
+                if lo & mask:
+                    split(lo, lo | mask)
+                    split((lo | mask) + 1, hi)
+                    return
+                if hi & mask != mask:
+                    split(lo, (hi & ~mask) - 1)
+                    split(hi & ~mask, hi)
+                    return
+        sequences.append(tuple(zip(chr(lo).encode('utf-8'), chr(hi).encode('utf-8'))))
+
+    split(lo, hi)
+    return sequences
+
+def ast_utf8(node):
+    """码位上的正则 AST -> 字节值上的正则 AST：每个 'chars' 换成其 UTF-8 编码的字节序列的选择，ASCII 部分合成一个集合。"""
+    kind = node[0]
+    if kind == 'chars':
+        sequences = [seq for lo, hi in node[1] for seq in utf8_sequences(lo, hi)]
+        single = ranges_of(seq[0] for seq in sequences if len(seq) == 1)
+        alternatives = [('chars', single)] if single else []
+        for seq in sequences:
+            if len(seq) > 1:
+                part = ('chars', seq[:1])
+                for pair in seq[1:]:
+                    part = ('cat', part, ('chars', (pair,)))
+                alternatives.append(part)
+        if not alternatives:
+            return ('chars', ())
+        result = alternatives[0]
+        for part in alternatives[1:]:
+            result = ('alt', result, part)
+        return result
+    if kind == 'empty':
+        return node
+    return (kind,) + tuple(ast_utf8(child) for child in node[1:])
+
 class RegexParser:
+    ESCAPES = {'n': '\n', 't': '\t', 'r': '\r'}
+    HEX_ESCAPES = {'x': 2, 'u': 4, 'U': 8}     # \xhh、\uhhhh、\Uhhhhhhhh 按码位给出字符
+
     def __init__(self, regex):
         self.regex = regex
         self.pos = 0
-        self.printable = set(string.printable) - {'\n', '\r'}
 
     def parse(self):
+        return thompson(self.parse_ast())
+
+    def parse_ast(self):
         return self.expr()
 
     def expr(self):
@@ -40,12 +171,7 @@ class RegexParser:
         while self._peek() == '|':
             self._next()
             right = self.term()
-            s = NFAState()
-            e = NFAState()
-            s.epsilon |= {term.start, right.start}
-            term.end.epsilon.add(e)
-            right.end.epsilon.add(e)
-            term = NFA(s, e)
+            term = ('alt', term, right)
         return term
 
     def term(self):
@@ -54,54 +180,40 @@ class RegexParser:
             factors.append(self.factor())
         
         if not factors:
-            s = NFAState()
-            e = NFAState()
-            s.epsilon.add(e)
-            return NFA(s, e)
+            return ('empty',)
         
-        nfa = factors[0]
+        node = factors[0]
         for f in factors[1:]:
-            nfa.end.epsilon.add(f.start)
-            nfa = NFA(nfa.start, f.end)
-        return nfa
+            node = ('cat', node, f)
+        return node
 
     def factor(self):
         base = self.base()
         while self._peek() in ('*', '+', '?'):
             op = self._next()
-            s = NFAState()
-            e = NFAState()
             if op == '*':
-                s.epsilon |= {base.start, e}
-                base.end.epsilon |= {base.start, e}
+                base = ('star', base)
             elif op == '+':
-                s.epsilon.add(base.start)
-                base.end.epsilon |= {base.start, e}
+                base = ('plus', base)
             elif op == '?':
-                s.epsilon |= {base.start, e}
-                base.end.epsilon.add(e)
-            base = NFA(s, e)
+                base = ('opt', base)
         return base
 
     def base(self):
         ch = self._peek()
         if ch == '(':
             self._next()
-            nfa = self.expr()
+            node = self.expr()
             if self._peek() == ')':
                 self._next()
             else:
                 raise ValueError("Missing closing parenthesis")
-            return nfa
+            return node
         elif ch == '[':
             return self.char_class()
         elif ch == '\\':
             self._next()
-            escaped_char = self._next()
-            if escaped_char == 'n': escaped_char = '\n'
-            elif escaped_char == 't': escaped_char = '\t'
-            elif escaped_char == 'r': escaped_char = '\r' 
-            return self.literal(escaped_char)
+            return self.literal(self.escape())
         elif ch == '.':
             self._next()
             return self.dot()
@@ -109,53 +221,50 @@ class RegexParser:
             return self.literal(self._next())
 
     def literal(self, ch):
-        s = NFAState()
-        e = NFAState()
-        s.transitions.setdefault(ch, set()).add(e)
-        return NFA(s, e)
+        return ('chars', ((ord(ch), ord(ch)),))
 
     def dot(self):
-        s = NFAState()
-        e = NFAState()
-        for c in self.printable:
-            s.transitions.setdefault(c, set()).add(e)
-        return NFA(s, e)
+        # 除换行、回车外的任意字符（含非 ASCII）
+        return ('chars', DOT)
+
+    def escape(self):
+        """读取反斜杠之后的转义，返回它表示的字符：\\n \\t \\r、HEX_ESCAPES 中的码位写法，其余字符按字面。"""
+        ch = self._next()
+        width = self.HEX_ESCAPES.get(ch)
+        if width is None:
+            return self.ESCAPES.get(ch, ch)
+        digits = self.regex[self.pos:self.pos + width]
+        if len(digits) != width or not all(d in string.hexdigits for d in digits) or int(digits, 16) > MAX_CODE:
+            raise ValueError(f"Bad escape \\{ch}{digits}")
+        self.pos += width
+        return chr(int(digits, 16))
 
     def char_class(self):
-        # === 核心修复在这里 ===
+        # [...] 字符类，[^...] 取补集；成员可以是单个字符、a-z 式的区间或转义
         self._next()  # skip [
-        chars = set()
+        negate = self._peek() == '^'
+        if negate:
+            self._next()
+        pairs = []
         while self._peek() is not None and self._peek() != ']':
             c = self._next()
             if c == '\\':
-                c = self._next()
-                if c == 'n': c = '\n'
-                elif c == 't': c = '\t'
-                elif c == 'r': c = '\r' 
-                # 注意：如果还需要支持其他转义(如 \s, \d)，需要在这里扩展
-            
+                c = self.escape()
+
             if self._peek() == '-':
                 self._next() # skip -
                 end = self._next()
                 if end == '\\': # 处理范围结尾是转义的情况
-                    end = self._next()
-                    if end == 'n': end = '\n'
-                    elif end == 't': end = '\t'
-                    elif end == 'r': end = '\r'
-
-                for x in range(ord(c), ord(end) + 1):
-                    chars.add(chr(x))
+                    end = self.escape()
+                pairs.append((ord(c), ord(end)))
             else:
-                chars.add(c)
+                pairs.append((ord(c), ord(c)))
         
         if self._peek() == ']':
             self._next()
-            
-        s = NFAState()
-        e = NFAState()
-        for c in chars:
-            s.transitions.setdefault(c, set()).add(e)
-        return NFA(s, e)
+
+        ranges = ranges_of(pairs)
+        return ('chars', ranges_complement(ranges) if negate else ranges)
 
     def _peek(self):
         return self.regex[self.pos] if self.pos < len(self.regex) else None
@@ -165,6 +274,40 @@ class RegexParser:
         self.pos += 1
         return ch
 
+def thompson(node):
+    """Thompson 构造：正则 AST -> NFA。"""
+    kind = node[0]
+    if kind == 'cat':
+        left = thompson(node[1])
+        right = thompson(node[2])
+        left.end.epsilon.add(right.start)
+        return NFA(left.start, right.end)
+
+    s = NFAState()
+    e = NFAState()
+    if kind == 'chars':
+        s.transitions.setdefault(node[1], set()).add(e)
+    elif kind == 'empty':
+        s.epsilon.add(e)
+    elif kind == 'alt':
+        left = thompson(node[1])
+        right = thompson(node[2])
+        s.epsilon |= {left.start, right.start}
+        left.end.epsilon.add(e)
+        right.end.epsilon.add(e)
+    else:
+        base = thompson(node[1])
+        if kind == 'star':
+            s.epsilon |= {base.start, e}
+            base.end.epsilon |= {base.start, e}
+        elif kind == 'plus':
+            s.epsilon.add(base.start)
+            base.end.epsilon |= {base.start, e}
+        elif kind == 'opt':
+            s.epsilon |= {base.start, e}
+            base.end.epsilon.add(e)
+    return NFA(s, e)
+
 ###############################################################################
 # 3. NFA -> DFA
 ###############################################################################
@@ -180,221 +323,3013 @@ def epsilon_closure(states):
                 stack.append(nxt)
     return closure
 
-def move(states, ch):
+def move(states, code):
     result = set()
     for s in states:
-        result |= s.transitions.get(ch, set())
+        for ranges, targets in s.transitions.items():
+            if ranges_contains(ranges, code):
+                result |= targets
     return result
 
+def collect_states(start):
+    seen = {start}
+    stack = [start]
+    while stack:
+        s = stack.pop()
+        for nxt in s.epsilon.union(*s.transitions.values()):
+            if nxt not in seen:
+                seen.add(nxt)
+                stack.append(nxt)
+    return seen
+
+def alphabet_partition(char_sets):
+    """
+    把码位轴按 char_sets 中各区间集合的端点切成基本区间，每段的签名是覆盖它的集合序号，
+    签名相同的段归为一类（不被任何集合覆盖的段不分配类 ID，它们在 DFA 中没有转移）。
+    类按最小码位编号。返回 (classes, set_classes)：classes[cid] 为该类的区间元组，
+    set_classes[k] 为 char_sets[k] 覆盖的类 ID（升序）。
+    """
+    points = sorted({p for ranges in char_sets for lo, hi in ranges for p in (lo, hi + 1)})
+    covers = [[] for _ in points]
+    set_segments = []
+    for k, ranges in enumerate(char_sets):
+        segments = [seg for lo, hi in ranges for seg in range(bisect_left(points, lo), bisect_left(points, hi + 1))]
+        for seg in segments:
+            covers[seg].append(k)
+        set_segments.append(segments)
+
+    class_ids = {}
+    pieces = []
+    seg_class = [None] * len(points)
+    for seg, signature in enumerate(covers):
+        if signature:
+            cid = class_ids.setdefault(tuple(signature), len(class_ids))
+            if cid == len(pieces):
+                pieces.append([])
+            pieces[cid].append((points[seg], points[seg + 1] - 1))
+            seg_class[seg] = cid
+    set_classes = [sorted({seg_class[seg] for seg in segments}) for segments in set_segments]
+    return [ranges_of(p) for p in pieces], set_classes
+
+def alphabet_classes(nfa_states):
+    """
+    按所有 NFA 边的字符集合把输入字母表划分为等价类（见 alphabet_partition）。
+    两个字符若在每条 NFA 边上的出现情况都相同，则它们对任意状态集合的 move 结果相同，
+    子集构造和最小化只需对每个类取一个代表字符。返回 classes，classes[cid] 为该类的区间元组。
+    """
+    edges = [ranges for s in sorted(nfa_states, key=lambda st: st.id) for ranges in s.transitions]
+    return alphabet_partition(edges)[0]
+
+def class_index(classes):
+    """
+    把整个码位轴按类的区间切开：返回 (starts, ids)，ids[k] 是 [starts[k], starts[k + 1]) 所属的类 ID，
+    不属于任何类的区间为 None。查找时在 starts 上二分（生成的 lexer 用同样的两张表处理非 Latin-1 字符）。
+    """
+    starts, ids = [], []
+    nxt = 0
+    for lo, hi, cid in sorted((lo, hi, cid) for cid, ranges in enumerate(classes) for lo, hi in ranges):
+        if lo > nxt:
+            starts.append(nxt)
+            ids.append(None)
+        starts.append(lo)
+        ids.append(cid)
+        nxt = hi + 1
+    if nxt <= MAX_CODE:
+        starts.append(nxt)
+        ids.append(None)
+    return starts, ids
+
+def ranges_classes(ranges, starts, ids):
+    """区间集合覆盖的类 ID。ranges 须是若干类的并（NFA 边、位置的字符集合都满足，见 alphabet_partition）。"""
+    found = set()
+    for lo, hi in ranges:
+        k = bisect_right(starts, lo) - 1
+        while k < len(starts) and starts[k] <= hi:
+            if ids[k] is not None:
+                found.add(ids[k])
+            k += 1
+    return found
+
+def expand_classes(dfa_states, classes):
+    # 类 ID 上的 DFA -> 字符上的 DFA（table 后端按字符查表），只展开 Latin-1 范围，其余字符见 generate_lexer
+    return [{chr(code): to for cid, to in trans.items() for code in ranges_codes(ranges_clip(classes[cid], LATIN1))}
+            for trans in dfa_states]
+
+def subset_construction(start, classes):
+    """子集构造（frozenset 版本）：DFA 状态以 NFA 状态对象的 frozenset 为键。"""
+    dfa_states = []
+    dfa_map = {}
+    accept_map = {}
+
+    start_closure = epsilon_closure({start})
+    dfa_map[frozenset(start_closure)] = 0
+    dfa_states.append({})
+    stack = [start_closure]
+
+    while stack:
+        current = stack.pop()
+        idx = dfa_map[frozenset(current)]
+        
+        possible_accepts = [s.accepting for s in current if s.accepting is not None]
+        if possible_accepts:
+            best_match = min(possible_accepts, key=lambda x: x[0])
+            accept_map[idx] = best_match[1]
+
+        for cid, ranges in enumerate(classes):
+            nxt = epsilon_closure(move(current, ranges[0][0]))
+            if not nxt: continue
+            key = frozenset(nxt)
+            if key not in dfa_map:
+                dfa_map[key] = len(dfa_states)
+                dfa_states.append({})
+                stack.append(nxt)
+            dfa_states[idx][cid] = dfa_map[key]
+
+    return dfa_states, accept_map
+
+def iter_bits(bits):
+    # 按序号升序枚举位集中的 1；先转成字符串再 find，避免对大整数反复做 bits & -bits
+    digits = bin(bits)[:1:-1]
+    i = digits.find('1')
+    while i >= 0:
+        yield i
+        i = digits.find('1', i + 1)
+
+def bitset_nfa(start, classes):
+    """
+    把 NFA 压成位集形式：只给"重要"NFA 状态（有字符边或是接受状态）稠密编号——
+    只有 ε 边的状态不影响 move 和接受判定，不占位。
+    每个 NFA 状态的 ε-闭包只计算一次并缓存，每条字符边预先折算为 (类 ID, 目标闭包位集)。
+    返回 (out_edges, accepting, start_bits)：out_edges[i] 为 [(cid, bits)]，accepting[i] 为 (priority, name) 或 None。
+    """
+    nfa_states = sorted((st for st in collect_states(start) if st.transitions or st.accepting is not None),
+                        key=lambda st: st.id)
+    index = {st: i for i, st in enumerate(nfa_states)}
+
+    closures = {}
+    def closure_bits(st):
+        bits = closures.get(st)
+        if bits is None:
+            bits = 0
+            for c in epsilon_closure({st}):
+                if c in index:
+                    bits |= 1 << index[c]
+            closures[st] = bits
+        return bits
+
+    starts, ids = class_index(classes)
+    out_edges = []
+    for st in nfa_states:
+        edges = {}
+        for ranges, targets in st.transitions.items():
+            bits = 0
+            for t in targets:
+                bits |= closure_bits(t)
+            for cid in ranges_classes(ranges, starts, ids):
+                edges[cid] = edges.get(cid, 0) | bits
+        out_edges.append(sorted(edges.items()))
+    accepting = [st.accepting for st in nfa_states]
+    return out_edges, accepting, closure_bits(start)
+
+def subset_construction_bitset(start, classes):
+    """
+    子集构造（位集版本）：状态集合用 bitset_nfa 编号下的 int 位集表示，
+    一个 DFA 状态的全部后继只需遍历其中的 NFA 状态各一次，DFA 映射以位集为键。
+    """
+    out_edges, accepting, start_bits = bitset_nfa(start, classes)
+    dfa_states = [{}]
+    dfa_map = {start_bits: 0}
+    accept_map = {}
+    stack = [start_bits]
+
+    while stack:
+        current = stack.pop()
+        idx = dfa_map[current]
+
+        best_match = None
+        nxt = {}
+        for i in iter_bits(current):
+            acc = accepting[i]
+            if acc is not None and (best_match is None or acc[0] < best_match[0]):
+                best_match = acc
+            for cid, target in out_edges[i]:
+                nxt[cid] = nxt.get(cid, 0) | target
+        if best_match is not None:
+            accept_map[idx] = best_match[1]
+
+        for cid in sorted(nxt):
+            key = nxt[cid]
+            if key not in dfa_map:
+                dfa_map[key] = len(dfa_states)
+                dfa_states.append({})
+                stack.append(key)
+            dfa_states[idx][cid] = dfa_map[key]
+
+    return dfa_states, accept_map
+
+###############################################################################
+# 4. 正则 -> DFA（followpos 直接构造）
+###############################################################################
+
+class PositionTable:
+    """
+    龙书 3.9 节的直接构造：每个规则 r_i 增广为 (r_i)#_i，
+    叶子（字符集合）与结束标记 #_i 都是"位置"，firstpos/lastpos/followpos 用 int 位集表示。
+    """
+    def __init__(self):
+        self.chars = []       # 位置 -> 区间元组（结束标记为 None）
+        self.accepting = []   # 位置 -> (priority, name) 或 None
+        self.follow = []      # 位置 -> followpos 位集
+
+    def new_position(self, chars=None, accepting=None):
+        self.chars.append(chars)
+        self.accepting.append(accepting)
+        self.follow.append(0)
+        return 1 << (len(self.chars) - 1)
+
+    def visit(self, node):
+        """返回 (nullable, firstpos, lastpos)，并顺带填写 followpos。"""
+        kind = node[0]
+        if kind == 'chars':
+            bit = self.new_position(node[1])
+            return False, bit, bit
+        if kind == 'empty':
+            return True, 0, 0
+        if kind == 'cat':
+            n1, f1, l1 = self.visit(node[1])
+            n2, f2, l2 = self.visit(node[2])
+            self.add_follow(l1, f2)
+            return n1 and n2, (f1 | f2) if n1 else f1, (l1 | l2) if n2 else l2
+        if kind == 'alt':
+            n1, f1, l1 = self.visit(node[1])
+            n2, f2, l2 = self.visit(node[2])
+            return n1 or n2, f1 | f2, l1 | l2
+        nullable, first, last = self.visit(node[1])
+        if kind in ('star', 'plus'):
+            self.add_follow(last, first)
+        return nullable or kind != 'plus', first, last
+
+    def add_follow(self, sources, targets):
+        for p in iter_bits(sources):
+            self.follow[p] |= targets
+
+def direct_dfa(rule_asts):
+    """
+    不经过 NFA，直接由正则 AST 构造 DFA。DFA 状态是位置集合（位集），
+    接受状态取其中优先级最高（序号最小）的结束标记，与子集构造的 accept_map 语义一致。
+    返回以字符类 ID 为转移键的 (dfa_states, accept_map, classes)。
+    """
+    table = PositionTable()
+    start_bits = 0
+    for index, (name, node) in enumerate(rule_asts):
+        nullable, first, last = table.visit(node)
+        marker = table.new_position(accepting=(index, name))
+        table.add_follow(last, marker)
+        start_bits |= (first | marker) if nullable else first
+
+    # 字符类由各位置的区间集合划分，与 Thompson 路径的 alphabet_classes 相同
+    classes, pos_classes = alphabet_partition([chars or () for chars in table.chars])
+
+    dfa_states = [{}]
+    dfa_map = {start_bits: 0}
+    accept_map = {}
+    stack = [start_bits]
+
+    while stack:
+        current = stack.pop()
+        idx = dfa_map[current]
+
+        best_match = None
+        nxt = {}
+        for p in iter_bits(current):
+            acc = table.accepting[p]
+            if acc is not None and (best_match is None or acc[0] < best_match[0]):
+                best_match = acc
+            for cid in pos_classes[p]:
+                nxt[cid] = nxt.get(cid, 0) | table.follow[p]
+        if best_match is not None:
+            accept_map[idx] = best_match[1]
+
+        for cid in sorted(nxt):
+            key = nxt[cid]
+            if key not in dfa_map:
+                dfa_map[key] = len(dfa_states)
+                dfa_states.append({})
+                stack.append(key)
+            dfa_states[idx][cid] = dfa_map[key]
+
+    return dfa_states, accept_map, classes
+
 ###############################################################################
-# 4. DFA 最小化
+# 5. DFA 最小化
 ###############################################################################
 
+def trim_dfa(dfa_states, accept_map):
+    """
+    删除不可达状态（从 0 出发走不到）和死状态（走不到任何接受状态）。
+    返回保留下来的旧状态编号（升序，0 总是保留）。
+    """
+    reachable = {0}
+    stack = [0]
+    while stack:
+        s = stack.pop()
+        for to in dfa_states[s].values():
+            if to not in reachable:
+                reachable.add(to)
+                stack.append(to)
+
+    preds = {s: [] for s in reachable}
+    for s in reachable:
+        for to in dfa_states[s].values():
+            preds[to].append(s)
+
+    live = {s for s in reachable if s in accept_map}
+    stack = list(live)
+    while stack:
+        s = stack.pop()
+        for p in preds[s]:
+            if p not in live:
+                live.add(p)
+                stack.append(p)
+    live.add(0)
+    return sorted(live)
+
 def minimize_dfa(dfa_states, accept_map):
-    num_states = len(dfa_states)
+    """
+    Hopcroft 划分细化，O(n·|Σ|·log n)。
+    初始划分按 accept_map 中的 token 名分组（同名接受状态可合并，优先级已在子集构造时决定），
+    缺失的转移视为指向一个隐式陷阱状态，最后陷阱状态所在的块被丢弃。
+    返回的 DFA 中起始状态仍为 0。
+    """
+    states = trim_dfa(dfa_states, accept_map)
+    index = {s: i for i, s in enumerate(states)}
+    n = len(states)
+    sink = n
+
     alphabet = set()
-    for trans in dfa_states:
-        alphabet |= set(trans.keys())
+    inv = {}  # ch -> {target -> [sources]}
+    for s in states:
+        for ch, to in dfa_states[s].items():
+            if to in index:
+                alphabet.add(ch)
+                inv.setdefault(ch, {}).setdefault(index[to], []).append(index[s])
+    for ch in alphabet:
+        targets = inv[ch]
+        for s in states:
+            if ch not in dfa_states[s] or dfa_states[s][ch] not in index:
+                targets.setdefault(sink, []).append(index[s])
+        targets.setdefault(sink, []).append(sink)
 
-    partitions = {}
-    for s in range(num_states):
-        key = accept_map.get(s, None)
-        partitions.setdefault(key, set()).add(s)
-    P = list(partitions.values())
+    groups = {}
+    for s in states:
+        groups.setdefault(accept_map.get(s), set()).add(index[s])
+    groups.setdefault(None, set()).add(sink)
+    blocks = list(groups.values())
+    block_of = [0] * (n + 1)
+    for b, block in enumerate(blocks):
+        for q in block:
+            block_of[q] = b
 
-    changed = True
-    while changed:
-        changed = False
-        new_P = []
-        for group in P:
-            if len(group) <= 1:
-                new_P.append(group)
-                continue
-            splitter = {}
-            for s in group:
-                signature = []
-                for ch in sorted(list(alphabet)):
-                    target = dfa_states[s].get(ch)
-                    target_group_idx = -1
-                    if target is not None:
-                        for i, g in enumerate(P):
-                            if target in g:
-                                target_group_idx = i
-                                break
-                    signature.append((ch, target_group_idx))
-                splitter.setdefault(tuple(signature), set()).add(s)
-            if len(splitter) > 1:
-                changed = True
-                new_P.extend(splitter.values())
-            else:
-                new_P.append(group)
-        P = new_P
+    largest = max(range(len(blocks)), key=lambda b: len(blocks[b]))
+    worklist = [b for b in range(len(blocks)) if b != largest]
+    in_work = set(worklist)
 
-    state_map = {}
-    for i, group in enumerate(P):
-        for s in group:
-            state_map[s] = i
+    while worklist:
+        a = worklist.pop()
+        in_work.discard(a)
+        splitter = list(blocks[a])
+        for ch in alphabet:
+            targets = inv[ch]
+            touched = {}
+            for q in splitter:
+                for p in targets.get(q, ()):
+                    touched.setdefault(block_of[p], set()).add(p)
+            for b, part in touched.items():
+                if len(part) == len(blocks[b]):
+                    continue
+                blocks[b] -= part
+                new_b = len(blocks)
+                blocks.append(part)
+                for q in part:
+                    block_of[q] = new_b
+                if b in in_work or len(part) <= len(blocks[b]):
+                    worklist.append(new_b)
+                    in_work.add(new_b)
+                else:
+                    worklist.append(b)
+                    in_work.add(b)
 
-    new_dfa = [{} for _ in range(len(P))]
+    # 从起始块出发按 BFS 顺序重新编号，陷阱块不输出
+    sink_block = block_of[sink]
+    order = {block_of[index[0]]: 0}
+    queue = [block_of[index[0]]]
+    new_dfa = []
     new_accept = {}
-
-    for old_s, new_s in state_map.items():
-        for ch, to in dfa_states[old_s].items():
-            new_dfa[new_s][ch] = state_map[to]
-        if old_s in accept_map:
-            new_accept[new_s] = accept_map[old_s]
+    for b in queue:
+        rep = states[next(iter(blocks[b]))]
+        trans = {}
+        for ch, to in dfa_states[rep].items():
+            if to not in index or block_of[index[to]] == sink_block:
+                continue
+            tb = block_of[index[to]]
+            if tb not in order:
+                order[tb] = len(queue)
+                queue.append(tb)
+            trans[ch] = order[tb]
+        new_dfa.append(trans)
+        if rep in accept_map:
+            new_accept[order[b]] = accept_map[rep]
 
     return new_dfa, new_accept
 
 ###############################################################################
-# 5. 生成代码
+# 6. 生成代码
 ###############################################################################
 
-def generate_lexer(dfa_states, accept_map):
+SKIP_NAMES = ('WS', 'SKIP', 'COMMENT', 'WHITESPACE')
+
+# lexer.py / parser.py 各自内嵌 TOKEN_NAMES（可以单独按路径加载），import 时与同目录的 tokens.py 核对摘要。
+# 只逐行找 TOKEN_TABLE_HASH 那一行比较字符串，不 import tokens.py、不解析 NAMES，几乎不增加 import 时间
+TOKEN_NAMES_CHECK = '''
+def _check_token_names():
+    """
+    与同目录的 tokens.py 核对种类号表的摘要：lexer.py、parser.py、tokens.py 须出自同一次生成（见 generator_main），
+    否则 parser 会把 token 认错。旁边没有 tokens.py（单独生成，或从源码字符串加载）时不检查。
+    """
+    import os
+    here = globals().get("__file__")
+    path = os.path.join(os.path.dirname(os.path.abspath(here)), "tokens.py") if here else None
+    if path is None or not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("TOKEN_TABLE_HASH = "):
+                if line[len("TOKEN_TABLE_HASH = "):].strip() != repr(TOKEN_TABLE_HASH):
+                    raise ValueError(f"{path} has a different token numbering; "
+                                     f"regenerate lexer.py, parser.py and tokens.py together")
+                return
+
+_check_token_names()
+'''
+
+def token_table_hash(token_names):
+    """种类号表的摘要：tokens.py、lexer.py、parser.py 都写入同一个 TOKEN_TABLE_HASH，import 时比较（见 TOKEN_NAMES_CHECK）。"""
+    return hashlib.sha1("\n".join(token_names).encode("utf-8")).hexdigest()[:16]
+
+def token_class_lines(token_names, keywords, skip_kinds, instrument=False):
+    """
+    Token / TokenSpans 及 token 种类号表。token_names[k] 是种类号 k 的名字（0 号固定为 '$'）；
+    keywords 为 {标识符种类号: ({关键字串: 关键字种类号}, {小写关键字串: 关键字种类号})}（见 fold_keyword_rules）。
+    instrument 为真时再输出 Lexer.profile 用的 ScanProfile（见 profile_method_lines）。
+    """
     lines = []
-    lines.append("import sys")
+    lines.append("from array import array")
+    lines.append("from bisect import bisect_right")
+    if instrument:
+        lines.append("import json")
+        lines.append("from collections import Counter")
+        lines.append("from time import perf_counter")
+    lines.append("")
+    lines.append("# token 种类号 -> 名字（与 parser.py / tokens.py 一致，名字只用于诊断）")
+    lines.append(f"TOKEN_NAMES = {list(token_names)!r}")
+    lines.append(f"TOKEN_TABLE_HASH = {token_table_hash(token_names)!r}")
+    lines.append(TOKEN_NAMES_CHECK)
+    lines.append("KIND_OF = {name: kind for kind, name in enumerate(TOKEN_NAMES)}")
+    lines.append("EOF = 0")
+    skip = sorted(skip_kinds)
+    lines.append(f"SKIP_KINDS = frozenset({skip!r})    # 不输出的 token：{', '.join(token_names[k] for k in skip)}")
+    lines.append("")
+    lines.append("# 关键字折叠：标识符规则匹配到的串再查表，命中则改判为关键字（关键字规则不进 DFA）")
+    lines.append("# CASELESS_KEYWORDS 是大小写不敏感的关键字，按 token 值的小写查（只转换 ASCII 字母，见 ASCII_LOWER）")
+    for table_name, caseless in (("KEYWORDS", False), ("CASELESS_KEYWORDS", True)):
+        lines.append(f"{table_name} = {{")
+        for ident, tables in sorted(keywords.items()):
+            if not tables[caseless]:
+                continue
+            lines.append(f"    {ident}: {{  # {token_names[ident]}")
+            for word, kind in sorted(tables[caseless].items()):
+                lines.append(f"        {word!r}: {kind},")
+            lines.append("    },")
+        lines.append("}")
+        lines.append(f"BYTE_{table_name} = {{ident: {{word.encode('ascii'): kind for word, kind in table.items()}}")
+        lines.append(f"{' ' * (len(table_name) + 9)}for ident, table in {table_name}.items()}}")
+    lines.append(f"ASCII_LOWER = str.maketrans({string.ascii_uppercase!r}, {string.ascii_lowercase!r})")
     lines.append("")
+    lines.append(LINE_INDEX)
     lines.append("class Token:")
-    lines.append("    def __init__(self, type_, value, line=0, col=0):")
-    lines.append("        self.type = type_")
+    lines.append("    # 只记录 token 结束位置 offset 和所在缓冲区的换行索引 lines，行列号在访问时才二分查找")
+    lines.append("    def __init__(self, kind, value, offset=0, lines=None):")
+    lines.append("        self.kind = kind")
     lines.append("        self.value = value")
-    lines.append("        self.line = line")
-    lines.append("        self.col = col")
+    lines.append("        self.offset = offset")
+    lines.append("        self.lines = lines")
+    lines.append("    @property")
+    lines.append("    def type(self):")
+    lines.append("        return TOKEN_NAMES[self.kind]")
+    lines.append("    @property")
+    lines.append("    def line(self):")
+    lines.append("        return self.lines.line_col(self.offset)[0] if self.lines is not None else 0")
+    lines.append("    @property")
+    lines.append("    def col(self):")
+    lines.append("        return self.lines.line_col(self.offset)[1] if self.lines is not None else 0")
     lines.append("    def __repr__(self):")
     lines.append("        return f\"Token({self.type}, {self.value!r})\"")
     lines.append("")
-    lines.append("class Lexer:")
-    lines.append("    def __init__(self, text):")
-    lines.append("        self.text = text")
-    lines.append("        self.pos = 0")
-    lines.append("        self.line = 1")
-    lines.append("        self.col = 1")
-    lines.append("")
-    lines.append("    def tokenize(self):")
+    lines.append(TOKEN_SPANS)
+    if instrument:
+        lines.append(SCAN_PROFILE)
+    return lines
+
+LINE_INDEX = '''class LineIndex:
+    """
+    换行符位置索引：首次查询时用 find 循环一次性建好，之后按偏移二分查找 (行, 列)。
+    line / col 是 text 开头的行列号（流式扫描时缓冲区不从输入开头算起）。
+    bytes / mmap 输入的偏移是字节数，列号仍按字符计：保留原文，查询时把所在行开头到 offset 的字节按 UTF-8 解码计数。
+    """
+    def __init__(self, text, line=1, col=1):
+        self.text = text
+        self.line = line
+        self.col = col
+        self.newlines = None
+
+    def build(self):
+        text = self.text
+        nl = '\\n' if isinstance(text, str) else b'\\n'
+        newlines = array('I' if len(text) < 1 << 32 else 'Q')
+        i = text.find(nl)
+        while i >= 0:
+            newlines.append(i)
+            i = text.find(nl, i + 1)
+        self.newlines = newlines
+        if isinstance(text, str):
+            self.text = None    # 建好索引后不再持有原文
+        return newlines
+
+    def line_col(self, offset):
+        newlines = self.newlines if self.newlines is not None else self.build()
+        k = bisect_right(newlines, offset - 1)
+        start = newlines[k - 1] + 1 if k else 0
+        width = offset - start
+        if self.text is not None and width:
+            width = len(self.text[start:offset].decode('utf-8', 'replace'))
+        if k:
+            return self.line + k, width + 1
+        return self.line, self.col + width
+'''
+
+TOKEN_SPANS = '''class TokenSpans:
+    """
+    tokenize_spans 的结果：kinds（token 种类号）、starts、ends（token 在原文中的 [start, end)）三个平行数组。
+    Token 对象、token 值和行列号都只在访问时才生成。
+    """
+    def __init__(self, text, kinds, starts, ends):
+        self.text = text
+        self.kinds = kinds
+        self.starts = starts
+        self.ends = ends
+        self.lines = LineIndex(text)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def type(self, i):
+        return TOKEN_NAMES[self.kinds[i]]
+
+    def value(self, i):
+        value = self.text[self.starts[i] : self.ends[i]]
+        return value if isinstance(value, str) else value.decode('utf-8')
+
+    def line_col(self, offset):
+        return self.lines.line_col(offset)
+
+    def __getitem__(self, i):
+        # 与 tokenize 一致，Token 的行列号取 token 结束处
+        return Token(self.kinds[i], self.value(i), self.ends[i], self.lines)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self.kinds)))
+'''
+
+SCAN_PROFILE = '''class ScanProfile:
+    """
+    Lexer.profile 的计数。counts / lengths / backtrack 按 token 种类号（含跳过的 token）记 token 个数、
+    总长度（str 输入为字符数，bytes 输入为字节数）和回退距离（最长匹配越过 token 结尾多读、又退回重扫的字符数）；
+    visits 按 DFA 状态号记进入次数；自环字符由 RUNS 整段吃掉，不逐字符计数（table / flat / binary 后端记一次进入，
+    code 后端在状态代码内吃掉，不记），re / lazy 后端没有固定的状态号，visits 为空。
+    seconds 是整次扫描的用时，含计数本身的开销。
+    """
+    def __init__(self, size):
+        self.size = size
+        self.counts = Counter()
+        self.lengths = Counter()
+        self.backtrack = Counter()
+        self.max_backtrack = 0
+        self.visits = Counter()
+        self.seconds = 0.0
+
+    def as_dict(self):
+        tokens = sum(self.counts.values())
+        return {
+            "size": self.size,
+            "tokens": tokens,
+            "seconds": self.seconds,
+            "tokens_per_sec": tokens / self.seconds if self.seconds else None,
+            "max_backtrack": self.max_backtrack,
+            "kinds": {TOKEN_NAMES[kind]: {"count": count, "length": self.lengths[kind], "backtrack": self.backtrack[kind]}
+                      for kind, count in self.counts.most_common()},
+            "visits": {str(state): count for state, count in sorted(self.visits.items())},
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.as_dict(), **kwargs)
+'''
+
+def keyword_setup_lines(keywords, byte_mode):
+    prefix = "BYTE_" if byte_mode else ""
+    lines = []
+    for ident, (exact, caseless) in sorted(keywords.items()):
+        if exact:
+            lines.append(f"keywords_{ident} = {prefix}KEYWORDS[{ident}].get")
+        if caseless:
+            lines.append(f"caseless_{ident} = {prefix}CASELESS_KEYWORDS[{ident}].get")
+    return lines
+
+def keyword_lines(keywords, value, byte_mode=False):
+    """
+    标识符匹配按 value 查关键字表改判（见 fold_keyword_rules），大小写不敏感的关键字按 value 的小写查。
+    只转换 ASCII 字母（与 ast_caseless 一致）：str.lower() 会把 'K'（U+212A）之类的字符也折成 ASCII，
+    那样 str 输入会认出 bytes 输入和 fold_keywords=False 都认不出的关键字。bytes.lower() 本来就只转换 ASCII。
+    """
+    lower = f"{value}.lower()" if byte_mode else f"{value}.translate(ASCII_LOWER)"
+    lines = []
+    for ident, (exact, caseless) in sorted(keywords.items()):
+        lines.append(f"if last_accept == {ident}:")
+        if exact and caseless:
+            lines.append(f"    last_accept = keywords_{ident}({value}) or caseless_{ident}({lower}, {ident})")
+        elif caseless:
+            lines.append(f"    last_accept = caseless_{ident}({lower}, {ident})")
+        else:
+            lines.append(f"    last_accept = keywords_{ident}({value}, {ident})")
+    return lines
+
+def scan_method_lines(name, match_lines, setup_lines, byte_mode, keywords):
+    """
+    生成一个扫描方法。byte_mode 为真时 self.text 是 bytes / mmap（元素为字节值），token 值只在确实输出时才解码。
+    热路径上不维护行列号：Token 只记结束位置，self.line / self.col 是 self.text 开头的行列号，
+    需要时由本次扫描共用的 LineIndex 批量建索引后二分查找。
+    SKIP_KINDS 中的 token（%skip 规则）匹配后直接前进，不切片、不查关键字表、不建 Token。
+    """
+    lines = []
+    lines.append(f"    def {name}(self, final):")
+    lines.append("        \"\"\"扫描 self.text 中已确定的 token；final 为假时在可能受后续输入影响的 token 前停下。\"\"\"")
     lines.append("        tokens = []")
-    lines.append("        while self.pos < len(self.text):")
-    lines.append("            state = 0")
-    lines.append("            last_accept = None")
-    lines.append("            last_len = 0")
-    lines.append("            current_len = 0")
-    lines.append("            i = self.pos")
-    lines.append("")
-    lines.append("            while i < len(self.text):")
-    lines.append("                char = self.text[i]")
-    lines.append("                if char not in TRANS[state]:")
-    lines.append("                    break")
-    lines.append("                state = TRANS[state][char]")
-    lines.append("                current_len += 1")
-    lines.append("                i += 1")
-    lines.append("                if state in ACCEPT:")
-    lines.append("                    last_accept = ACCEPT[state]")
-    lines.append("                    last_len = current_len")
+    lines.append("        n = len(self.text)")
+    lines.append("        index = self.index = LineIndex(self.text, self.line, self.col)")
+    lines.append("        skip_kinds = SKIP_KINDS")
+    lines.extend("        " + l for l in setup_lines + keyword_setup_lines(keywords, byte_mode))
+    lines.append("        while self.pos < n:")
+    lines.extend("            " + l if l else "" for l in match_lines)
     lines.append("")
+    lines.append("            if not final and scan_end >= n:")
+    lines.append("                break")
+    lines.append("            if last_accept in skip_kinds:")
+    lines.append("                self.pos += last_len")
+    lines.append("                continue")
     lines.append("            if last_accept is None:")
-    lines.append("                raise SyntaxError(f\"Unexpected character at line {self.line}, col {self.col}: {self.text[self.pos]!r}\")")
+    if byte_mode:
+        lines.append("                if not final and self.pos + 4 > n:")
+        lines.append("                    break       # 出错的字符可能还没读全（UTF-8 最长 4 字节），等下一块再报告")
+    bad = "self.text[self.pos : self.pos + 4].decode('utf-8', 'replace')[0]" if byte_mode else "self.text[self.pos]"
+    lines.append("                line, col = index.line_col(self.pos)")
+    lines.append(f"                raise SyntaxError(f\"Unexpected character at line {{line}}, col {{col}}: {{{bad}!r}}\")")
     lines.append("")
     lines.append("            value = self.text[self.pos : self.pos + last_len]")
-    lines.append("            lines_count = value.count('\\n')")
-    lines.append("            if lines_count > 0:")
-    lines.append("                self.line += lines_count")
-    lines.append("                self.col = len(value) - value.rfind('\\n')")
-    lines.append("            else:")
-    lines.append("                self.col += len(value)")
+    lines.extend("            " + l for l in keyword_lines(keywords, "value", byte_mode))
     lines.append("            self.pos += last_len")
-    lines.append("")
-    lines.append("            if last_accept not in ['WS', 'SKIP', 'COMMENT', 'WHITESPACE']:")
-    lines.append("                tokens.append(Token(last_accept, value, self.line, self.col))")
+    value = "value.decode('utf-8')" if byte_mode else "value"
+    lines.append(f"            tokens.append(Token(last_accept, {value}, self.pos, index))")
     lines.append("")
     lines.append("        return tokens")
     lines.append("")
-    
-    lines.append("TRANS = {")
-    for i, trans in enumerate(dfa_states):
-        if not trans: continue
-        lines.append(f"    {i}: {{")
-        for ch, to in trans.items():
-            lines.append(f"        {repr(ch)}: {to},")
-        lines.append("    },")
+    return lines
+
+def spans_method_lines(name, match_lines, setup_lines, byte_mode, keywords):
+    """
+    生成 tokenize_spans 的扫描方法：只记录种类号和起止位置，不切片、不建 Token、不维护行列号。跳过的 token 同 _scan。
+    stop / out 供 parallel_spans 使用：扫描到第一个不小于 stop 的 token 边界为止（跨过 stop 的 token 照常扫完），
+    token 追加到 out（kinds, starts, ends）中，出错时 out 里保留出错位置之前的 token。
+    resync 供 relex 使用：到达 stop 后调用 resync(self.pos) 取下一个 stop，返回 None 时结束。
+    relex 逐个追赶旧 token 边界时因此只有一次扫描，setup_lines（如把整个缓冲区 translate 成类 ID）只执行一次。
+    """
+    lines = []
+    lines.append(f"    def {name}(self, stop=None, out=None, resync=None):")
+    lines.append("        text = self.text")
+    lines.append("        n = len(text)")
+    lines.append("        stop = n if stop is None else stop")
+    lines.append("        final = True")
+    lines.append("        offset_code = 'I' if n < 1 << 32 else 'Q'")
+    lines.append("        kinds, starts, ends = out if out is not None else (array('H'), array(offset_code), array(offset_code))")
+    lines.append("        skip_kinds = SKIP_KINDS")
+    lines.extend("        " + l for l in setup_lines + keyword_setup_lines(keywords, byte_mode))
+    lines.append("        while stop is not None:")
+    lines.append("            while self.pos < stop:")
+    lines.extend("                " + l if l else "" for l in match_lines)
+    lines.append("")
+    bad = "text[self.pos : self.pos + 4].decode('utf-8', 'replace')[0]" if byte_mode else "text[self.pos]"
+    lines.append("                if last_accept in skip_kinds:")
+    lines.append("                    self.pos += last_len")
+    lines.append("                    continue")
+    lines.append("                if last_accept is None:")
+    lines.append("                    line, col = LineIndex(text, self.line, self.col).line_col(self.pos)")
+    lines.append(f"                    raise SyntaxError(f\"Unexpected character at line {{line}}, col {{col}}: {{{bad}!r}}\")")
+    lines.append("")
+    lines.extend("                " + l for l in keyword_lines(keywords, "text[self.pos : self.pos + last_len]", byte_mode))
+    lines.append("                kinds.append(last_accept)")
+    lines.append("                starts.append(self.pos)")
+    lines.append("                ends.append(self.pos + last_len)")
+    lines.append("                self.pos += last_len")
+    lines.append("            stop = resync(self.pos) if resync is not None else None")
+    lines.append("")
+    lines.append("        return TokenSpans(text, kinds, starts, ends)")
+    lines.append("")
+    return lines
+
+def count_visits(lines):
+    """插桩：在每个给 state 赋值的行之后记一次进入该状态（见 ScanProfile.visits）。"""
+    counted = []
+    for line in lines:
+        counted.append(line)
+        if line.lstrip().startswith("state = "):
+            counted.append(line[:len(line) - len(line.lstrip())] + "visits[state] += 1")
+    return counted
+
+def profile_method_lines(name, match_lines, setup_lines, byte_mode, keywords):
+    """
+    生成 Lexer.profile 的扫描方法：与 _spans 相同的扫描，不记录 token，而是把计数累加到 ScanProfile。
+    match_lines 是插桩后的匹配代码（见 count_visits），可以更新 visits；回退距离由 scan_end 算出。
+    这是单独生成的方法，tokenize 等扫描方法中没有任何插桩代码。
+    """
+    lines = []
+    lines.append(f"    def {name}(self):")
+    lines.append("        text = self.text")
+    lines.append("        n = len(text)")
+    lines.append("        final = True")
+    lines.append("        stats = ScanProfile(n - self.pos)")
+    lines.append("        counts, lengths, backtrack, visits = stats.counts, stats.lengths, stats.backtrack, stats.visits")
+    lines.extend("        " + l for l in setup_lines + keyword_setup_lines(keywords, byte_mode))
+    lines.append("        started = perf_counter()")
+    lines.append("        while self.pos < n:")
+    lines.extend("            " + l if l else "" for l in match_lines)
+    lines.append("")
+    bad = "text[self.pos : self.pos + 4].decode('utf-8', 'replace')[0]" if byte_mode else "text[self.pos]"
+    lines.append("            if last_accept is None:")
+    lines.append("                line, col = LineIndex(text, self.line, self.col).line_col(self.pos)")
+    lines.append(f"                raise SyntaxError(f\"Unexpected character at line {{line}}, col {{col}}: {{{bad}!r}}\")")
+    lines.append("")
+    lines.extend("            " + l for l in keyword_lines(keywords, "text[self.pos : self.pos + last_len]", byte_mode))
+    lines.append("            counts[last_accept] += 1")
+    lines.append("            lengths[last_accept] += last_len")
+    lines.append("            extra = scan_end - self.pos - last_len")
+    lines.append("            if extra > 0:")
+    lines.append("                backtrack[last_accept] += extra")
+    lines.append("                stats.max_backtrack = max(stats.max_backtrack, extra)")
+    lines.append("            self.pos += last_len")
+    lines.append("")
+    lines.append("        stats.seconds = perf_counter() - started")
+    lines.append("        return stats")
+    lines.append("")
+    return lines
+
+def tokenize_lines(match_lines, setup_lines, byte_match_lines, byte_setup_lines, keywords, lookahead=(None, None),
+                   profile=None):
+    """
+    生成 Lexer.tokenize / tokenize_spans / stream / from_path / parallel_spans / relex 及其 str、bytes 两种扫描方法。
+    match_lines 是从 self.pos 起做最长匹配的代码块（不含缩进），
+    执行完后须设置 last_accept（token 种类号或 None）、last_len 和 scan_end（扫描停下的位置）；
+    setup_lines 在进入主循环前执行一次（例如把全局表绑定为局部变量）。
+    byte_match_lines / byte_setup_lines 是 self.text 为 bytes / mmap 时的对应代码，按字节值驱动字节自动机
+    （规则的字符集合换成等价的 UTF-8 字节序列，见 ast_utf8），匹配结果与解码后的 str 输入相同，token 值按 UTF-8 解码。
+    keywords 为折叠进标识符规则的关键字表，匹配完成后按 token 值改判。
+    lookahead 为 (码位自动机, 字节自动机) 的最长前瞻（见 max_lookahead），
+    写成 Lexer.MAX_LOOKAHEAD / BYTE_MAX_LOOKAHEAD 供 relex 使用。
+    profile 为 (插桩后的 match_lines, 插桩后的 byte_match_lines) 时另外生成 Lexer.profile（见 profile_method_lines），
+    为 None 时不生成，其余方法的代码与是否插桩无关。
+    流式扫描时缓冲区之后还有输入，若 scan_end 到达缓冲区末尾，再读入字符可能改变匹配结果，
+    _scan 就此停下，之后从该 token 开头重新匹配；stream 攒到新读入的输入不少于未消费的尾部才重扫，
+    缓冲区按几何级数增长，很长的 token（大块注释、字符串）跨越多块时重扫总量仍是线性的。
+    """
+    lines = []
+    lines.append("    # 最长匹配在 token 结束后最多再读入的字符（字节）数（None 为没有上界），relex 据此找到不受编辑影响的 token 边界")
+    lines.append(f"    MAX_LOOKAHEAD = {lookahead[0]!r}")
+    lines.append(f"    BYTE_MAX_LOOKAHEAD = {lookahead[1]!r}")
+    lines.append("")
+    lines.append("    def tokenize(self):")
+    lines.append("        return self._scan(True) if isinstance(self.text, str) else self._scan_bytes(True)")
+    lines.append("")
+    lines.extend(scan_method_lines("_scan", match_lines, setup_lines, False, keywords))
+    lines.extend(scan_method_lines("_scan_bytes", byte_match_lines, byte_setup_lines, True, keywords))
+    lines.append("    def tokenize_spans(self):")
+    lines.append("        \"\"\"与 tokenize 相同的扫描，但结果是 TokenSpans（平行数组），不为每个 token 创建对象。\"\"\"")
+    lines.append("        return self._spans() if isinstance(self.text, str) else self._spans_bytes()")
+    lines.append("")
+    lines.extend(spans_method_lines("_spans", match_lines, setup_lines, False, keywords))
+    lines.extend(spans_method_lines("_spans_bytes", byte_match_lines, byte_setup_lines, True, keywords))
+    if profile is not None:
+        lines.append("    def profile(self):")
+        lines.append("        \"\"\"插桩扫描 self.text，返回 ScanProfile（to_json() 导出计数），不输出 token。\"\"\"")
+        lines.append("        return self._profile() if isinstance(self.text, str) else self._profile_bytes()")
+        lines.append("")
+        lines.extend(profile_method_lines("_profile", profile[0], setup_lines, False, keywords))
+        lines.extend(profile_method_lines("_profile_bytes", profile[1], byte_setup_lines, True, keywords))
+    lines.append("    @classmethod")
+    lines.append("    def stream(cls, source, chunk_size=1 << 16):")
+    lines.append("        \"\"\"")
+    lines.append("        流式词法分析：source 为文件对象（按 chunk_size 读取）或产生 str / bytes 块的可迭代对象，")
+    lines.append("        token 一旦确定即产出。块之间只保留未消费的尾部（未完成的 token），内存占用与输入总长无关。")
+    lines.append("        \"\"\"")
+    lines.append("        if hasattr(source, 'read'):")
+    lines.append("            read = source.read")
+    lines.append("            source = iter(lambda: read(chunk_size) or None, None)")
+    lines.append("        lexer = None")
+    lines.append("        pending, size = [], 0    # 上次扫描之后读入、还没有拼进缓冲区的块")
+    lines.append("        for chunk in source:")
+    lines.append("            if lexer is None:")
+    lines.append("                lexer = cls(chunk)")
+    lines.append("                scan = lexer._scan if isinstance(chunk, str) else lexer._scan_bytes")
+    lines.append("            else:")
+    lines.append("                pending.append(chunk)")
+    lines.append("                size += len(chunk)")
+    lines.append("                # 未消费的尾部是一个未完成的 token，新输入不比它长时先攒着：每次重扫前缓冲区至少翻倍")
+    lines.append("                if size < len(lexer.text) - lexer.pos:")
+    lines.append("                    continue")
+    lines.append("                lexer._refill(pending)")
+    lines.append("                pending, size = [], 0")
+    lines.append("            yield from scan(False)")
+    lines.append("        if lexer is not None:")
+    lines.append("            if pending:")
+    lines.append("                lexer._refill(pending)")
+    lines.append("            yield from scan(True)")
+    lines.append("")
+    lines.append("    def _refill(self, chunks):")
+    lines.append("        \"\"\"stream 用：丢掉已消费的部分，把 chunks 接在未消费的尾部之后作为新缓冲区。\"\"\"")
+    lines.append("        # 新缓冲区从 self.pos 开始，它的开头行列号由上一块的换行索引算出")
+    lines.append("        self.line, self.col = self.index.line_col(self.pos)")
+    lines.append("        self.text = self.text[self.pos:] + self.text[:0].join(chunks)")
+    lines.append("        self.pos = 0")
+    lines.append("")
+    lines.append("    @classmethod")
+    lines.append("    def from_path(cls, path):")
+    lines.append("        \"\"\"mmap 整个文件并按 UTF-8 字节扫描，省去读入和解码整个文件。\"\"\"")
+    lines.append("        import mmap")
+    lines.append("        with open(path, 'rb') as f:")
+    lines.append("            try:")
+    lines.append("                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))")
+    lines.append("            except ValueError:      # 空文件不能 mmap")
+    lines.append("                return cls(b'')")
+    lines.append("")
+    lines.extend(PARALLEL_METHODS.splitlines())
+    lines.extend(RELEX_METHOD.splitlines())
+    return lines
+
+# 并行扫描单个大文件：块首（换行之后）投机扫描，拼接时在块边界上验证同步，不同步处串行重扫
+PARALLEL_METHODS = '''\
+    @classmethod
+    def _lex_chunk(cls, path, start, stop):
+        """parallel_spans 的 worker：从 start 起投机扫描到第一个不小于 stop 的 token 边界，返回 (kinds, starts, ends, 停下的位置)。"""
+        lexer = cls.from_path(path)
+        lexer.pos = start
+        offset_code = 'I' if len(lexer.text) < 1 << 32 else 'Q'
+        out = (array('H'), array(offset_code), array(offset_code))
+        try:
+            lexer._spans_bytes(stop, out)
+        except SyntaxError:
+            pass    # 块首可能落在 token 中间；停下处之后由 parallel_spans 串行重扫，真正的错误在那里报告
+        return (*out, lexer.pos)
+
+    @classmethod
+    def parallel_spans(cls, path, workers=None, min_chunk=1 << 20):
+        """
+        多进程扫描单个大文件，结果与 from_path(path).tokenize_spans() 相同。
+        文件在换行处切成至多 workers 块（每块至少 min_chunk 字节），各块在 worker 进程中从块首按 token 起点投机扫描；
+        本进程按顺序拼接：已确定的扫描位置 pos 恰是该块某个 token 的起点时，之后两边的扫描完全相同，直接接上该块其余的 token；
+        否则（块首落在跨行的注释、字符串中间，或 pos 处是跳过的 token）从 pos 串行重扫到该块下一个 token 起点再比较。
+        worker 进程按模块名找到 Lexer，生成的 lexer 须是可 import 的模块。
+        """
+        import os
+        from bisect import bisect_left
+        from concurrent.futures import ProcessPoolExecutor
+        lexer = cls.from_path(path)
+        text = lexer.text
+        n = len(text)
+        count = max(1, min(workers or os.cpu_count() or 1, n // max(min_chunk, 1)))
+        bounds = [0]
+        for k in range(1, count):
+            cut = text.find(b'\\n', k * n // count) + 1
+            if bounds[-1] < cut < n:
+                bounds.append(cut)
+        if len(bounds) == 1:
+            return lexer.tokenize_spans()
+        bounds.append(n)
+        offset_code = 'I' if n < 1 << 32 else 'Q'
+        out = kinds, starts, ends = array('H'), array(offset_code), array(offset_code)
+        with ProcessPoolExecutor(len(bounds) - 1) as pool:
+            chunks = pool.map(cls._lex_chunk, [path] * (len(bounds) - 1), bounds[:-1], bounds[1:])
+            for stop, (chunk_kinds, chunk_starts, chunk_ends, chunk_end) in zip(bounds[1:], chunks):
+                while lexer.pos < stop:
+                    k = bisect_left(chunk_starts, lexer.pos)
+                    if k == len(chunk_starts):
+                        lexer._spans_bytes(stop, out)
+                    elif chunk_starts[k] == lexer.pos:
+                        kinds.extend(chunk_kinds[k:])
+                        starts.extend(chunk_starts[k:])
+                        ends.extend(chunk_ends[k:])
+                        lexer.pos = chunk_end
+                        lexer._spans_bytes(stop, out)     # worker 因出错提前停下时从出错处接着扫
+                    else:
+                        lexer._spans_bytes(chunk_starts[k], out)
+        return TokenSpans(text, kinds, starts, ends)
+
+'''
+
+# 编辑后的增量重扫：从不受编辑影响的 token 边界开始，扫到与旧 token 流重新同步为止
+RELEX_METHOD = '''\
+    @classmethod
+    def relex(cls, spans, offset, deleted, inserted):
+        """
+        增量重扫：spans 是编辑前的文本 spans.text 的 tokenize_spans 结果，编辑把 [offset, offset + deleted) 换成 inserted。
+        结束位置早于 offset - MAX_LOOKAHEAD（bytes 输入为 BYTE_MAX_LOOKAHEAD）的旧 token 不会读到被编辑的字符，
+        原样保留，从最后一个这样的 token 结束处重扫（前瞻为 None 时从头重扫）；越过编辑处后一旦停在某个旧 token 平移后的起点，之后的原文相同，扫描也相同，
+        其余旧 token 平移后直接接上。
+        返回 (新的 TokenSpans, (first, old_stop, new_stop))：旧 token [first, old_stop) 被新 token [first, new_stop) 取代。
+        """
+        from bisect import bisect_left
+        text = spans.text
+        if not 0 <= offset <= offset + deleted <= len(text):
+            raise ValueError(f"edit [{offset}, {offset + deleted}) is outside the text (length {len(text)})")
+        new_text = text[:offset] + inserted + text[offset + deleted:]
+        delta = len(inserted) - deleted
+        old_kinds, old_starts, old_ends = spans.kinds, spans.starts, spans.ends
+        lookahead = cls.MAX_LOOKAHEAD if isinstance(text, str) else cls.BYTE_MAX_LOOKAHEAD
+        first = bisect_left(old_ends, offset - lookahead) if lookahead is not None else 0
+        lexer = cls(new_text)
+        lexer.pos = old_ends[first - 1] if first else 0
+        scan = lexer._spans if isinstance(new_text, str) else lexer._spans_bytes
+        offset_code = 'I' if len(new_text) < 1 << 32 else 'Q'
+        kinds, starts, ends = out = array('H'), array(offset_code), array(offset_code)
+        stop = bisect_left(old_starts, offset + deleted)
+
+        def resync(pos):
+            # 下一个要追赶的旧 token 平移后的起点；正好停在上面（或旧 token 已用完且扫到了末尾）时返回 None
+            nonlocal stop
+            stop = bisect_left(old_starts, pos - delta, stop)
+            if stop == len(old_starts):
+                return len(new_text) if pos < len(new_text) else None
+            target = old_starts[stop] + delta
+            return target if target != pos else None
+
+        # 整个追赶过程是一次扫描（见 _spans 的 resync），不按旧 token 逐个重新进入扫描方法
+        target = resync(lexer.pos)
+        if target is not None:
+            scan(target, out, resync)
+
+        def splice(old, new, shift):
+            tail = old[stop:] if not shift else map(shift.__add__, old[stop:])
+            return array(new.typecode, old[:first]) + new + array(new.typecode, tail)
+        result = TokenSpans(new_text, splice(old_kinds, kinds, 0), splice(old_starts, starts, delta),
+                            splice(old_ends, ends, delta))
+        return result, (first, stop, first + len(kinds))
+'''
+
+CLASS_TABLE = '''class ClassTable(dict):
+    """
+    字符（或码位）-> 类 ID 的两级表：Latin-1 范围内的键直接在表中；其余字符首次查到时在 starts 上二分查找所在区间
+    （ids 为各区间的类 ID），结果记入表中，之后同一字符直接命中。
+    以码位为键时也用作 str.translate 的映射表：扫描前一次 C 层调用把整个缓冲区换成类 ID 串
+    （再 encode 成 bytes，按下标取到 int），匹配循环不再逐字符查表。
+    """
+    def __init__(self, items, starts, ids):
+        dict.__init__(self, items)
+        self.starts = starts
+        self.ids = ids
+
+    def __missing__(self, key):
+        cid = self.ids[bisect_right(self.starts, key if isinstance(key, int) else ord(key)) - 1]
+        self[key] = cid
+        return cid
+'''
+
+def class_of_lines(classes):
+    """CLASS_OF：Latin-1 范围内的字符 -> 类 ID（两级表的第一级，也是 BYTE_CLASS 的来源）。"""
+    lines = ["CLASS_OF = {"]
+    for cid, ranges in enumerate(classes):
+        for code in ranges_codes(ranges_clip(ranges, LATIN1)):
+            lines.append(f"    {chr(code)!r}: {cid},")
     lines.append("}")
-    lines.append("for i in range(" + str(len(dfa_states)) + "):")
-    lines.append("    if i not in TRANS: TRANS[i] = {}")
+    return lines
+
+def wide_class_index(classes, other):
+    """
+    ClassTable 的第二级：class_index 中 Latin-1 以上的部分，前面补一个 [0, LATIN1) -> other 的占位区间
+    （Latin-1 字符不在第一级表中就是不属于任何类）。不属于任何类的区间记为 other，相邻同类区间合并。
+    """
+    starts, ids = class_index(classes)
+    k = bisect_right(starts, LATIN1) - 1
+    wide_starts, wide_ids = [0], [other]
+    for start, cid in zip([LATIN1] + starts[k + 1:], ids[k:]):
+        cid = other if cid is None else cid
+        if cid != wide_ids[-1]:
+            wide_starts.append(start)
+            wide_ids.append(cid)
+    return wide_starts, wide_ids
+
+def class_range_lines(classes, other, name="CLASS"):
+    starts, ids = wide_class_index(classes, other)
+    return [
+        f"# 码位 >= {LATIN1:#x} 的字符按 {name}_STARTS（区间起点）二分查找，{name}_IDS 为对应区间的类 ID",
+        f"{name}_STARTS = {starts!r}",
+        f"{name}_IDS = {ids!r}",
+        "",
+    ]
+
+def self_loop_runs(dfa_states, classes=None):
+    """
+    返回 {状态: 自环字符的区间元组}。停在状态 s 上时，连续的自环字符都转移回 s，
+    可以用一次预编译的 re 匹配（C 层循环）整段吃掉。dfa_states 的转移键为类 ID 时传入 classes。
+    """
+    runs = {}
+    for state, trans in enumerate(dfa_states):
+        loops = [classes[key] if classes is not None else chars_ranges(key) for key, to in trans.items() if to == state]
+        if loops:
+            runs[state] = ranges_union(*loops)
+    return runs
+
+def run_lines(runs, memo_states=(), byte_runs=None, byte_memo_states=()):
+    """
+    自环加速表。匹配循环只在走过一步自环之后才调用 RUNS[state]，
+    单字符的标识符、空白等短 token 不付 re 调用的开销，注释、长标识符则几乎不再按字符循环。
+    memo_states 中的状态要逐字符记录 (状态, 位置)（见 memo_lines），模式为空串，不整段吃掉。
+    byte_runs / byte_memo_states 是 bytes 输入的字节自动机（见 ast_utf8）上的同一组信息，
+    BYTE_RUN_PATTERNS 中非 ASCII 字节写成 \\xhh，模式本身只含 ASCII（与 RUN_PATTERNS 相同时直接共用）。
+    """
+    def patterns(runs, memo_states):
+        return {state: "" if state in memo_states else ast_to_re(('chars', ranges)) + '*'
+                for state, ranges in sorted(runs.items())}
+
+    lines = []
+    lines.append("import re")
+    lines.append("")
+    lines.append("# 自环加速：状态 -> 该状态自环字符的连续段，匹配时走过一步自环后用一次 re 匹配整段吃掉")
+    str_patterns = patterns(runs, memo_states)
+    byte_patterns = patterns(byte_runs, byte_memo_states) if byte_runs is not None else str_patterns
+    for name, table in (("RUN_PATTERNS", str_patterns), ("BYTE_RUN_PATTERNS", byte_patterns)):
+        if table is byte_patterns and byte_patterns == str_patterns:
+            lines.append("BYTE_RUN_PATTERNS = RUN_PATTERNS")
+            continue
+        lines.append(f"{name} = {{")
+        for state, pattern in table.items():
+            lines.append(f"    {state}: {pattern!r},")
+        lines.append("}")
+    lines.append("RUNS = {state: re.compile(p).match for state, p in RUN_PATTERNS.items()}")
+    lines.append("BYTE_RUNS = {state: re.compile(p.encode('ascii')).match for state, p in BYTE_RUN_PATTERNS.items()}")
+    lines.append("")
+    return lines
+
+def backtrack_states(dfa_states, accept_map):
+    """
+    接受之后还能到达的非接受状态。扫描经过它们却走不到新的接受时要回退到上次接受处，
+    下一个 token 从那里重新扫描同一段字符，病态输入下总时间是平方级；为空时最长匹配天然是线性的。
+    """
+    seen = set()
+    stack = [to for state in accept_map for to in dfa_states[state].values()]
+    while stack:
+        state = stack.pop()
+        if state not in seen:
+            seen.add(state)
+            stack.extend(dfa_states[state].values())
+    return {state for state in seen if state not in accept_map}
+
+def max_lookahead(dfa_states, accept_map):
+    """
+    最长匹配在 token 结束之后最多还会读入几个字符：从接受状态出发、只经过回退状态（见 backtrack_states）的最长路径边数，
+    之后再看一个字符就停下。token [start, end) 因此只取决于 text[start : end + 前瞻 + 1]。
+    回退状态之间有环（如 "/" 与未闭合的 "/* ..."）时没有上界，返回 None。
+    """
+    back = backtrack_states(dfa_states, accept_map)
+    succ = {state: {to for to in dfa_states[state].values() if to in back} for state in back}
+    indegree = {state: 0 for state in back}
+    for tos in succ.values():
+        for to in tos:
+            indegree[to] += 1
+    order = [state for state, d in indegree.items() if d == 0]
+    for state in order:
+        for to in succ[state]:
+            indegree[to] -= 1
+            if indegree[to] == 0:
+                order.append(to)
+    if len(order) < len(back):
+        return None
+    depth = {}
+    for state in reversed(order):
+        depth[state] = max((1 + depth[to] for to in succ[state]), default=0)
+    return max((1 + depth[to] for state in accept_map for to in dfa_states[state].values() if to in back), default=0)
+
+def memo_lines(memo_states, nstates, prefix=""):
+    """
+    线性时间最长匹配（Reps 的备忘法）。扫描在最后一次接受之后经过回退状态（见 backtrack_states）的
+    (状态, 位置) 从此不可能再接受，记入本次扫描共用的 failed；之后的 token 再走到同一 (状态, 位置) 时立即停下。
+    每个 (状态, 位置) 至多失败一次，重扫总量因此是线性的。键为 位置 * NSTATES + 状态。
+    prefix 为 "BYTE_" 时是 bytes 输入的字节自动机的同一组表（见 ast_utf8）。
+    """
+    if not memo_states:
+        return []
+    return [
+        f"# 线性时间最长匹配：在这些状态上记录 / 检查失败的 (状态, 位置)，键为 位置 * {prefix}NSTATES + 状态",
+        f"{prefix}MEMO_STATES = frozenset({sorted(memo_states)!r})",
+        f"{prefix}NSTATES = {nstates}",
+        "",
+    ]
+
+def memo_check_lines(state, prefix=""):
+    """到达回退状态 state 时：已知失败则停下，否则记入本次匹配的 trail。"""
+    return [
+        f"key = i * {prefix}NSTATES + {state}",
+        "if key in failed:",
+        "    break",
+        "trail.append(key)",
+    ]
+
+def memo_record_lines(start, prefix=""):
+    """匹配结束：trail 中位于最后一次接受之后的 (状态, 位置) 都是失败的。"""
+    return [
+        "if trail:",
+        f"    failed.update(key for key in trail if key >= ({start} + last_len + 1) * {prefix}NSTATES)",
+    ]
+
+def row_exceptions(dfa_states, nclasses):
+    """
+    缺省行 + 例外表（rows="compact"）：每个状态选一个缺省行，只保留与它不同的 {类 ID: 后继}。
+    缺省行取该状态最常去的后继状态 d 的完整行：标识符的各个关键字前缀状态在绝大多数类上转到标识符状态，
+    和标识符状态的行只差几个字母；不如全 -1 的空行例外少时取空行。
+    返回 (templates, template_of, exceptions)：templates[0] 是空行，其余是被选作缺省行的完整行，
+    template_of[state] 是 state 的缺省行在 templates 中的下标。
+    """
+    rows = [[trans.get(cid, -1) for cid in range(nclasses)] for trans in dfa_states]
+    templates, index = [[-1] * nclasses], {}
+    template_of, exceptions = [], []
+    for row in rows:
+        exception = {cid: to for cid, to in enumerate(row) if to >= 0}
+        counts = {}
+        for to in row:
+            if to >= 0:
+                counts[to] = counts.get(to, 0) + 1
+        t = 0
+        if counts:
+            d = max(counts, key=counts.get)
+            closer = {cid: to for cid, (to, default) in enumerate(zip(row, rows[d])) if to != default}
+            if len(closer) < len(exception):
+                if d not in index:
+                    index[d] = len(templates)
+                    templates.append(rows[d])
+                t, exception = index[d], closer
+        template_of.append(t)
+        exceptions.append(exception)
+    return templates, template_of, exceptions
+
+def comb_vector(exceptions, nclasses):
+    """
+    梳状向量：把各行的例外按位移 base[state] 叠放进同一个 next 数组，check 记录每一格属于哪个状态（-1 为空格）。
+    查表 k = base[state] + cid，check[k] == state 时后继为 next[k]，否则查该行的缺省行，仍是常数次下标访问。
+    例外多的行先放，每行从最低的空格开始首次适配。返回 (base, check, next)，check / next 至少补到 max(base) + nclasses。
+    """
+    base = [0] * len(exceptions)
+    check, nxt = [], []
+    free = 0        # free 之前的格都已占用
+    for state in sorted(range(len(exceptions)), key=lambda s: -len(exceptions[s])):
+        row = exceptions[state]
+        if not row:
+            continue
+        first = min(row)
+        b = max(free - first, 0)
+        while any(b + cid < len(check) and check[b + cid] >= 0 for cid in row):
+            b += 1
+            while b + first < len(check) and check[b + first] >= 0:
+                b += 1
+        base[state] = b
+        end = b + max(row) + 1
+        if end > len(check):
+            check.extend([-1] * (end - len(check)))
+            nxt.extend([-1] * (end - len(nxt)))
+        for cid, to in row.items():
+            check[b + cid] = state
+            nxt[b + cid] = to
+        while free < len(check) and check[free] >= 0:
+            free += 1
+    size = max(base, default=0) + nclasses
+    check.extend([-1] * (size - len(check)))
+    nxt.extend([-1] * (size - len(nxt)))
+    return base, check, nxt
+
+ROW_TABLE = '''class RowTable(dict):
+    """
+    state -> {键: 后继状态}（rows="compact"）：首次查到 state 时由缺省行 templates[template_of[state]]
+    和例外 exceptions[state] 在 pairs（[(键, 类 ID)]）上展开成完整的一行并记入表中，只展开扫描中用到的状态。
+    """
+    def __init__(self, pairs, templates, template_of, exceptions):
+        dict.__init__(self)
+        self.pairs = pairs
+        self.templates = templates
+        self.template_of = template_of
+        self.exceptions = exceptions
+
+    def __missing__(self, state):
+        template, exceptions = self.templates[self.template_of[state]], self.exceptions[state]
+        row = {}
+        for key, cid in self.pairs:
+            to = exceptions.get(cid, template[cid])
+            if to >= 0:
+                row[key] = to
+        self[state] = row
+        return row
+'''
+
+def row_exception_lines(dfa_states, nclasses, prefix=""):
+    """rows="compact" 的缺省行 + 例外表（见 row_exceptions），prefix 为 "BYTE_" 时是字节自动机的表。"""
+    templates, template_of, exceptions = row_exceptions(dfa_states, nclasses)
+    lines = []
+    lines.append(f"# 缺省行 + 例外：state 在类 cid 上的后继为 {prefix}EXCEPTIONS[state].get(cid, "
+                 f"{prefix}TEMPLATES[{prefix}TEMPLATE_OF[state]][cid])，-1 为无转移")
+    lines.append(f"{prefix}TEMPLATES = [")
+    for row in templates:
+        lines.append(f"    {row!r},")
+    lines.append("]")
+    lines.append(f"{prefix}TEMPLATE_OF = {template_of!r}")
+    lines.append(f"{prefix}EXCEPTIONS = [")
+    for row in exceptions:
+        lines.append(f"    {row!r},")
+    lines.append("]")
+    lines.append("")
+    return lines
+
+def byte_class_lines(byte_classes):
+    """BYTE_CLASS：字节值 -> 字节自动机的类 ID（见 ast_utf8），不属于任何类的字节为 BYTE_OTHER。"""
+    other = len(byte_classes)
+    byte_class = [other] * 256
+    for cid, ranges in enumerate(byte_classes):
+        for code in ranges_codes(ranges):
+            byte_class[code] = cid
+    return [
+        "# 字节值 -> 类 ID（bytes / mmap 输入用，按 UTF-8 字节驱动字节自动机）",
+        f"BYTE_OTHER = {other}",
+        f"BYTE_CLASS = {byte_class!r}",
+        "",
+    ]
+
+def byte_dfa_info(byte_dfa, memo_states):
+    """
+    byte_dfa 为 (字节自动机的 dfa_states, accept_map, classes)。返回其自环表和需要备忘的回退状态：
+    码位自动机需要备忘（memo_states 非空，见 memo_lines）时字节自动机的回退状态也都备忘，
+    否则字节自动机的回退只发生在多字节字符内部，回退距离不超过 3 个字节，不必备忘。
+    """
+    byte_states, byte_accept, byte_classes = byte_dfa
+    byte_memo = backtrack_states(byte_states, byte_accept) if memo_states else set()
+    return self_loop_runs(byte_states, byte_classes), byte_memo
+
+def generate_lexer(dfa_states, accept_map, classes, byte_dfa, token_names, keywords, skip_kinds, memo_states=(),
+                   rows="full", lookahead=(None, None), instrument=False):
+    """
+    按字符查表：TRANS[state] 是 {字符: 后继状态}，只含 Latin-1 范围的字符（见 expand_classes）。
+    其余字符在 TRANS 中查不到时交给 wide_step：二分查找所属的类，在 WIDE_TRANS 中有转移则记入 TRANS[state]。
+    bytes / mmap 输入查 BYTE_TRANS[state]（{字节值: 后继状态}），它是字节自动机 byte_dfa 的表（见 ast_utf8），
+    状态号、BYTE_ACCEPT、BYTE_RUNS 和备忘表都与 str 输入的自动机分开。
+    rows="compact" 时不输出展开后的字典，只输出 CLASS_OF 和每行的缺省行 + 例外（见 row_exceptions），
+    TRANS / BYTE_TRANS 是 RowTable，扫描中第一次用到某个状态时才展开该行，之后的查表与 "full" 相同。
+    instrument 为真时另外生成插桩的 Lexer.profile（见 ScanProfile），tokenize 等方法不变。
+    """
+    kind_of = {name: k for k, name in enumerate(token_names)}
+    byte_states, byte_accept, byte_classes = byte_dfa
+    byte_runs, byte_memo = byte_dfa_info(byte_dfa, memo_states)
+    wide_cids = {cid for cid, ranges in enumerate(classes) if ranges[-1][1] >= LATIN1}
+    wide_trans = {state: {cid: to for cid, to in trans.items() if cid in wide_cids}
+                  for state, trans in enumerate(dfa_states)}
+    wide_trans = {state: row for state, row in wide_trans.items() if row}
+    miss = "char not in row and (char < '\\u0100' or not wide_step(state, char))" if wide_trans \
+        else "char not in row"
+    lines = []
+    lines.append("import sys")
+    lines.extend(token_class_lines(token_names, keywords, skip_kinds, instrument))
+    lines.extend(run_lines(self_loop_runs(dfa_states, classes), memo_states, byte_runs, byte_memo))
+    lines.extend(memo_lines(memo_states, len(dfa_states)))
+    lines.extend(memo_lines(byte_memo, len(byte_states), "BYTE_"))
+    memo_step = ["elif state in memo:"] + ["    " + l for l in memo_check_lines("state")] if memo_states else []
+    memo_setup = ["failed, memo = set(), MEMO_STATES"] if memo_states else []
+    memo_start = ["trail = []"] if memo_states else []
+    memo_end = memo_record_lines("self.pos") if memo_states else []
+    byte_memo_step = ["elif state in memo:"] + ["    " + l for l in memo_check_lines("state", "BYTE_")] \
+        if byte_memo else []
+    byte_memo_setup = ["failed, memo = set(), BYTE_MEMO_STATES"] if byte_memo else []
+    byte_memo_start = ["trail = []"] if byte_memo else []
+    byte_memo_end = memo_record_lines("self.pos", "BYTE_") if byte_memo else []
+    lines.append("class Lexer:")
+    lines.append("    def __init__(self, text):")
+    lines.append("        self.text = text")
+    lines.append("        self.pos = 0")
+    lines.append("        self.line = 1")
+    lines.append("        self.col = 1")
     lines.append("")
+    match = [
+        "state = 0",
+        "last_accept = None",
+        "last_len = 0",
+        "current_len = 0",
+        "i = self.pos",
+        *memo_start,
+        "",
+        "while i < len(self.text):",
+        "    char = self.text[i]",
+        "    row = TRANS[state]",
+        f"    if {miss}:",
+        "        break",
+        "    next_state = row[char]",
+        "    current_len += 1",
+        "    i += 1",
+        "    if next_state == state:",
+        "        i = RUNS[state](self.text, i).end()",
+        "        current_len = i - self.pos",
+        "    state = next_state",
+        "    if state in ACCEPT:",
+        "        last_accept = ACCEPT[state]",
+        "        last_len = current_len",
+        *("    " + l for l in memo_step),
+        *memo_end,
+        "scan_end = i",
+    ]
+    byte_match = [
+        "state = 0",
+        "last_accept = None",
+        "last_len = 0",
+        "i = self.pos",
+        *byte_memo_start,
+        "",
+        "while i < n:",
+        "    byte = text[i]",
+        "    row = trans[state]",
+        "    if byte not in row:",
+        "        break",
+        "    next_state = row[byte]",
+        "    i += 1",
+        "    if next_state == state:",
+        "        i = BYTE_RUNS[state](text, i).end()",
+        "    state = next_state",
+        "    if state in accept:",
+        "        last_accept = accept[state]",
+        "        last_len = i - self.pos",
+        *("    " + l for l in byte_memo_step),
+        *byte_memo_end,
+        "scan_end = i",
+    ]
+    profile = (count_visits(match), count_visits(byte_match)) if instrument else None
+    lines.extend(tokenize_lines(match, memo_setup, byte_match, [
+        "text = self.text",
+        "trans, accept = BYTE_TRANS, BYTE_ACCEPT",
+        *byte_memo_setup,
+    ], keywords, lookahead, profile))
+
+    lines.extend(byte_class_lines(byte_classes))
+    if rows == "compact":
+        lines.extend(class_of_lines(classes))
+        lines.append("")
+        lines.extend(row_exception_lines(dfa_states, len(classes)))
+        lines.extend(row_exception_lines(byte_states, len(byte_classes), "BYTE_"))
+        lines.append(ROW_TABLE)
+        lines.append("TRANS = RowTable(list(CLASS_OF.items()), TEMPLATES, TEMPLATE_OF, EXCEPTIONS)")
+        lines.append("BYTE_TRANS = RowTable([(byte, cid) for byte, cid in enumerate(BYTE_CLASS) if cid != BYTE_OTHER],")
+        lines.append("                      BYTE_TEMPLATES, BYTE_TEMPLATE_OF, BYTE_EXCEPTIONS)")
+        lines.append("")
+    else:
+        lines.append("TRANS = {")
+        for i, trans in enumerate(expand_classes(dfa_states, classes)):
+            if not trans: continue
+            lines.append(f"    {i}: {{")
+            for ch, to in trans.items():
+                lines.append(f"        {repr(ch)}: {to},")
+            lines.append("    },")
+        lines.append("}")
+        lines.append("for i in range(" + str(len(dfa_states)) + "):")
+        lines.append("    if i not in TRANS: TRANS[i] = {}")
+        lines.append("# 字节自动机：状态 -> {字节值: 后继状态}")
+        lines.append("BYTE_TRANS = {")
+        for i, trans in enumerate(byte_states):
+            row = {code: to for cid, to in trans.items() for code in ranges_codes(byte_classes[cid])}
+            lines.append(f"    {i}: {dict(sorted(row.items()))!r},")
+        lines.append("}")
+        lines.append("")
+    if wide_trans:
+        lines.extend(class_range_lines(classes, None))
+        lines.append("# 状态 -> {含非 Latin-1 字符的类 ID: 后继状态}")
+        lines.append(f"WIDE_TRANS = {wide_trans!r}")
+        lines.append("")
+        lines.append("def wide_step(state, char):")
+        lines.append("    \"\"\"码位 >= 0x100 的字符：state 在它所属的类上有转移时记入 TRANS[state]（之后直接命中），返回是否有转移。\"\"\"")
+        lines.append("    to = WIDE_TRANS.get(state, {}).get(CLASS_IDS[bisect_right(CLASS_STARTS, ord(char)) - 1])")
+        lines.append("    if to is None:")
+        lines.append("        return False")
+        lines.append("    TRANS[state][char] = to")
+        lines.append("    return True")
+        lines.append("")
     lines.append("ACCEPT = {")
     for k, v in accept_map.items():
-        lines.append(f"    {k}: {repr(v)},")
+        lines.append(f"    {k}: {kind_of[v]},  # {v}")
     lines.append("}")
+    lines.append(f"BYTE_ACCEPT = {{{', '.join(f'{k}: {kind_of[v]}' for k, v in sorted(byte_accept.items()))}}}")
+
+    return "\n".join(lines)
+
+def generate_flat_lexer(dfa_states, accept_map, classes, byte_dfa, token_names, keywords, skip_kinds, memo_states=(),
+                        rows="full", lookahead=(None, None), instrument=False):
+    """
+    扁平整数表：TABLE 按行主序存放，下标为 state * NCLASSES + cid，-1 表示无转移。
+    CLASS_TRANS 把码位映射到类 ID（两级表，见 CLASS_TABLE），不属于任何类的字符落到最后一个全 -1 的"其他"类，
+    ACCEPT_ID[state] 为接受的 token 种类号（-1 表示非接受），内层循环每个字符只做一次表查找，
+    走到自环时其余的自环字符交给 RUNS 整段吃掉。
+    str 输入在类 ID 能放进一个字节时（nclasses <= 256）先用 CLASS_TRANS 整体翻译成类 ID 串，
+    循环内只按下标取类 ID；bytes 输入按字节值查 BYTE_CLASS 列表，走字节自动机 byte_dfa 的 BYTE_TABLE（见 ast_utf8）。
+    rows="compact" 时 TABLE 换成梳状向量 BASE / CHECK / NEXT（见 comb_vector）加缺省行：例外之外的类查 DENSE 中
+    从 FALLBACK[state] 开始的缺省行（见 row_exceptions）。表的大小约为例外数加缺省行数乘类数，每个字符多两三次下标访问。
+    """
+    nclasses = len(classes) + 1
+    translate = nclasses <= 256
+    kind_of = {name: k for k, name in enumerate(token_names)}
+    compact = rows == "compact"
+    byte_states, byte_accept, byte_classes = byte_dfa
+    byte_runs, byte_memo = byte_dfa_info(byte_dfa, memo_states)
+
+    def step(cid):
+        if compact:
+            return [f"    cid = {cid}",
+                    "    k = base[state] + cid",
+                    "    next_state = nxt[k] if check[k] == state else dense[fallback[state] + cid]"]
+        return [f"    next_state = table[state * nclasses + {cid}]"]
+
+    def tables(prefix):
+        if compact:
+            return f"base, check, nxt, dense, fallback = {', '.join(prefix + t for t in ('BASE', 'CHECK', 'NEXT', 'DENSE', 'FALLBACK'))}"
+        return f"table, nclasses = {prefix}TABLE, {prefix}NCLASSES"
+
+    def table_lines(states, accepts, ncls, prefix=""):
+        lines = []
+        if compact:
+            templates, template_of, exceptions = row_exceptions(states, ncls)
+            base, check, nxt = comb_vector(exceptions, ncls)
+            lines.append(f"# 梳状向量：k = {prefix}BASE[state] + cid，{prefix}CHECK[k] == state 时后继为 {prefix}NEXT[k]，"
+                         f"否则为 {prefix}DENSE[{prefix}FALLBACK[state] + cid]")
+            lines.append(f"{prefix}BASE = {base!r}")
+            lines.append(f"{prefix}CHECK = {check!r}")
+            lines.append(f"{prefix}NEXT = {nxt!r}")
+            lines.append(f"{prefix}DENSE = [")
+            for row in templates:
+                lines.append("    " + ", ".join(map(str, row)) + ",")
+            lines.append("]")
+            lines.append(f"{prefix}FALLBACK = {[t * ncls for t in template_of]!r}")
+        else:
+            lines.append(f"{prefix}TABLE = [")
+            for trans in states:
+                row = [trans.get(cid, -1) for cid in range(ncls)]
+                lines.append("    " + ", ".join(map(str, row)) + ",")
+            lines.append("]")
+        lines.append("")
+        accept_ids = [kind_of[accepts[s]] if s in accepts else -1 for s in range(len(states))]
+        lines.append(f"{prefix}ACCEPT_ID = {accept_ids!r}")
+        return lines
+
+    lines = []
+    lines.append("import sys")
+    lines.extend(token_class_lines(token_names, keywords, skip_kinds, instrument))
+    lines.extend(run_lines(self_loop_runs(dfa_states, classes), memo_states, byte_runs, byte_memo))
+    lines.extend(memo_lines(memo_states, len(dfa_states)))
+    lines.extend(memo_lines(byte_memo, len(byte_states), "BYTE_"))
+    memo_step = ["elif state in memo:"] + ["    " + l for l in memo_check_lines("state")] if memo_states else []
+    memo_setup = ["failed, memo = set(), MEMO_STATES"] if memo_states else []
+    memo_start = ["trail = []"] if memo_states else []
+    memo_end = memo_record_lines("self.pos") if memo_states else []
+    byte_memo_step = ["elif state in memo:"] + ["    " + l for l in memo_check_lines("state", "BYTE_")] \
+        if byte_memo else []
+    byte_memo_setup = ["failed, memo = set(), BYTE_MEMO_STATES"] if byte_memo else []
+    byte_memo_start = ["trail = []"] if byte_memo else []
+    byte_memo_end = memo_record_lines("self.pos", "BYTE_") if byte_memo else []
+    lines.append("class Lexer:")
+    lines.append("    def __init__(self, text):")
+    lines.append("        self.text = text")
+    lines.append("        self.pos = 0")
+    lines.append("        self.line = 1")
+    lines.append("        self.col = 1")
+    lines.append("")
+    match = [
+        "state = 0",
+        "accept_id = -1",
+        "last_len = 0",
+        "i = self.pos",
+        *memo_start,
+        "",
+        "while i < n:",
+        *step("class_ids[i]" if translate else "class_of(ord(text[i]))"),
+        "    if next_state < 0:",
+        "        break",
+        "    i += 1",
+        "    if next_state == state:",
+        "        i = runs[state](text, i).end()",
+        "    state = next_state",
+        "    if accept[state] >= 0:",
+        "        accept_id = accept[state]",
+        "        last_len = i - self.pos",
+        *("    " + l for l in memo_step),
+        "last_accept = accept_id if accept_id >= 0 else None",
+        *memo_end,
+        "scan_end = i",
+    ]
+    byte_match = [
+        "state = 0",
+        "accept_id = -1",
+        "last_len = 0",
+        "i = self.pos",
+        *byte_memo_start,
+        "",
+        "while i < n:",
+        *step("byte_class[text[i]]"),
+        "    if next_state < 0:",
+        "        break",
+        "    i += 1",
+        "    if next_state == state:",
+        "        i = runs[state](text, i).end()",
+        "    state = next_state",
+        "    if accept[state] >= 0:",
+        "        accept_id = accept[state]",
+        "        last_len = i - self.pos",
+        *("    " + l for l in byte_memo_step),
+        "last_accept = accept_id if accept_id >= 0 else None",
+        *byte_memo_end,
+        "scan_end = i",
+    ]
+    profile = (count_visits(match), count_visits(byte_match)) if instrument else None
+    lines.extend(tokenize_lines(match, [
+        "text = self.text",
+        tables(""),
+        "accept, class_of, runs = ACCEPT_ID, CLASS_TRANS.__getitem__, RUNS",
+        *(["class_ids = text.translate(CLASS_TRANS).encode('latin-1')"] if translate else []),
+        *memo_setup,
+    ], byte_match, [
+        "text = self.text",
+        tables("BYTE_"),
+        "accept, byte_class, runs = BYTE_ACCEPT_ID, BYTE_CLASS, BYTE_RUNS",
+        *byte_memo_setup,
+    ], keywords, lookahead, profile))
+
+    lines.append(f"NCLASSES = {nclasses}")
+    lines.append(f"OTHER = {nclasses - 1}")
+    lines.append("")
+    lines.extend(class_of_lines(classes))
+    lines.append("")
+    lines.append(f"BYTE_NCLASSES = {len(byte_classes) + 1}")
+    lines.extend(byte_class_lines(byte_classes))
+    lines.extend(class_range_lines(classes, nclasses - 1))
+    lines.append(CLASS_TABLE)
+    lines.append("CLASS_TRANS = ClassTable(((ord(_ch), _cid) for _ch, _cid in CLASS_OF.items()), CLASS_STARTS, CLASS_IDS)")
+    lines.append("")
+    lines.extend(table_lines(dfa_states, accept_map, nclasses))
+    lines.extend(table_lines(byte_states, byte_accept, len(byte_classes) + 1, "BYTE_"))
+
+    return "\n".join(lines)
+
+# 二进制表文件布局（本机字节序）：头部之后依次为 CLASS_MAP、ROW_OF、ACCEPT_ID、ROWS、RANGE_STARTS、RANGE_IDS、
+# TOKEN_NAMES，每段按 8 字节对齐。ROWS 只存放去重后的行，ROW_OF[state] 给出 state 使用的行号；
+# CLASS_MAP 是 Latin-1 码位 -> 类 ID，RANGE_STARTS / RANGE_IDS 是其余码位的区间表（见 wide_class_index）。
+# 表文件中先是 str 输入的码位自动机，按 8 字节对齐后紧跟同样布局的 bytes 输入的字节自动机（见 ast_utf8）
+TABLE_MAGIC = b"LXT3"
+TABLE_HEADER = "=4sccxxIIIIIII"  # magic, ROWS 类型码, ROW_OF 类型码, 字节序标记, nstates, nclasses, nrows, class_map_len, nranges, names_len
+TABLE_BYTEORDER_MARK = 0x01020304
+
+def _pad8(blob):
+    return blob + b"\0" * (-len(blob) % 8)
+
+def pack_tables(dfa_states, accept_map, classes, token_names):
+    """把类 ID 上的 DFA 打包成二进制表（bytes）。相同的行只存一份，ACCEPT_ID 存 token 种类号。"""
+    nclasses = len(classes) + 1
+    other = nclasses - 1
+    kind_of = {name: k for k, name in enumerate(token_names)}
+
+    class_map = array('H', [other] * LATIN1)
+    for cid, ranges in enumerate(classes):
+        for code in ranges_codes(ranges_clip(ranges, LATIN1)):
+            class_map[code] = cid
+    range_starts, range_ids = wide_class_index(classes, other)
+
+    row_ids = {}
+    rows = []
+    row_of = []
+    for trans in dfa_states:
+        row = tuple(trans.get(cid, -1) for cid in range(nclasses))
+        if row not in row_ids:
+            row_ids[row] = len(row_ids)
+            rows.extend(row)
+        row_of.append(row_ids[row])
+
+    state_code = 'h' if len(dfa_states) < 0x7fff else 'i'
+    row_code = 'H' if len(row_ids) < 0xffff else 'I'
+    names = "\n".join(token_names).encode("utf-8")
+    header = struct.pack(TABLE_HEADER, TABLE_MAGIC, state_code.encode(), row_code.encode(),
+                         TABLE_BYTEORDER_MARK, len(dfa_states), nclasses, len(row_ids), len(class_map),
+                         len(range_starts), len(names))
+    accept_ids = array('h', [kind_of[accept_map[s]] if s in accept_map else -1 for s in range(len(dfa_states))])
+    return b"".join([
+        _pad8(header),
+        _pad8(class_map.tobytes()),
+        _pad8(array(row_code, row_of).tobytes()),
+        _pad8(accept_ids.tobytes()),
+        _pad8(array(state_code, rows).tobytes()),
+        _pad8(array('I', range_starts).tobytes()),
+        _pad8(array('H', range_ids).tobytes()),
+        names,
+    ])
+
+BINARY_LOADER = '''
+_TABLES = None
+
+def _unpack_tables(view, offset):
+    """从 offset 起解析一个自动机的各段（不拷贝），返回 (表元组, 其后 8 字节对齐的偏移)。"""
+    magic, state_code, row_code, mark, nstates, nclasses, nrows, map_len, nranges, names_len = \\
+        struct.unpack_from(TABLE_HEADER, view, offset)
+    if magic != TABLE_MAGIC or mark != TABLE_BYTEORDER_MARK:
+        raise ValueError(f"{TABLE_FILE} is not a lexer table file for this byte order")
+    state_code, row_code = state_code.decode(), row_code.decode()
+    sections = []
+    for code, count in ((None, struct.calcsize(TABLE_HEADER)), ("H", map_len), (row_code, nstates),
+                        ("h", nstates), (state_code, nrows * nclasses), ("I", nranges), ("H", nranges)):
+        size = count * (struct.calcsize(code) if code else 1)
+        if code:
+            sections.append(view[offset:offset + size].cast(code))
+        offset += size + (-size % 8)
+    names = bytes(view[offset:offset + names_len]).decode("utf-8").split("\\n")
+    if names != TOKEN_NAMES:
+        raise ValueError(f"{TABLE_FILE} was built with a different token numbering")
+    class_map, row_of, accept_id, rows, range_starts, range_ids = sections
+    other = nclasses - 1
+    trans = ClassTable(((code, cid) for code, cid in enumerate(class_map) if cid != other), range_starts, range_ids)
+    return (class_map, row_of, accept_id, rows, names, nclasses, other, trans), offset + names_len + (-names_len % 8)
+
+def _load_tables():
+    """首次使用时 mmap 表文件，各段直接以 memoryview.cast 视图访问。返回 (str 输入的表, bytes 输入的表)。"""
+    global _TABLES
+    if _TABLES is None:
+        with open(TABLE_FILE, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        str_tables, offset = _unpack_tables(view, 0)
+        byte_tables, _ = _unpack_tables(view, offset)
+        _TABLES = (str_tables, byte_tables)
+    return _TABLES
+'''
+
+def generate_binary_lexer(table_file, token_names, keywords, skip_kinds, runs, byte_dfa, memo_states=(), nstates=0,
+                          nclasses=0, lookahead=(None, None), instrument=False):
+    """
+    二进制表后端的 lexer.py：只含 Token / Lexer 和加载器，转移表放在同目录的 table_file 中（见 pack_tables），
+    首次调用 tokenize 时才 mmap，import 本身几乎没有开销。
+    runs / memo_states 与表文件出自同一个 DFA（nstates 个状态、nclasses 个类），写在 lexer.py 中；
+    nclasses <= 256 时 str 输入先整体翻译成类 ID 串（见 CLASS_TABLE）。
+    byte_dfa 是表文件中 bytes 输入的字节自动机（见 ast_utf8），它的自环表和备忘表同样写在 lexer.py 中。
+    """
+    byte_runs, byte_memo = byte_dfa_info(byte_dfa, memo_states)
+    translate = 0 < nclasses <= 256
+    lines = []
+    lines.append("import os")
+    lines.append("import mmap")
+    lines.append("import struct")
+    lines.append("import sys")
+    lines.append("")
+    lines.append(f"TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), {table_file!r})")
+    lines.append(f"TABLE_MAGIC = {TABLE_MAGIC!r}")
+    lines.append(f"TABLE_HEADER = {TABLE_HEADER!r}")
+    lines.append(f"TABLE_BYTEORDER_MARK = {TABLE_BYTEORDER_MARK:#x}")
+    lines.extend(token_class_lines(token_names, keywords, skip_kinds, instrument))
+    lines.extend(run_lines(runs, memo_states, byte_runs, byte_memo))
+    lines.extend(memo_lines(memo_states, nstates))
+    lines.extend(memo_lines(byte_memo, len(byte_dfa[0]), "BYTE_"))
+    memo_step = ["elif state in memo:"] + ["    " + l for l in memo_check_lines("state")] if memo_states else []
+    memo_setup = ["failed, memo = set(), MEMO_STATES"] if memo_states else []
+    memo_start = ["trail = []"] if memo_states else []
+    memo_end = memo_record_lines("self.pos") if memo_states else []
+    byte_memo_step = ["elif state in memo:"] + ["    " + l for l in memo_check_lines("state", "BYTE_")] \
+        if byte_memo else []
+    byte_memo_setup = ["failed, memo = set(), BYTE_MEMO_STATES"] if byte_memo else []
+    byte_memo_start = ["trail = []"] if byte_memo else []
+    byte_memo_end = memo_record_lines("self.pos", "BYTE_") if byte_memo else []
+    lines.append("class Lexer:")
+    lines.append("    def __init__(self, text):")
+    lines.append("        self.text = text")
+    lines.append("        self.pos = 0")
+    lines.append("        self.line = 1")
+    lines.append("        self.col = 1")
+    lines.append("")
+    match = [
+        "state = 0",
+        "accept_id = -1",
+        "last_len = 0",
+        "i = self.pos",
+        *memo_start,
+        "",
+        "while i < n:",
+        *(["    next_state = rows[row_of[state] * nclasses + class_ids[i]]"] if translate else [
+        "    code = ord(text[i])",
+        "    next_state = rows[row_of[state] * nclasses + (class_map[code] if code < map_len else trans[code])]"]),
+        "    if next_state < 0:",
+        "        break",
+        "    i += 1",
+        "    if next_state == state:",
+        "        i = runs[state](text, i).end()",
+        "    state = next_state",
+        "    if accept[state] >= 0:",
+        "        accept_id = accept[state]",
+        "        last_len = i - self.pos",
+        *("    " + l for l in memo_step),
+        "last_accept = accept_id if accept_id >= 0 else None",
+        *memo_end,
+        "scan_end = i",
+    ]
+    byte_match = [
+        "state = 0",
+        "accept_id = -1",
+        "last_len = 0",
+        "i = self.pos",
+        *byte_memo_start,
+        "",
+        "while i < n:",
+        "    next_state = rows[row_of[state] * nclasses + class_map[text[i]]]",
+        "    if next_state < 0:",
+        "        break",
+        "    i += 1",
+        "    if next_state == state:",
+        "        i = runs[state](text, i).end()",
+        "    state = next_state",
+        "    if accept[state] >= 0:",
+        "        accept_id = accept[state]",
+        "        last_len = i - self.pos",
+        *("    " + l for l in byte_memo_step),
+        "last_accept = accept_id if accept_id >= 0 else None",
+        *byte_memo_end,
+        "scan_end = i",
+    ]
+    profile = (count_visits(match), count_visits(byte_match)) if instrument else None
+    lines.extend(tokenize_lines(match, [
+        "text = self.text",
+        "class_map, row_of, accept, rows, names, nclasses, other, trans = _load_tables()[0]",
+        "map_len = len(class_map)",
+        "runs = RUNS",
+        *(["class_ids = text.translate(trans).encode('latin-1')"] if translate else []),
+        *memo_setup,
+    ], byte_match, [
+        "text = self.text",
+        "class_map, row_of, accept, rows, names, nclasses, other, trans = _load_tables()[1]",
+        "runs = BYTE_RUNS",
+        *byte_memo_setup,
+    ], keywords, lookahead, profile))
+    lines.append(CLASS_TABLE)
+    lines.append(BINARY_LOADER)
+    return "\n".join(lines)
+
+def char_test(ranges, var="c", byte_mode=False):
+    """
+    生成判断 var 是否属于区间集合 ranges 的表达式：少量连续长区间用比较链，补集很小（如 '.'、[^"]）时
+    用字符串不包含，其余用字符串包含；很大的区间总是用比较链，不展开成字符串。
+    byte_mode 为真时 var 是字节值（int），比较对象相应改为整数和 bytes 字面量（ranges 是字节自动机的字节区间）。
+    """
+    lit = (lambda code: code) if byte_mode else (lambda code: repr(chr(code)))
+    if ranges_size(ranges) == 1:
+        return f"{var} == {lit(ranges[0][0])}"
+    if len(ranges) <= 3 and all(hi - lo >= 2 for lo, hi in ranges):
+        return " or ".join(f"{lit(lo)} <= {var} <= {lit(hi)}" for lo, hi in ranges)
+    rest = ranges_complement(ranges)
+    rest = ranges_clip(rest, LATIN1) if byte_mode else rest
+    if ranges_size(rest) <= 16:
+        rest = "".join(chr(code) for code in ranges_codes(rest))
+        return f"{var} not in {rest.encode('latin-1') if byte_mode else rest!r}"
+    small = "".join(chr(code) for lo, hi in ranges if hi - lo < 64 for code in range(lo, hi + 1))
+    tests = [f"{var} in {small.encode('latin-1') if byte_mode else small!r}"] if small else []
+    tests += [f"{lit(lo)} <= {var} <= {lit(hi)}" for lo, hi in ranges if hi - lo >= 64]
+    return " or ".join(tests)
+
+def state_block_lines(state, trans, accept_map, classes, kind_of, byte_mode=False, memo=False, inline=None):
+    """
+    单个 DFA 状态的直接代码：先吃掉自环字符，再内联记录接受，
+    最后按字符区间选择后继状态（找不到则结束本次匹配）。
+    memo 为真时是回退状态：先检查 / 记录 (状态, 位置)（见 memo_lines），自环逐字符走，每步都经过检查。
+    byte_mode 为真时 trans / classes 是字节自动机的（见 ast_utf8）。
+    inline 为 {后继状态: 该状态的代码}（见 fallthrough_states）：这些后继的代码直接接在分支里执行，不回到分派。
+    """
+    inline = inline or {}
+    targets = {}
+    for cid, to in trans.items():
+        targets.setdefault(to, []).extend(classes[cid])
+    targets = {to: ranges_of(pairs) for to, pairs in targets.items()}
+
+    lines = memo_check_lines(state, "BYTE_" if byte_mode else "") if memo else []
+    loop_chars = targets.pop(state, None) if not memo else None
+    if loop_chars:
+        # 第一个自环字符直接比较，确有连续段时才用 re 整段吃掉（见 run_lines）
+        test = char_test(loop_chars, "text[i]", byte_mode)
+        lines.append(f"if i < n and ({test}):" if " or " in test else f"if i < n and {test}:")
+        lines.append(f"    i = {'BYTE_RUNS' if byte_mode else 'RUNS'}[{state}](text, i + 1).end()")
+    if state in accept_map:
+        guard = "if i > start:" if state == 0 else None
+        if guard:
+            lines.append(guard)
+        pad = "    " if guard else ""
+        lines.append(f"{pad}last_accept = {kind_of[accept_map[state]]}  # {accept_map[state]}")
+        lines.append(f"{pad}last_len = i - start")
+    if not targets:
+        lines.append("break")
+        return lines
+
+    lines.append("if i >= n:")
+    lines.append("    break")
+    lines.append("c = text[i]")
+    branches = sorted(targets.items(), key=lambda item: -ranges_size(item[1]))
+    for k, (to, chars) in enumerate(branches):
+        lines.append(("if " if k == 0 else "elif ") + char_test(chars, "c", byte_mode) + ":")
+        lines.append(f"    state = {to}")
+        if inline:
+            lines.append("    i += 1")
+            lines.extend("    " + l for l in inline.get(to, ()))
+    lines.append("else:")
+    lines.append("    break")
+    if not inline:
+        lines.append("i += 1")
+    return lines
+
+FALLTHROUGH_DEPTH = 8   # 后继代码逐层嵌套在分支里，限制嵌套层数，避免生成的代码缩进过深
+
+def fallthrough_states(dfa_states, memo_states):
+    """
+    可以接在前驱分支里直接执行的状态 -> 它的前驱：除自环外只有一个前驱，不是起始状态，也不是回退状态
+    （回退状态的自环逐字符经过分派）。标识符体、多字符运算符、注释开头等直线状态因此不再每个字符都走一遍二分分派。
+    """
+    preds = {}
+    for state, trans in enumerate(dfa_states):
+        for to in set(trans.values()):
+            if to != state:
+                preds.setdefault(to, set()).add(state)
+    return {to: min(sources) for to, sources in preds.items()
+            if len(sources) == 1 and to != 0 and to not in memo_states}
+
+def dispatch_lines(states, blocks):
+    # 对状态号做二分 if 树，每个字符只需 O(log n) 次整数比较即可进入对应状态的代码
+    if len(states) == 1:
+        return blocks[states[0]]
+    mid = len(states) // 2
+    lines = [f"if state < {states[mid]}:"]
+    lines.extend("    " + l for l in dispatch_lines(states[:mid], blocks))
+    lines.append("else:")
+    lines.extend("    " + l for l in dispatch_lines(states[mid:], blocks))
+    return lines
+
+def generate_code_lexer(dfa_states, accept_map, classes, byte_dfa, token_names, keywords, skip_kinds, memo_states=(),
+                        lookahead=(None, None), instrument=False):
+    """
+    直接编码后端（re2c 风格）：DFA 不再是表，而是 _match 函数中的代码
+    （bytes 输入用字节自动机 byte_dfa 生成、按字节值比较的 _match_bytes，见 ast_utf8）。
+    Python 没有 goto，状态之间用 state 变量加二分分派衔接；只有一个前驱的直线后继直接嵌在前驱的分支里执行，
+    不回到分派（见 fallthrough_states）。
+    自环（标识符体、数字串、空白等）用预编译的 re 整段吃掉（见 run_lines），接受状态直接写成赋值。
+    注意：在 CPython 上它并不比 table 后端快——三种示例语言的 tokenize_spans 与 table 大致持平、有时更慢，
+    flat 后端仍是最快的；这个后端主要用来对照生成代码的形态。
+    """
+    kind_of = {name: k for k, name in enumerate(token_names)}
+    byte_runs, byte_memo = byte_dfa_info(byte_dfa, memo_states)
+    lines = []
+    lines.append("import sys")
+    lines.extend(token_class_lines(token_names, keywords, skip_kinds, instrument))
+    lines.extend(run_lines(self_loop_runs(dfa_states, classes), memo_states, byte_runs, byte_memo))
+    lines.extend(memo_lines(memo_states, len(dfa_states)))
+    lines.extend(memo_lines(byte_memo, len(byte_dfa[0]), "BYTE_"))
+    params = "text, start, n, failed" if memo_states else "text, start, n"
+    byte_params = "text, start, n, failed" if byte_memo else "text, start, n"
+    variants = [("_match", False, False), ("_match_bytes", True, False)]
+    if instrument:
+        # Lexer.profile 用的插桩副本，多一个 visits 参数（见 count_visits）
+        variants += [("_match_profile", False, True), ("_match_bytes_profile", True, True)]
+    for name, byte_mode, counted in variants:
+        states, accepts, cls, memo = byte_dfa + (byte_memo,) if byte_mode else \
+            (dfa_states, accept_map, classes, memo_states)
+        parent = fallthrough_states(states, memo)
+        inlined = set()
+
+        def block(s, depth=0):
+            inline = {}
+            if depth < FALLTHROUGH_DEPTH:
+                for to in sorted(set(states[s].values())):
+                    if parent.get(to) == s:
+                        inline[to] = block(to, depth + 1)
+                        inlined.add(to)
+            return state_block_lines(s, states[s], accepts, cls, kind_of, byte_mode, s in memo, inline)
+
+        blocks = {s: block(s) for s in range(len(states)) if s not in parent}
+        # 嵌套层数超过上限、或只在无法到达的环上的状态仍经分派进入
+        while len(blocks) + len(inlined) < len(states):
+            s = min(set(range(len(states))) - set(blocks) - inlined)
+            blocks[s] = block(s)
+        body = []
+        body.append("    i = start")
+        body.append("    last_accept = None")
+        body.append("    last_len = 0")
+        body.append("    state = 0")
+        if memo:
+            body.append("    trail = []")
+        body.append("    while True:")
+        body.extend("        " + l for l in dispatch_lines(sorted(blocks), blocks))
+        if memo:
+            body.extend("    " + l for l in memo_record_lines("start", "BYTE_" if byte_mode else ""))
+        body.append("    return last_accept, last_len, i")
+        head = byte_params if byte_mode else params
+        lines.append(f"def {name}({head}, visits):" if counted else f"def {name}({head}):")
+        lines.append("    \"\"\"从 start 起做最长匹配，返回 (token 种类号或 None, 长度, 扫描停下的位置)。\"\"\"")
+        lines.extend(count_visits(body) if counted else body)
+        lines.append("")
+    lines.append("class Lexer:")
+    lines.append("    def __init__(self, text):")
+    lines.append("        self.text = text")
+    lines.append("        self.pos = 0")
+    lines.append("        self.line = 1")
+    lines.append("        self.col = 1")
+    lines.append("")
+    args = "text, self.pos, n, failed" if memo_states else "text, self.pos, n"
+    byte_args = "text, self.pos, n, failed" if byte_memo else "text, self.pos, n"
+    memo_setup = ["failed = set()"] if memo_states else []
+    byte_memo_setup = ["failed = set()"] if byte_memo else []
+    profile = ([f"last_accept, last_len, scan_end = _match_profile({args}, visits)"],
+               [f"last_accept, last_len, scan_end = _match_bytes_profile({byte_args}, visits)"]) if instrument else None
+    lines.extend(tokenize_lines([
+        f"last_accept, last_len, scan_end = _match({args})",
+    ], [
+        "text = self.text",
+        *memo_setup,
+    ], [
+        f"last_accept, last_len, scan_end = _match_bytes({byte_args})",
+    ], [
+        "text = self.text",
+        *byte_memo_setup,
+    ], keywords, lookahead, profile))
+    return "\n".join(lines)
+
+LAZY_RUNTIME = '''
+_MISSING = object()
+
+def _mask(positions):
+    bits = 0
+    for p in positions:
+        bits |= 1 << p
+    return bits
+
+def _nfa_tables(step, start, accepts):
+    """位集 NFA 的运行时表：(STEP, START, ACCEPTS, ACCEPT_ANY)，str 输入与 bytes 输入各一份。"""
+    accepts = [(_mask(t), kind) for t, kind in accepts]
+    accept_any = 0
+    for m, _ in accepts:
+        accept_any |= m
+    return [{cid: _mask(t) for cid, t in row.items()} for row in step], _mask(start), accepts, accept_any
+
+TABLES = _nfa_tables(STEP, START, ACCEPTS)
+BYTE_TABLES = _nfa_tables(BYTE_STEP, BYTE_START, BYTE_ACCEPTS)
+
+def _move(step, bits, cid):
+    result = 0
+    digits = bin(bits)[:1:-1]
+    i = digits.find('1')
+    while i >= 0:
+        target = step[i].get(cid)
+        if target:
+            result |= target
+        i = digits.find('1', i + 1)
+    return result
+
+def _accept(accepts, accept_any, bits):
+    if bits & accept_any:
+        for mask, kind in accepts:
+            if bits & mask:
+                return kind
+    return None
+
+class _State:
+    __slots__ = ("bits", "accept", "next")
+
+    def __init__(self, bits, tables):
+        self.bits = bits
+        self.accept = _accept(tables[2], tables[3], bits)
+        self.next = {}      # cid -> _State 或 None（死状态）
+'''
+
+def generate_lazy_lexer(start, classes, byte_nfa, token_names, keywords, skip_kinds, cache_size=1024, thrash_ratio=10,
+                        lookahead=(None, None), instrument=False, memo=False):
+    """
+    惰性 DFA 词法分析器：只输出位集形式的 NFA（见 bitset_nfa），DFA 状态在扫描时按需构造并缓存。
+    缓存满时整体清空；若两次清空之间平均每个新状态只换来不到 thrash_ratio 个字符，
+    认为缓存在抖动，该 Lexer 之后改为直接做 NFA 模拟。
+    byte_nfa 为 bytes 输入的 (字节 NFA 的起始状态, 字节类)（见 ast_utf8），输出为 BYTE_STEP 等另一组表，
+    Lexer 按 text 的类型选用其中一组。
+    memo 为真时同样做线性时间最长匹配（见 memo_lines）：生成时不确定化，不知道哪些是回退状态，
+    于是在本次匹配已经接受过之后的非接受状态上记录 / 检查失败的 (NFA 状态集, 位置)。
+    键用状态集的位集而不是 _State，缓存清空、改用 NFA 模拟之后仍然有效。
+    """
+    kind_of = {name: k for k, name in enumerate(token_names)}
+
+    def positions(bits):
+        return tuple(iter_bits(bits))
+
+    lines = []
+    lines.append("import sys")
+    lines.append("")
+    lines.append(f"CACHE_SIZE = {cache_size}")
+    lines.append(f"THRASH_RATIO = {thrash_ratio}")
+    lines.extend(token_class_lines(token_names, keywords, skip_kinds, instrument))
+    lines.append("class Lexer:")
+    lines.append("    def __init__(self, text, cache_size=CACHE_SIZE):")
+    lines.append("        self.text = text")
+    lines.append("        self.pos = 0")
+    lines.append("        self.line = 1")
+    lines.append("        self.col = 1")
+    lines.append("        self.cache_size = cache_size")
+    lines.append("        self.cache = {}")
+    lines.append("        self.scanned = 0      # 自上次清空缓存以来扫描的字符数")
+    lines.append("        self.use_nfa = False")
+    lines.append("        if isinstance(text, str):")
+    lines.append("            self.tables, self.class_of = TABLES, CLASS_OF")
+    lines.append("        else:")
+    lines.append("            self.tables, self.class_of = BYTE_TABLES, BYTE_CLASS")
+    lines.append("        self.start = self._state(self.tables[1])")
+    lines.append("")
+    lines.append("    def _state(self, bits):")
+    lines.append("        st = self.cache.get(bits)")
+    lines.append("        if st is None:")
+    lines.append("            if len(self.cache) >= self.cache_size:")
+    lines.append("                self._flush()")
+    lines.append("            st = _State(bits, self.tables)")
+    lines.append("            self.cache[bits] = st")
+    lines.append("        return st")
+    lines.append("")
+    lines.append("    def _flush(self):")
+    lines.append("        if self.scanned < THRASH_RATIO * self.cache_size:")
+    lines.append("            self.use_nfa = True")
+    lines.append("        self.cache.clear()")
+    lines.append("        self.scanned = 0")
+    lines.append("        self.start = _State(self.tables[1], self.tables)")
+    lines.append("        self.cache[self.tables[1]] = self.start")
+    lines.append("")
+    params = "self, pos, failed" if memo else "self, pos"
+    # 接受之后的非接受状态可能要回退：已知失败则停下，否则记入 trail，匹配结束时最后一次接受之后的都记为失败
+    memo_step = [
+        "elif last_accept is not None:",
+        "    key = (bits, i)",
+        "    if key in failed:",
+        "        break",
+        "    trail.append(key)",
+    ] if memo else []
+    memo_end = [
+        "if trail:",
+        "    failed.update(key for key in trail if key[1] > pos + last_len)",
+    ] if memo else []
+    lines.append(f"    def _match_dfa({params}):")
+    lines.append("        text, class_of, step = self.text, self.class_of, self.tables[0]")
+    lines.append("        st = self.start")
+    lines.append("        last_accept = None")
+    lines.append("        last_len = 0")
+    lines.append("        i = pos")
+    if memo:
+        lines.append("        trail = []")
+    lines.append("        while i < len(text):")
+    lines.append("            cid = class_of[text[i]]")
+    lines.append("            nxt = st.next.get(cid, _MISSING)")
+    lines.append("            if nxt is _MISSING:")
+    lines.append("                bits = _move(step, st.bits, cid)")
+    lines.append("                nxt = self._state(bits) if bits else None")
+    lines.append("                st.next[cid] = nxt")
+    lines.append("            if nxt is None:")
+    lines.append("                break")
+    lines.append("            st = nxt")
+    lines.append("            i += 1")
+    lines.append("            if st.accept is not None:")
+    lines.append("                last_accept = st.accept")
+    lines.append("                last_len = i - pos")
+    lines.extend("            " + l for l in [l.replace("(bits, i)", "(st.bits, i)") for l in memo_step])
+    lines.extend("        " + l for l in memo_end)
+    lines.append("        self.scanned += i - pos")
+    lines.append("        return last_accept, last_len, i")
+    lines.append("")
+    lines.append(f"    def _match_nfa({params}):")
+    lines.append("        text, class_of = self.text, self.class_of")
+    lines.append("        step, bits, accepts, accept_any = self.tables")
+    lines.append("        last_accept = None")
+    lines.append("        last_len = 0")
+    lines.append("        i = pos")
+    if memo:
+        lines.append("        trail = []")
+    lines.append("        while i < len(text):")
+    lines.append("            bits = _move(step, bits, class_of[text[i]])")
+    lines.append("            if not bits:")
+    lines.append("                break")
+    lines.append("            i += 1")
+    lines.append("            if bits & accept_any:")
+    lines.append("                last_accept = _accept(accepts, accept_any, bits)")
+    lines.append("                last_len = i - pos")
+    lines.extend("            " + l for l in memo_step)
+    lines.extend("        " + l for l in memo_end)
+    lines.append("        return last_accept, last_len, i")
+    lines.append("")
+    args = "self.pos, failed" if memo else "self.pos"
+    match_lines = [
+        "if self.use_nfa:",
+        f"    last_accept, last_len, scan_end = self._match_nfa({args})",
+        "else:",
+        f"    last_accept, last_len, scan_end = self._match_dfa({args})",
+    ]
+    setup = ["failed = set()"] if memo else []
+    # 状态是按需构造的 _State，没有固定的状态号，profile 不记 visits
+    profile = (match_lines, match_lines) if instrument else None
+    lines.extend(tokenize_lines(match_lines, setup, match_lines, setup, keywords, lookahead, profile))
+
+    lines.append(f"OTHER = {len(classes)}    # 不属于任何类的字符，NFA 中没有它的边")
+    lines.extend(class_of_lines(classes))
+    lines.extend(class_range_lines(classes, len(classes)))
+    lines.append(CLASS_TABLE)
+    lines.append("CLASS_OF = ClassTable(CLASS_OF, CLASS_STARTS, CLASS_IDS)")
+    lines.append("")
+    byte_start, byte_classes = byte_nfa
+    lines.extend(byte_class_lines(byte_classes))
+    for prefix, nfa_start, cls in (("", start, classes), ("BYTE_", byte_start, byte_classes)):
+        out_edges, accepting, start_bits = bitset_nfa(nfa_start, cls)
+        lines.append("# NFA 状态 -> {类 ID: 目标 ε-闭包中的状态序号}")
+        lines.append(f"{prefix}STEP = [")
+        for edges in out_edges:
+            lines.append("    {" + ", ".join(f"{cid}: {positions(bits)!r}" for cid, bits in edges) + "},")
+        lines.append("]")
+        lines.append(f"{prefix}START = {positions(start_bits)!r}")
+        lines.append("# 按规则优先级排列的 (接受状态序号, token 种类号)")
+        lines.append(f"{prefix}ACCEPTS = [")
+        for i, acc in sorted(((i, acc) for i, acc in enumerate(accepting) if acc is not None), key=lambda x: x[1][0]):
+            lines.append(f"    (({i},), {kind_of[acc[1]]}),  # {acc[1]}")
+        lines.append("]")
+    lines.append(LAZY_RUNTIME)
 
     return "\n".join(lines)
 
 ###############################################################################
-# 6. LexBuilder 主逻辑
+# 7. re 主模式后端
+###############################################################################
+
+def ast_nullable(node):
+    kind = node[0]
+    if kind == 'chars':
+        return False
+    if kind == 'cat':
+        return ast_nullable(node[1]) and ast_nullable(node[2])
+    if kind == 'alt':
+        return ast_nullable(node[1]) or ast_nullable(node[2])
+    if kind == 'plus':
+        return ast_nullable(node[1])
+    return True
+
+RE_SPECIAL = set("\\.^$*+?{}[]()|-&~#")
+RE_CONTROL = {'\t': '\\t', '\n': '\\n', '\r': '\\r', '\x0b': '\\v', '\x0c': '\\f'}
+
+def re_escape(ch):
+    # 只转义 re 元字符、控制字符和非 ASCII 字符，让生成的主正则保持可读，且模式本身只含 ASCII（bytes 版本直接 encode）
+    if ch in RE_SPECIAL or ch == ' ':
+        return '\\' + ch
+    if ch in RE_CONTROL:
+        return RE_CONTROL[ch]
+    if not ch.isascii() or not ch.isprintable():
+        code = ord(ch)
+        return f"\\x{code:02x}" if code < 0x100 else f"\\u{code:04x}" if code < 0x10000 else f"\\U{code:08x}"
+    return ch
+
+def ast_to_re(node):
+    """正则 AST -> Python re 语法（内部分组一律非捕获）。bytes 模式的模式由 ast_utf8 转换后的 AST 生成。"""
+    kind = node[0]
+    if kind == 'chars':
+        ranges = node[1]
+        if not ranges:
+            return "[^\\s\\S]"    # 空集合：永不匹配
+        if ranges_size(ranges) == 1:
+            return re_escape(chr(ranges[0][0]))
+        return "[" + "".join(re_escape(chr(lo)) if lo == hi else f"{re_escape(chr(lo))}-{re_escape(chr(hi))}"
+                             for lo, hi in ranges) + "]"
+    if kind == 'empty':
+        return ""
+    if kind == 'cat':
+        return "".join(ast_to_re(child) if child[0] != 'alt' else f"(?:{ast_to_re(child)})"
+                       for child in node[1:])
+    if kind == 'alt':
+        return f"{ast_to_re(node[1])}|{ast_to_re(node[2])}"
+    op = {'star': '*', 'plus': '+', 'opt': '?'}[kind]
+    inner = ast_to_re(node[1])
+    if node[1][0] != 'chars':
+        inner = f"(?:{inner})"
+    return inner + op
+
+def ast_prefix_re(node):
+    """
+    node 语言中所有串的前缀（含空串和完整串）构成的正则。
+    流式扫描时，缓冲区剩余部分整体是某条规则的前缀，才说明扫描可能越过缓冲区末尾。
+    """
+    kind = node[0]
+    if kind == 'empty':
+        return ""
+    if kind == 'chars':
+        return f"{ast_to_re(node)}?"
+    if kind == 'cat':
+        return (f"(?:(?:{ast_to_re(node[1])})(?:{ast_prefix_re(node[2])})"
+                f"|{ast_prefix_re(node[1])})")
+    if kind == 'alt':
+        return f"(?:{ast_prefix_re(node[1])}|{ast_prefix_re(node[2])})"
+    if kind == 'opt':
+        return ast_prefix_re(node[1])
+    return f"(?:{ast_to_re(node[1])})*{ast_prefix_re(node[1])}"
+
+def sample_ast(node, rng):
+    """随机生成属于该正则语言的一个串（重复次数限制在 0~3），用于一致性检查的语料。"""
+    kind = node[0]
+    if kind == 'chars':
+        if not node[1]:
+            return ""
+        lo, hi = rng.choice(node[1])
+        return chr(rng.randint(lo, hi))
+    if kind == 'empty':
+        return ""
+    if kind == 'cat':
+        return sample_ast(node[1], rng) + sample_ast(node[2], rng)
+    if kind == 'alt':
+        return sample_ast(node[rng.randint(1, 2)], rng)
+    low = 1 if kind == 'plus' else 0
+    high = 1 if kind == 'opt' else 3
+    return "".join(sample_ast(node[1], rng) for _ in range(rng.randint(low, high)))
+
+def extension_rules(start, classes):
+    """
+    recheck[k] = 比 k 优先级低、且能把 k 的某个匹配继续延长成自己的匹配的规则集合。
+    在保留"全部接受规则"的子集 DFA 上计算：状态 S 接受 k 时，S 经 ≥1 步可达的状态所接受的规则都可能更长。
+    """
+    out_edges, accepting, start_bits = bitset_nfa(start, classes)
+    succ = []
+    accepts = []
+    dfa_map = {start_bits: 0}
+    stack = [start_bits]
+    order = [start_bits]
+    while stack:
+        current = stack.pop()
+        rules = 0
+        nxt = {}
+        for i in iter_bits(current):
+            if accepting[i] is not None:
+                rules |= 1 << accepting[i][0]
+            for cid, target in out_edges[i]:
+                nxt[cid] = nxt.get(cid, 0) | target
+        targets = set()
+        for key in nxt.values():
+            if key not in dfa_map:
+                dfa_map[key] = len(order)
+                order.append(key)
+                stack.append(key)
+            targets.add(dfa_map[key])
+        idx = dfa_map[current]
+        while len(succ) <= idx:
+            succ.append(())
+            accepts.append(0)
+        succ[idx] = tuple(targets)
+        accepts[idx] = rules
+
+    # later[S] = S 之后（≥1 步）可能接受的规则，迭代到不动点
+    later = [0] * len(succ)
+    changed = True
+    while changed:
+        changed = False
+        for s in range(len(succ)):
+            bits = later[s]
+            for t in succ[s]:
+                bits |= accepts[t] | later[t]
+            if bits != later[s]:
+                later[s] = bits
+                changed = True
+
+    recheck = {}
+    for s in range(len(succ)):
+        for k in iter_bits(accepts[s]):
+            longer = later[s] >> (k + 1) << (k + 1)
+            if longer:
+                recheck[k] = recheck.get(k, 0) | longer
+    return {k: tuple(iter_bits(bits)) for k, bits in recheck.items()}
+
+def epsilon_path_counts(state):
+    """state 经 ε 边到达的各状态 -> 路径条数，2 表示不少于 2 条（位于 ε 环上或在环之后的为无穷多条，也记 2）。"""
+    reach = epsilon_closure({state})
+    indegree = dict.fromkeys(reach, 0)
+    for s in reach:
+        for nxt in s.epsilon:
+            indegree[nxt] += 1
+    counts = dict.fromkeys(reach, 0)
+    counts[state] = 1
+    ready = [s for s in reach if not indegree[s]]
+    while ready:
+        s = ready.pop()
+        for nxt in s.epsilon:
+            counts[nxt] = min(2, counts[nxt] + counts[s])
+            indegree[nxt] -= 1
+            if not indegree[nxt]:
+                ready.append(nxt)
+    return {s: count if not indegree[s] else 2 for s, count in counts.items()}
+
+def ast_ambiguous(node):
+    """
+    node 的 Thompson NFA 上是否有两条不同的路径读同一个串到达同一状态（经过 ε 环的算无穷多条）。
+    re 回溯引擎匹配失败时会逐条重试这些路径，(a|aa)*b、(a+)+b 这类规则在病态输入上是指数级的；
+    没有这样的路径时，每个 (输入位置, NFA 状态) 至多经过一次。
+    """
+    nfa = thompson(node)
+    edges = {}      # 状态 -> [(区间元组, 目标, 路径条数)]：先走 ε 边再读一个字符
+    accepts = {}    # 状态 -> 经 ε 边到达接受状态的路径条数
+    stack = [nfa.start]
+    while stack:
+        state = stack.pop()
+        counts = epsilon_path_counts(state)
+        accepts[state] = counts.get(nfa.end, 0)
+        edges[state] = [(ranges, target, count) for s, count in counts.items()
+                        for ranges, targets in s.transitions.items() for target in targets]
+        stack.extend(target for _, target, _ in edges[state] if target not in edges)
+
+    def overlap(a, b):
+        return any(lo <= hi2 and lo2 <= hi for lo, hi in a for lo2, hi2 in b)
+
+    # 两条路径并行走：diverged 表示两条路径已经不同
+    seen = {(nfa.start, nfa.start, False)}
+    stack = list(seen)
+    while stack:
+        p, q, diverged = stack.pop()
+        if p is q and (diverged or accepts[p] > 1):
+            return True
+        for k, (ranges1, t1, count1) in enumerate(edges[p]):
+            for j, (ranges2, t2, count2) in enumerate(edges[q]):
+                if not overlap(ranges1, ranges2):
+                    continue
+                apart = diverged or k != j or count1 > 1     # 未分开时 p 就是 q
+                pair = (t1, t2, apart)
+                if pair not in seen:
+                    seen.add(pair)
+                    stack.append(pair)
+    return False
+
+def ast_first_chars(node):
+    kind = node[0]
+    if kind == 'chars':
+        return node[1]
+    if kind == 'empty':
+        return ()
+    if kind == 'cat':
+        first = ast_first_chars(node[1])
+        return ranges_union(first, ast_first_chars(node[2])) if ast_nullable(node[1]) else first
+    if kind == 'alt':
+        return ranges_union(ast_first_chars(node[1]), ast_first_chars(node[2]))
+    return ast_first_chars(node[1])
+
+def re_buckets(rule_asts):
+    """
+    按首字符分桶：每个桶是首字符集合包含该字符的规则序号元组（保持优先级顺序），
+    这样每个主正则只需在少数规则间做有序选择。首字符集合按区间划分（见 alphabet_partition），
+    返回 (bucket_ranges, buckets)：bucket_ranges[b] 为进入桶 b 的首字符区间元组。
+    """
+    firsts = [ast_first_chars(node) for _, node in rule_asts]
+    classes, first_classes = alphabet_partition(firsts)
+    rules_of = [[] for _ in classes]
+    for k, cids in enumerate(first_classes):
+        for cid in cids:
+            rules_of[cid].append(k)
+    bucket_ids = {}
+    bucket_ranges = []
+    for cid, rules in enumerate(rules_of):
+        bucket = bucket_ids.setdefault(tuple(rules), len(bucket_ids))
+        if bucket == len(bucket_ranges):
+            bucket_ranges.append(())
+        bucket_ranges[bucket] = ranges_union(bucket_ranges[bucket], classes[cid])
+    return bucket_ranges, sorted(bucket_ids, key=bucket_ids.get)
+
+def re_longest_match(masters, bucket_of, rule_patterns, recheck, text, pos):
+    """
+    主模式按优先级做有序选择，再对可能更长的低优先级规则逐个复查。返回 (规则序号或 None, 长度)。
+    有序选择返回 k 意味着比 k 优先级高的规则在此处都无法匹配，只有 recheck[k] 中的规则可能胜出。
+    """
+    starts, ids = bucket_of      # 桶的区间表（见 class_index）
+    bucket = ids[bisect_right(starts, ord(text[pos])) - 1]
+    if bucket is None:
+        return None, 0
+    master, rules = masters[bucket]
+    m = master.match(text, pos)
+    if m is None:
+        return None, 0
+    best = rules[m.lastindex - 1]
+    best_len = m.end() - pos
+    for j in recheck.get(best, ()):
+        mj = rule_patterns[j].match(text, pos)
+        if mj is not None and mj.end() - pos > best_len:
+            best, best_len = j, mj.end() - pos
+    return best, best_len
+
+def compile_masters(patterns, buckets):
+    return [(re.compile("|".join(f"({patterns[k]})" for k in rules)), rules) for rules in buckets]
+
+def dfa_longest_match(dfa_states, accept_map, class_of, text, pos):
+    starts, ids = class_of
+    state = 0
+    best = (None, 0)
+    i = pos
+    while i < len(text):
+        cid = ids[bisect_right(starts, ord(text[i])) - 1]
+        if cid is None or cid not in dfa_states[state]:
+            break
+        state = dfa_states[state][cid]
+        i += 1
+        if state in accept_map:
+            best = (accept_map[state], i - pos)
+    return best
+
+def check_re_conformance(rule_asts, patterns, buckets, bucket_ranges, recheck, dfa_states, accept_map, classes,
+                         corpus_size=2000, seed=0):
+    """
+    在生成的语料上逐位置比较 re 主模式与 DFA 的最长匹配结果，不一致时抛出 ValueError。
+    语料由各规则语言中随机抽取的串（共约 corpus_size 个，每条规则至少 5 个）拼接而成，
+    并混入字母表中的随机字符。
+    """
+    rng = random.Random(seed)
+    names = [name for name, _ in rule_asts]
+    masters = compile_masters(patterns, buckets)
+    bucket_of = class_index(bucket_ranges)
+    rule_patterns = [re.compile(p) for p in patterns]
+    class_of = class_index(classes)
+    # 每个类取一个代表字符，再加一个不属于任何类的字符（若有）
+    alphabet = [chr(ranges[0][0]) for ranges in classes]
+    alphabet += [chr(start) for start, cid in zip(*class_of) if cid is None][:1]
+
+    samples = max(5, corpus_size // max(1, len(rule_asts)))
+    pool = [sample_ast(node, rng) for _, node in rule_asts for _ in range(samples)]
+    corpus = []
+    for _ in range(len(pool)):
+        parts = [rng.choice(pool) for _ in range(rng.randint(1, 4))]
+        corpus.append("".join(p + (rng.choice(alphabet) if rng.random() < 0.3 else "") for p in parts))
+    for _ in range(len(pool) // 2 + 1):
+        corpus.append("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12))))
+
+    for text in corpus:
+        for pos in range(len(text)):
+            expected = dfa_longest_match(dfa_states, accept_map, class_of, text, pos)
+            k, length = re_longest_match(masters, bucket_of, rule_patterns, recheck, text, pos)
+            got = (names[k], length) if k is not None else (None, 0)
+            if got != expected:
+                raise ValueError(f"re backend disagrees with the DFA on {text[pos:]!r}: "
+                                 f"re matched {got}, DFA matched {expected}")
+
+def generate_re_lexer(patterns, byte_patterns, prefix, byte_prefix, names, buckets, bucket_ranges, byte_buckets,
+                      byte_bucket_ranges, recheck, token_names, keywords, skip_kinds, lookahead=(None, None),
+                      instrument=False):
+    """
+    re 主模式后端：按首字符分桶，每桶的规则按优先级组成一个有序选择的主正则，由 C 正则引擎匹配。
+    有序选择只保证"优先级最高的可匹配规则"，因此对 recheck 中可能匹配得更长的低优先级规则再逐个复查，
+    恢复最长匹配 + 规则优先级的语义（见 re_longest_match）。
+    re 无法报告扫描停在哪里，流式扫描改用 PREFIX（所有规则的前缀语言，见 ast_prefix_re）判断是否需要更多输入。
+    byte_patterns / byte_prefix / byte_buckets 是规则换成 UTF-8 字节序列（见 ast_utf8）后的同一组模式和按首字节的分桶，
+    bytes / mmap 输入首次扫描时才编译；规则的语言不变，RECHECK 两边共用。
+    """
+    lines = []
+    lines.append("import re")
+    lines.append("import sys")
+    lines.extend(token_class_lines(token_names, keywords, skip_kinds, instrument))
+    kind_of = {name: k for k, name in enumerate(token_names)}
+    lines.append("# 规则序号 -> token 种类号")
+    lines.append(f"RULE_KINDS = {[kind_of[name] for name in names]!r}")
+    for table_name, table in (("PATTERNS", patterns), ("BYTE_PATTERNS", byte_patterns)):
+        if table is byte_patterns and byte_patterns == patterns:
+            lines.append("BYTE_PATTERNS = PATTERNS")
+            continue
+        lines.append(f"{table_name} = [")
+        for k, p in enumerate(table):
+            lines.append(f"    {p!r},  # {k}: {names[k]}")
+        lines.append("]")
+    lines.append("# 桶号 -> 该桶内按优先级排列的规则序号")
+    lines.append("BUCKETS = [")
+    for rules in buckets:
+        lines.append(f"    {rules!r},")
+    lines.append("]")
+    lines.append("# 首字符 -> 桶号：Latin-1 字符查 BUCKET_OF，其余字符按区间二分查找（见 ClassTable），None 表示没有规则以它开头")
+    lines.append("BUCKET_OF = {")
+    latin1 = ((code, b) for b, ranges in enumerate(bucket_ranges) for code in ranges_codes(ranges_clip(ranges, LATIN1)))
+    for code, bucket in sorted(latin1):
+        lines.append(f"    {chr(code)!r}: {bucket},")
+    lines.append("}")
+    lines.extend(class_range_lines(bucket_ranges, None, "BUCKET"))
+    lines.append(CLASS_TABLE)
+    lines.append("BUCKET_TABLE = ClassTable(BUCKET_OF, BUCKET_STARTS, BUCKET_IDS)")
+    lines.append("# bytes 输入：桶号 -> 规则序号，首字节 -> 桶号")
+    lines.append("BYTE_BUCKETS = [")
+    for rules in byte_buckets:
+        lines.append(f"    {rules!r},")
+    lines.append("]")
+    byte_bucket_of = [None] * 256
+    for bucket, ranges in enumerate(byte_bucket_ranges):
+        for code in ranges_codes(ranges):
+            byte_bucket_of[code] = bucket
+    lines.append(f"BYTE_BUCKET_OF = {byte_bucket_of!r}")
+    lines.append("# 规则序号 -> 可能把它的匹配延长的低优先级规则")
+    lines.append(f"RECHECK = {dict(sorted(recheck.items()))!r}")
+    lines.append("")
+    lines.append("MASTERS = [(re.compile('|'.join(f'({PATTERNS[k]})' for k in rules)), rules) for rules in BUCKETS]")
+    lines.append("RULES = {j: re.compile(PATTERNS[j]) for js in RECHECK.values() for j in js}")
+    lines.append(f"PREFIX = re.compile({prefix!r})")
+    lines.append(f"BYTE_PREFIX_PATTERN = {byte_prefix!r}" if byte_prefix != prefix else "BYTE_PREFIX_PATTERN = PREFIX.pattern")
+    lines.append("")
+    lines.append("BYTE_MASTERS = None")
+    lines.append("")
+    lines.append("def _compile_bytes():")
+    lines.append("    \"\"\"首次扫描 bytes / mmap 输入时编译 bytes 版本的正则（模式只含 ASCII）。\"\"\"")
+    lines.append("    global BYTE_MASTERS, BYTE_RULES, BYTE_PREFIX")
+    lines.append("    if BYTE_MASTERS is None:")
+    lines.append("        BYTE_MASTERS = [(re.compile('|'.join(f'({BYTE_PATTERNS[k]})' for k in rules).encode('ascii')), rules)")
+    lines.append("                        for rules in BYTE_BUCKETS]")
+    lines.append("        BYTE_RULES = {j: re.compile(BYTE_PATTERNS[j].encode('ascii')) for j in RULES}")
+    lines.append("        BYTE_PREFIX = re.compile(BYTE_PREFIX_PATTERN.encode('ascii'))")
+    lines.append("")
+    for name, prefix_ in (("_match", ""), ("_match_bytes", "BYTE_")):
+        lines.append(f"def {name}(text, pos):")
+        lines.append(f"    bucket = {'BYTE_BUCKET_OF[text[pos]]' if prefix_ else 'BUCKET_TABLE[text[pos]]'}")
+        lines.append("    if bucket is None:")
+        lines.append("        return None, 0")
+        lines.append(f"    master, rules = {prefix_}MASTERS[bucket]")
+        lines.append("    m = master.match(text, pos)")
+        lines.append("    if m is None:")
+        lines.append("        return None, 0")
+        lines.append("    best = rules[m.lastindex - 1]")
+        lines.append("    best_len = m.end() - pos")
+        lines.append("    for j in RECHECK.get(best, ()):")
+        lines.append(f"        mj = {prefix_}RULES[j].match(text, pos)")
+        lines.append("        if mj is not None and mj.end() - pos > best_len:")
+        lines.append("            best, best_len = j, mj.end() - pos")
+        lines.append("    return RULE_KINDS[best], best_len")
+        lines.append("")
+    lines.append("class Lexer:")
+    lines.append("    def __init__(self, text):")
+    lines.append("        self.text = text")
+    lines.append("        self.pos = 0")
+    lines.append("        self.line = 1")
+    lines.append("        self.col = 1")
+    lines.append("")
+    match = [
+        "last_accept, last_len = _match(text, self.pos)",
+        "scan_end = n if not final and PREFIX.fullmatch(text, self.pos) else self.pos",
+    ]
+    byte_match = [
+        "last_accept, last_len = _match_bytes(text, self.pos)",
+        "scan_end = n if not final and BYTE_PREFIX.fullmatch(text, self.pos) else self.pos",
+    ]
+    # re 报告不了扫描停在哪里，profile 中 scan_end 不超过 token 结尾，回退距离记为 0
+    profile = (match, byte_match) if instrument else None
+    lines.extend(tokenize_lines(match, [
+        "text = self.text",
+    ], byte_match, [
+        "text = self.text",
+        "_compile_bytes()",
+    ], keywords, lookahead, profile))
+    return "\n".join(lines)
+
+###############################################################################
+# 8. token 种类号与关键字折叠
+###############################################################################
+
+def shared_token_names(rule_names, terminals=()):
+    """
+    给终结符分配稠密的 token 种类号：0 号固定为 '$'（输入结束），其后依次是 .lex 规则名（按文件顺序）
+    和文法中出现但 .lex 未定义的终结符。返回名字列表，下标即种类号。
+    """
+    names = ['$']
+    for name in list(rule_names) + sorted(terminals):
+        if name not in names:
+            names.append(name)
+    return names
+
+def tokens_module(token_names):
+    """生成 lexer.py 与 parser.py 共用的 tokens.py：每个 token 名对应一个整数常量，'$' 对应 EOF。"""
+    lines = []
+    lines.append('"""lexer.py 与 parser.py 共用的 token 种类号（由生成器输出，请勿手工修改）。名字只用于诊断。"""')
+    lines.append("")
+    lines.append(f"TOKEN_TABLE_HASH = {token_table_hash(token_names)!r}")
+    lines.append(f"NAMES = {list(token_names)!r}")
+    lines.append("KIND_OF = {name: kind for kind, name in enumerate(NAMES)}")
+    lines.append("")
+    lines.append("EOF = 0")
+    for kind, name in enumerate(token_names):
+        if kind and name.isidentifier() and not keyword.iskeyword(name) and name not in ("NAMES", "KIND_OF", "EOF", "TOKEN_TABLE_HASH"):
+            lines.append(f"{name} = {kind}")
+    lines.append("")
+    return "\n".join(lines)
+
+def ast_caseless(node):
+    """大小写不敏感：把每个字符集合补上其中 ASCII 字母的另一种大小写。大小写字母落入同一字符类，DFA 状态数不变。"""
+    kind = node[0]
+    if kind == 'chars':
+        letters = [chr(code) for lo, hi in node[1] for code in range(max(lo, ord('A')), min(hi, ord('z')) + 1)]
+        return ('chars', ranges_union(node[1], chars_ranges(ch.swapcase() for ch in letters if ch.isalpha())))
+    if kind == 'empty':
+        return node
+    return (kind,) + tuple(ast_caseless(child) for child in node[1:])
+
+def ast_word(node):
+    """node 是若干字符集合的连接时返回这些集合的列表（每个位置一个），否则返回 None。"""
+    kind = node[0]
+    if kind == 'chars':
+        return [node[1]]
+    if kind == 'cat':
+        left, right = ast_word(node[1]), ast_word(node[2])
+        return left + right if left is not None and right is not None else None
+    return None
+
+def keyword_form(positions):
+    """
+    判断 ast_word 的结果能否当关键字：每个位置都是单个 ASCII 字符时返回 (该串, False)；
+    字母位置都是同一字母的大小写两种、其余位置是单个字符时返回 (小写串, True)；否则返回 None。
+    """
+    if positions is None:
+        return None
+    word = []
+    exact = caseless = 0
+    for ranges in positions:
+        if ranges_size(ranges) > 2:
+            return None
+        chars = {chr(code) for code in ranges_codes(ranges)}
+        lower = {ch.lower() for ch in chars}
+        if len(chars) == 1 and chars <= set(string.printable):
+            word.append(next(iter(chars)))
+            exact += word[-1].isalpha()
+        elif len(chars) == 2 and len(lower) == 1 and chars <= set(string.ascii_letters):
+            word.append(lower.pop())
+            caseless += 1
+        else:
+            return None
+    if exact and caseless:
+        return None
+    return ''.join(word), bool(caseless)
+
+def rule_matcher(rule_asts):
+    """
+    把所有规则的 NFA 并在一个起点下（各规则的终态记下规则序号），只构造一次，返回 matches(positions, every=False)。
+    positions 是每个位置的候选字符集合（见 ast_word）。every 为假时返回至少完整匹配其描述的一个串的规则序号集合，
+    为真时返回匹配其中每个串的规则序号集合（按到达的 NFA 状态集合分组模拟，组数通常只有一两个）。
+    (状态集合, 码位) 的后继记入缓存：所有关键字共用起点，第一步之后状态集合只剩以该字符开头的少数规则，
+    每个关键字的代价约为 O(|word|) 次小集合上的转移，而不是每条规则各建一次 NFA。
+    """
+    start = NFAState()
+    end_of = {}
+    for index, (_, node) in enumerate(rule_asts):
+        nfa = thompson(node)
+        end_of[nfa.end] = index
+        start.epsilon.add(nfa.start)
+    cache = {}
+
+    def step(states, code):
+        key = (states, code)
+        if key not in cache:
+            cache[key] = frozenset(epsilon_closure(move(states, code)))
+        return cache[key]
+
+    def matches(positions, every=False):
+        configs = {frozenset(epsilon_closure({start}))}
+        for ranges in positions:
+            codes = list(ranges_codes(ranges))
+            if every:
+                configs = {step(states, code) for states in configs for code in codes}
+            else:
+                configs = {frozenset().union(*(step(states, code) for states in configs for code in codes))}
+        rules = [{end_of[st] for st in states if st in end_of} for states in configs]
+        return set.intersection(*rules) if every else set.union(*rules)
+
+    return matches
+
+def fold_keyword_rules(rule_asts, skip=()):
+    """
+    关键字折叠：固定串规则 K 若能被其后的非固定串规则 I（标识符）完整匹配，
+    且 K、I 之间没有别的规则也匹配该串，就把 K 移出 DFA，扫描时 I 的匹配结果再查表改判为 K。
+    I 与 K 在该串上匹配长度相同，最长匹配不变；等长时原本 K 胜出，折叠后 I 胜出再改判，结果一致。
+    大小写不敏感的关键字（见 ast_caseless）要求 I 匹配它的每种大小写写法、其他规则都不匹配任何一种，
+    按小写串登记，扫描时用 token 值的小写查表。skip 中的规则（跳过的 token）既不折叠，也不作为宿主 I：
+    跳过的 token 匹配后直接丢弃，不查关键字表，折叠进去的关键字会被一起丢掉。
+    返回 (保留的规则, {标识符规则名: ({关键字串: 关键字规则名}, {小写关键字串: 关键字规则名})})。
+    """
+    words = [ast_word(node) for _, node in rule_asts]
+    forms = [keyword_form(positions) for positions in words]
+    folded = set()
+    keywords = {}
+    matches = None
+    for k, form in enumerate(forms):
+        if not form or not form[0] or rule_asts[k][0] in skip:
+            continue
+        word, caseless = form
+        matches = matches or rule_matcher(rule_asts)
+        matching = sorted(matches(words[k]) - {k})
+        if not matching or matching[0] < k or forms[matching[0]] is not None or rule_asts[matching[0]][0] in skip:
+            continue
+        if caseless and matching[0] not in matches(words[k], every=True):
+            continue
+        tables = keywords.setdefault(rule_asts[matching[0]][0], ({}, {}))
+        tables[caseless].setdefault(word, rule_asts[k][0])
+        folded.add(k)
+    return [rule for k, rule in enumerate(rule_asts) if k not in folded], keywords
+
+###############################################################################
+# 9. LexBuilder 主逻辑
 ###############################################################################
 
 class LexBuilder:
-    def __init__(self, lex_rules_path: str):
+    STATE_SETS = ("bitset", "frozenset")
+    CONSTRUCTIONS = ("thompson", "direct")
+    BACKENDS = ("table", "flat", "binary", "code", "re", "lazy")
+    LINEAR = ("auto", "strict", "off")
+    ROWS = ("full", "compact")
+
+    def __init__(self, lex_rules_path: str, state_sets: str = "bitset", construction: str = "thompson",
+                 backend: str = "table", token_names=None, fold_keywords: bool = True, linear: str = "auto",
+                 rows: str = "full", instrument: bool = False):
+        """
+        state_sets:   Thompson 路径下子集构造的状态集合表示（"bitset" / "frozenset"）
+        construction: "thompson" 先建 NFA 再确定化；"direct" 由正则 AST 经 followpos 直接建 DFA
+        backend:      生成的 lexer 形式。"table" 输出按字符索引的 DFA 转移字典；
+                      "flat" 输出按 state * NCLASSES + class 索引的扁平整数表；
+                      "binary" 输出去重后的二进制表文件和按需 mmap 的薄加载器（需用 run() 写出）；
+                      "code" 把 DFA 直接输出为 Python 代码（每个状态一段按字符区间分支的代码）；
+                      "re" 输出基于单个编译主正则的 lexer，生成前在语料上验证与 DFA 一致，不一致则报错；
+                      "lazy" 输出 NFA，扫描时按需确定化（忽略 state_sets / construction）
+        token_names:  token 种类号表（下标即种类号，见 shared_token_names），与 parser.py 共用同一张表时传入；
+                      不传则 '$' 之后按规则文件顺序编号
+        fold_keywords: 把能被标识符规则完整匹配的关键字规则移出 DFA，扫描后查表改判（见 fold_keyword_rules）
+        linear:       最长匹配需要回退重扫时（见 backtrack_states）是否生成备忘失败 (状态, 位置) 的线性时间扫描：
+                      "auto" 对 table / flat / binary / code 后端按需生成，lazy 后端生成时不确定化，总是生成
+                      （re 后端不支持，照常生成）；"strict" 同 "auto"，但 re 后端遇到需要回退的规则集时报错；
+                      "off" 不生成。
+                      无论哪种模式，re 后端遇到回退距离没有上界（见 max_lookahead）或有歧义（见 ast_ambiguous）的
+                      规则时都报错：前者逐 token 重扫是平方级的，后者 re 回溯是指数级的
+        rows:         table / flat 后端转移表的编码。"full" 每个状态输出完整的一行；"compact" 每行只输出缺省行
+                      和与缺省行不同的例外（见 row_exceptions），table 后端扫描时按需展开，flat 后端叠放成梳状向量，
+                      状态多、行彼此相近（如不折叠关键字时标识符的各个前缀状态）时表和 import 时间都小得多；
+                      binary 后端的表已按行去重并 mmap，其余后端不用转移表，均忽略此项
+        instrument:   另外生成插桩的 Lexer.profile()，返回 ScanProfile：按 token 种类的个数、长度、回退距离，
+                      DFA 状态访问次数和扫描速度，to_json() 导出。插桩代码只在单独生成的 profile 方法中，
+                      关闭时生成的 lexer 与不带此项时完全相同
+        """
+        if state_sets not in self.STATE_SETS:
+            raise ValueError(f"Unknown state_sets mode '{state_sets}', expected one of {self.STATE_SETS}")
+        if construction not in self.CONSTRUCTIONS:
+            raise ValueError(f"Unknown construction '{construction}', expected one of {self.CONSTRUCTIONS}")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {self.BACKENDS}")
+        if linear not in self.LINEAR:
+            raise ValueError(f"Unknown linear mode '{linear}', expected one of {self.LINEAR}")
+        if rows not in self.ROWS:
+            raise ValueError(f"Unknown rows encoding '{rows}', expected one of {self.ROWS}")
         self.lex_rules_path = lex_rules_path
+        self.state_sets = state_sets
+        self.construction = construction
+        self.backend = backend
+        self.artifacts = {}     # build() 附带生成的其他文件：文件名 -> bytes / str
+        self.token_names = list(token_names) if token_names is not None else None
+        self.fold_keywords = fold_keywords
+        self.linear = linear
+        self.rows = rows
+        self.instrument = instrument
+        self.keywords = {}      # 折叠掉的关键字：标识符规则名 -> ({关键字串: 关键字规则名}, {小写关键字串: 关键字规则名})
+        self.directives = {}    # 规则文件中的 % 指令（见 parse_rules）
 
-    def build(self) -> str:
+    DIRECTIVES = ("caseless", "skip")
+
+    def parse_rules(self):
+        """
+        返回 [(规则名, 正则)]。以 % 开头的行是指令，记入 self.directives（指令名 -> 参数列表）：
+            %caseless             所有规则大小写不敏感
+            %caseless A B ...     只有规则 A、B ... 大小写不敏感
+            %skip A B ...         规则 A、B ... 匹配到的 token 直接丢弃（没有 %skip 时按 SKIP_NAMES 中的规则名）
+        """
         rules = []
+        self.directives = {}
         with open(self.lex_rules_path, encoding="utf-8") as f:
             for line in f:
                 line = line.strip()
                 if not line or line.startswith("#"):
                     continue
+                if line.startswith("%"):
+                    directive, *args = line[1:].split()
+                    if directive not in self.DIRECTIVES:
+                        raise ValueError(f"Unknown directive '%{directive}', expected one of {self.DIRECTIVES}")
+                    self.directives.setdefault(directive, []).append(args)
+                    continue
                 parts = line.split(None, 1)
                 if len(parts) == 2:
                     rules.append((parts[0], parts[1]))
+        return rules
 
-        start = NFAState()
-        for index, (name, regex) in enumerate(rules):
+    def rule_names(self):
+        return [name for name, _ in self.parse_rules()]
+
+    def resolve_token_names(self):
+        rule_names = self.rule_names()
+        if self.token_names is None:
+            return shared_token_names(rule_names)
+        if not self.token_names or self.token_names[0] != '$':
+            raise ValueError("token_names must start with '$' (kind 0)")
+        missing = [name for name in rule_names if name not in self.token_names]
+        if missing:
+            raise ValueError(f"token_names has no kind for rules: {', '.join(missing)}")
+        return self.token_names
+
+    def parse_asts(self, rules):
+        asts = []
+        for name, regex in rules:
             try:
-                parser = RegexParser(regex)
-                nfa = parser.parse()
-                nfa.end.accepting = (index, name)
-                start.epsilon.add(nfa.start)
+                asts.append((name, RegexParser(regex).parse_ast()))
             except Exception as e:
                 raise ValueError(f"Error parsing rule '{name}': {regex}\n{e}")
+        return asts
+
+    def caseless_rules(self, rule_names):
+        """%caseless 指定的大小写不敏感规则名集合。"""
+        caseless = set()
+        for args in self.directives.get("caseless", []):
+            unknown = [name for name in args if name not in rule_names]
+            if unknown:
+                raise ValueError(f"%caseless names unknown rules: {', '.join(unknown)}")
+            caseless.update(args or rule_names)
+        return caseless
+
+    def skip_rules(self, rule_names):
+        """%skip 指定的跳过规则名集合；规则文件没有 %skip 时取 SKIP_NAMES 中出现的规则。"""
+        if "skip" not in self.directives:
+            return {name for name in rule_names if name in SKIP_NAMES}
+        skip = set()
+        for args in self.directives["skip"]:
+            if not args:
+                raise ValueError("%skip needs at least one rule name")
+            unknown = [name for name in args if name not in rule_names]
+            if unknown:
+                raise ValueError(f"%skip names unknown rules: {', '.join(unknown)}")
+            skip.update(args)
+        return skip
+
+    def skip_kinds(self):
+        kind_of = {name: k for k, name in enumerate(self.token_names)}
+        return {kind_of[name] for name in self.skip_rules(self.rule_names())}
+
+    def lexer_asts(self):
+        """解析规则、对 %caseless 规则做大小写折叠并（按需）折叠关键字，返回进入自动机构造的 [(name, ast)]。"""
+        rule_asts = self.parse_asts(self.parse_rules())
+        caseless = self.caseless_rules([name for name, _ in rule_asts])
+        rule_asts = [(name, ast_caseless(node) if name in caseless else node) for name, node in rule_asts]
+        self.keywords = {}
+        if self.fold_keywords:
+            rule_asts, self.keywords = fold_keyword_rules(rule_asts, self.skip_rules([name for name, _ in rule_asts]))
+        return rule_asts
 
-        charset = set(string.printable)
-        dfa_states = []
-        dfa_map = {}
-        accept_map = {}
-
-        start_closure = epsilon_closure({start})
-        dfa_map[frozenset(start_closure)] = 0
-        dfa_states.append({})
-        stack = [start_closure]
-
-        while stack:
-            current = stack.pop()
-            idx = dfa_map[frozenset(current)]
-            
-            possible_accepts = [s.accepting for s in current if s.accepting is not None]
-            if possible_accepts:
-                best_match = min(possible_accepts, key=lambda x: x[0])
-                accept_map[idx] = best_match[1]
-
-            for ch in charset:
-                nxt = epsilon_closure(move(current, ch))
-                if not nxt: continue
-                key = frozenset(nxt)
-                if key not in dfa_map:
-                    dfa_map[key] = len(dfa_states)
-                    dfa_states.append({})
-                    stack.append(nxt)
-                dfa_states[idx][ch] = dfa_map[key]
+    def keyword_kinds(self):
+        kind_of = {name: k for k, name in enumerate(self.token_names)}
+        return {kind_of[ident]: tuple({word: kind_of[name] for word, name in table.items()} for table in tables)
+                for ident, tables in self.keywords.items()}
+
+    def build_nfa(self, rule_asts):
+        start = NFAState()
+        for index, (name, node) in enumerate(rule_asts):
+            nfa = thompson(node)
+            nfa.end.accepting = (index, name)
+            start.epsilon.add(nfa.start)
+        return start
+
+    def build_dfa(self):
+        """返回最小化后、以字符类 ID 为转移键的 (dfa_states, accept_map, classes)。"""
+        return self.construct_dfa(self.lexer_asts())
+
+    def construct_dfa(self, rule_asts):
+        """由 [(name, ast)] 构造最小化后的 DFA，返回值同 build_dfa。"""
+        if self.construction == "direct":
+            dfa_states, accept_map, classes = direct_dfa(rule_asts)
+        else:
+            start = self.build_nfa(rule_asts)
+            classes = alphabet_classes(collect_states(start))
+            if self.state_sets == "bitset":
+                dfa_states, accept_map = subset_construction_bitset(start, classes)
+            else:
+                dfa_states, accept_map = subset_construction(start, classes)
 
         dfa_states, accept_map = minimize_dfa(dfa_states, accept_map)
-        return generate_lexer(dfa_states, accept_map)
+        return dfa_states, accept_map, classes
+
+    @staticmethod
+    def byte_asts(rule_asts):
+        """bytes 输入的规则：字符集合换成等价的 UTF-8 字节序列（见 ast_utf8），字母表为 0~255。"""
+        return [(name, ast_utf8(node)) for name, node in rule_asts]
+
+    def memo_states(self, dfa_states, accept_map):
+        """需要备忘失败 (状态, 位置) 的回退状态（见 memo_lines）；linear="off" 时为空。"""
+        return backtrack_states(dfa_states, accept_map) if self.linear != "off" else set()
+
+    def build(self, table_file: str = "lexer.tables") -> str:
+        """返回 lexer.py 源码；binary 后端的表文件内容放入 self.artifacts[table_file]。"""
+        self.artifacts = {}
+        self.token_names = self.resolve_token_names()
+        if self.linear == "strict" and self.backend == "re" and self.memo_states(*self.build_dfa()[:2]):
+            raise ValueError(f"{self.backend} backend cannot guarantee linear-time matching: "
+                             f"these rules need backtracking, use a table / flat / binary / code / lazy backend")
+        if self.backend == "lazy":
+            # lazy 后端不在生成时确定化，前瞻长度未知（relex 从头重扫）
+            rule_asts = self.lexer_asts()
+            start = self.build_nfa(rule_asts)
+            classes = alphabet_classes(collect_states(start))
+            byte_start = self.build_nfa(self.byte_asts(rule_asts))
+            byte_nfa = (byte_start, alphabet_classes(collect_states(byte_start)))
+            return generate_lazy_lexer(start, classes, byte_nfa, self.token_names, self.keyword_kinds(),
+                                       self.skip_kinds(), instrument=self.instrument, memo=self.linear != "off")
+
+        if self.backend == "re":
+            return self.build_re()
+
+        rule_asts = self.lexer_asts()
+        dfa_states, accept_map, classes = self.construct_dfa(rule_asts)
+        byte_dfa = self.construct_dfa(self.byte_asts(rule_asts))
+        keywords, skip_kinds = self.keyword_kinds(), self.skip_kinds()
+        memo = self.memo_states(dfa_states, accept_map)
+        lookahead = (max_lookahead(dfa_states, accept_map), max_lookahead(*byte_dfa[:2]))
+        if self.backend == "flat":
+            return generate_flat_lexer(dfa_states, accept_map, classes, byte_dfa, self.token_names, keywords,
+                                       skip_kinds, memo, self.rows, lookahead, self.instrument)
+        if self.backend == "code":
+            return generate_code_lexer(dfa_states, accept_map, classes, byte_dfa, self.token_names, keywords,
+                                       skip_kinds, memo, lookahead, self.instrument)
+        if self.backend == "binary":
+            self.artifacts[table_file] = _pad8(pack_tables(dfa_states, accept_map, classes, self.token_names)) + \
+                pack_tables(*byte_dfa, self.token_names)
+            return generate_binary_lexer(table_file, self.token_names, keywords, skip_kinds,
+                                         self_loop_runs(dfa_states, classes), byte_dfa, memo, len(dfa_states),
+                                         len(classes) + 1, lookahead, self.instrument)
+        return generate_lexer(dfa_states, accept_map, classes, byte_dfa, self.token_names, keywords, skip_kinds, memo,
+                              self.rows, lookahead, self.instrument)
+
+    def build_re(self) -> str:
+        rule_asts = self.lexer_asts()
+        for name, node in rule_asts:
+            if ast_nullable(node):
+                raise ValueError(f"re backend refused: rule '{name}' matches the empty string")
+            if ast_ambiguous(node):
+                raise ValueError(f"re backend refused: rule '{name}' is ambiguous, so the re engine can backtrack "
+                                 f"exponentially on it; use a table / flat / binary / code backend")
+
+        dfa_states, accept_map, classes = self.build_dfa()
+        if backtrack_states(dfa_states, accept_map) and max_lookahead(dfa_states, accept_map) is None:
+            raise ValueError("re backend refused: these rules can backtrack arbitrarily far after a match, "
+                             "so rescanning is quadratic; use a table / flat / binary / code backend")
+        start = self.build_nfa(rule_asts)
+        nfa_classes = alphabet_classes(collect_states(start))
+        recheck = extension_rules(start, nfa_classes)
+        byte_asts = [(name, ast_utf8(node)) for name, node in rule_asts]
+
+        patterns = [ast_to_re(node) for _, node in rule_asts]
+        byte_patterns = [ast_to_re(node) for _, node in byte_asts]
+        bucket_ranges, buckets = re_buckets(rule_asts)
+        byte_bucket_ranges, byte_buckets = re_buckets(byte_asts)
+        check_re_conformance(rule_asts, patterns, buckets, bucket_ranges, recheck, dfa_states, accept_map, classes)
+        prefix = "|".join(f"(?:{ast_prefix_re(node)})" for _, node in rule_asts)
+        byte_prefix = "|".join(f"(?:{ast_prefix_re(node)})" for _, node in byte_asts)
+        byte_states, byte_accept, _ = self.construct_dfa(byte_asts)
+        lookahead = (max_lookahead(dfa_states, accept_map), max_lookahead(byte_states, byte_accept))
+        return generate_re_lexer(patterns, byte_patterns, prefix, byte_prefix, [name for name, _ in rule_asts],
+                                 buckets, bucket_ranges, byte_buckets, byte_bucket_ranges, recheck, self.token_names,
+                                 self.keyword_kinds(), self.skip_kinds(), lookahead, self.instrument)
+
+    def run(self, out_path):
+        """生成 lexer 并写到 out_path，附带文件（如 binary 后端的表文件）写在同一目录。"""
+        out_dir = os.path.dirname(os.path.abspath(out_path))
+        stem = os.path.splitext(os.path.basename(out_path))[0]
+        code = self.build(table_file=stem + ".tables")
+        os.makedirs(out_dir, exist_ok=True)
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(code)
+        for name, content in self.artifacts.items():
+            path = os.path.join(out_dir, name)
+            if isinstance(content, bytes):
+                with open(path, "wb") as f:
+                    f.write(content)
+            else:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(content)
 
 if __name__ == "__main__":
     # 用法：直接运行此文件生成 lexer.py
     # 请确保 rules.txt 文件存在
     try:
         builder = LexBuilder("rules.txt")
-        code = builder.build()
-        with open("generated_compiler/lexer.py", "w", encoding="utf-8") as f:
-            f.write(code)
+        builder.run("generated_compiler/lexer.py")
         print("✅ Successfully generated 'generated_compiler/lexer.py'")
     except Exception as e:
         print(f"❌ Build failed: {e}")
\ No newline at end of file
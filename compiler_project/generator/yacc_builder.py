@@ -2,15 +2,30 @@
 # -*- coding: utf-8 -*-
 import os
 import re
+import sys
 from collections import defaultdict
 
+# 作为脚本直接运行（python generator/yacc_builder.py ...）时 generator 包不在 sys.path 上，与 generator_main 一样补上项目根目录
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from generator.lex_builder import LexBuilder, TOKEN_NAMES_CHECK, shared_token_names, token_table_hash
+
 EPSILON = 'ε'
 
 class YaccBuilder:
-    def __init__(self, bnf_file):
+    def __init__(self, bnf_file, token_names=None, lex_rules=None):
+        """
+        token_names: 与 lexer.py 共用的 token 种类号表（下标即种类号，0 号为 '$'）；
+                     不传则与 LexBuilder 一样按 shared_token_names 编号：lex_rules（.lex 规则文件）中的规则名在前，
+                     其余终结符按名字排序在后
+        """
         if not os.path.exists(bnf_file):
             raise FileNotFoundError(f"BNF 文件不存在: {bnf_file}")
         self.bnf_file = bnf_file
+        self.token_names = list(token_names) if token_names is not None else None
+        self.lex_rules = lex_rules
         self.productions = []
         self.nonterminals = set()
         self.terminals = set()
@@ -20,6 +35,9 @@ class YaccBuilder:
         self.parse_table = dict()
 
     def parse_bnf(self):
+        self.productions = []
+        self.nonterminals = set()
+        self.terminals = set()
         with open(self.bnf_file, encoding="utf-8") as f:
             for line in f:
                 line = line.strip()
@@ -120,9 +138,23 @@ class YaccBuilder:
         else:
             self.parse_table[key] = (rhs, tag)
 
+    # token 种类号 ===
+    def resolve_token_names(self):
+        terminals = self.terminals - {'$'}
+        if self.token_names is None:
+            rule_names = LexBuilder(self.lex_rules).rule_names() if self.lex_rules else ()
+            return shared_token_names(rule_names, terminals)
+        if not self.token_names or self.token_names[0] != '$':
+            raise ValueError("token_names 的 0 号必须是 '$'")
+        missing = sorted(terminals - set(self.token_names))
+        if missing:
+            raise ValueError(f"以下终结符没有 token 种类号: {', '.join(missing)}")
+        return self.token_names
+
     def run(self, out_path):
         self.parse_bnf()
         self.build_parse_table()
+        token_names = self.resolve_token_names()
         
         code = [
             "nonterminals = " + str(list(self.nonterminals)),
@@ -134,34 +166,56 @@ class YaccBuilder:
             tag = v[1] if v[1] else ""
             code.append(f"    {k}: ({v[0]!r}, '{tag}'),")
         code.append("}")
+        code.append("")
+        code.append("# token 种类号 -> 名字（与 lexer.py / tokens.py 一致，名字只用于诊断）")
+        code.append("TOKEN_NAMES = " + repr(token_names))
+        code.append("TOKEN_TABLE_HASH = " + repr(token_table_hash(token_names)))
+        code.append(TOKEN_NAMES_CHECK)
         
         # 写入标准的 parse 函数
-        code.append("""
+        code.append("""EOF = 0
+
+# 符号编号：终结符即 token 种类号，非终结符排在其后；分析时栈里只有整数
+NTERMS = len(TOKEN_NAMES)
+KIND_OF = {name: k for k, name in enumerate(TOKEN_NAMES)}
+SYMBOL_NAMES = TOKEN_NAMES + nonterminals
+SYMBOL_ID = {name: k for k, name in enumerate(SYMBOL_NAMES)}
+START = SYMBOL_ID[start_symbol]
+
+# TABLE[(非终结符编号 - NTERMS) * NTERMS + 终结符编号] = 逆序的右部符号编号，None 表示无表项
+TABLE = [None] * (len(nonterminals) * NTERMS)
+for (_lhs, _term), (_rhs, _) in parse_table.items():
+    TABLE[(SYMBOL_ID[_lhs] - NTERMS) * NTERMS + SYMBOL_ID[_term]] = tuple(SYMBOL_ID[s] for s in reversed(_rhs))
+
+def _name(kind):
+    return TOKEN_NAMES[kind] if 0 <= kind < NTERMS else '?'
+
 def parse(token_list, verbose=True):
-    if not token_list or token_list[-1] != '$':
-        token_list = list(token_list) + ['$']
-    stack = ['$']
-    stack.append(start_symbol)
+    # token_list 为 token 种类号序列；也接受 token 名序列（先换成种类号）
+    if token_list and isinstance(token_list[0], str):
+        token_list = [KIND_OF.get(t, -1) for t in token_list]
+    if not token_list or token_list[-1] != EOF:
+        token_list = list(token_list) + [EOF]
+    stack = [EOF, START]
     ip = 0
     while stack:
         top = stack.pop()
         lookahead = token_list[ip]
-        if verbose: print(f'STACK TOP: {top}, LOOKAHEAD: {lookahead}')
+        if verbose: print(f'STACK TOP: {SYMBOL_NAMES[top]}, LOOKAHEAD: {_name(lookahead)}')
         
-        if top == '$': return True if lookahead == '$' else False
+        if top == EOF: return lookahead == EOF
         
-        if top not in nonterminals:
+        if top < NTERMS:
             if top == lookahead: ip += 1
             else: 
-                if verbose: print(f'Error: Expected {top}, got {lookahead}')
+                if verbose: print(f'Error: Expected {SYMBOL_NAMES[top]}, got {_name(lookahead)}')
                 return False
         else:
-            key = (top, lookahead)
-            if key not in parse_table:
-                if verbose: print(f'No table entry for {key}')
+            rhs = TABLE[(top - NTERMS) * NTERMS + lookahead] if 0 <= lookahead < NTERMS else None
+            if rhs is None:
+                if verbose: print(f'No table entry for {(SYMBOL_NAMES[top], _name(lookahead))}')
                 return False
-            rhs, _ = parse_table[key]
-            for sym in reversed(rhs): stack.append(sym)
+            stack.extend(rhs)
     return True
 """)
         os.makedirs(os.path.dirname(out_path), exist_ok=True)
@@ -169,6 +223,5 @@ def parse(token_list, verbose=True):
         print(f"✔ Parser 已更新: {out_path}")
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 3: print("Usage: python yacc_builder.py <bnf> <out>")
-    else: YaccBuilder(sys.argv[1]).run(sys.argv[2])
\ No newline at end of file
+    if len(sys.argv) < 3: print("Usage: python yacc_builder.py <bnf> <out> [lex_rules]")
+    else: YaccBuilder(sys.argv[1], lex_rules=sys.argv[3] if len(sys.argv) > 3 else None).run(sys.argv[2])
\ No newline at end of file
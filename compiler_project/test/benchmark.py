@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+benchmark.py - LexBuilder 构造路径与生成的 lexer 后端性能对比
+用法: python test/benchmark.py [--keywords 200 1000] [--scan-kb 256] [--repeat 3] [--rows full]
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+import importlib.util
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(TEST_DIR, ".."))
+sys.path.append(PROJECT_ROOT)
+
+from generator.lex_builder import LexBuilder
+
+CONFIGS = {
+    "SQL": os.path.join(PROJECT_ROOT, "config", "lex_rules_1.lex"),
+    "PL/0": os.path.join(PROJECT_ROOT, "config", "lex_rules_2.lex"),
+    "Mini-C": os.path.join(PROJECT_ROOT, "config", "lex_rules_3.lex"),
+}
+
+# 每种语言的扫描语料（重复拼接到指定大小）
+CORPORA = {
+    "SQL": os.path.join(TEST_DIR, "sql_test_code_right.txt"),
+    "PL/0": os.path.join(TEST_DIR, "PL0_test_code_right.txt"),
+    "Mini-C": os.path.join(TEST_DIR, "C_test_code_right.txt"),
+}
+
+BACKENDS = ["table", "flat", "binary", "code", "re", "lazy"]
+
+CONSTRUCTIONS = [
+    ("thompson+bitset", {"construction": "thompson", "state_sets": "bitset"}),
+    ("thompson+frozenset", {"construction": "thompson", "state_sets": "frozenset"}),
+    ("direct", {"construction": "direct"}),
+]
+
+# =========================================================
+# 合成规则集
+# =========================================================
+
+def synthetic_rules(n_keywords, seed=0):
+    """生成 n_keywords 个随机大写关键字 + 常见字面量/标识符规则，返回 .lex 文本。"""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < n_keywords:
+        length = rng.randint(2, 10)
+        words.add("".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(length)))
+
+    lines = ["WS [ \\t\\r\\n]+", "COMMENT --.*"]
+    for w in sorted(words):
+        lines.append(f"KW_{w} {w}")
+    lines += [
+        "NUMBER [0-9]+",
+        "STRING '[a-zA-Z0-9_ ]*'",
+        "IDENTIFIER [a-zA-Z_][a-zA-Z0-9_]*",
+        "SEMI ;",
+        "COMMA ,",
+    ]
+    return "\n".join(lines) + "\n"
+
+def write_temp_rules(text):
+    fd, path = tempfile.mkstemp(suffix=".lex")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+# =========================================================
+# 测量
+# =========================================================
+
+def measure_build(path, options, repeat, fold_keywords=False):
+    """返回 (最短构造时间秒, 峰值内存字节, DFA 状态数)。fold_keywords 为真时计入关键字折叠（见 fold_keyword_rules）。"""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        dfa_states, _, _ = LexBuilder(path, fold_keywords=fold_keywords, **options).build_dfa()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    LexBuilder(path, fold_keywords=fold_keywords, **options).build_dfa()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(dfa_states)
+
+def run_build_bench(cases, repeat):
+    # 每种构造路径分别测不折叠 / 折叠关键字两种设置，前者只含自动机构造本身
+    print(f"\n{'规则集':<16}| {'构造路径':<20}| {'折叠':<4}| {'时间(ms)':>10} | {'峰值内存(KB)':>12} | {'DFA 状态':>8}")
+    print("-" * 84)
+    for label, path in cases:
+        for name, options in CONSTRUCTIONS:
+            for fold in (False, True):
+                elapsed, peak, n_states = measure_build(path, options, repeat, fold)
+                print(f"{label:<16}| {name:<20}| {'是' if fold else '否':<4}| {elapsed * 1000:>10.1f} | "
+                      f"{peak / 1024:>12.1f} | {n_states:>8}")
+        print("-" * 84)
+
+def build_lexer(rules_path, backend, out_dir, rows="full"):
+    """用 LexBuilder.run 把 lexer 写到 out_dir 并 import，返回模块。"""
+    name = f"bench_lexer_{backend}"
+    out_path = os.path.join(out_dir, name + ".py")
+    LexBuilder(rules_path, backend=backend, rows=rows).run(out_path)
+    spec = importlib.util.spec_from_file_location(name, out_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def measure_cold_start(module, repeat):
+    """新进程里 import 生成的 lexer 并扫描一个字符所需时间（扣除解释器启动），取最短。"""
+    out_dir = os.path.dirname(module.__file__)
+    name = module.__name__
+    def run(code):
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=out_dir, check=True)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+    baseline = run("pass")
+    return max(0.0, run(f"import {name}; {name}.Lexer(' ').tokenize()") - baseline)
+
+def load_corpus(path, size_kb):
+    with open(path, encoding="utf-8") as f:
+        sample = f.read()
+    if not sample.endswith("\n"):
+        sample += "\n"
+    return sample * max(1, size_kb * 1024 // len(sample))
+
+def measure_scan(module, text, repeat, method="tokenize"):
+    """返回 (最短扫描时间秒, token 数)。method 为 "tokenize" 或 "tokenize_spans"。"""
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        tokens = getattr(module.Lexer(text), method)()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(tokens)
+
+def run_scan_bench(size_kb, repeat, rows="full"):
+    print(f"\n{'语言':<10}| {'后端':<10}| {'冷启动(ms)':>10} | {'时间(ms)':>10} | {'tokens/s':>12} | {'MB/s':>8} | {'spans(ms)':>10}")
+    print("-" * 88)
+    with tempfile.TemporaryDirectory() as out_dir:
+        for lang, path in CONFIGS.items():
+            text = load_corpus(CORPORA[lang], size_kb)
+            for backend in BACKENDS:
+                module = build_lexer(path, backend, out_dir, rows)
+                cold = measure_cold_start(module, repeat)
+                elapsed, n_tokens = measure_scan(module, text, repeat)
+                spans_elapsed, _ = measure_scan(module, text, repeat, "tokenize_spans")
+                print(f"{lang:<10}| {backend:<10}| {cold * 1000:>10.1f} | {elapsed * 1000:>10.1f} | "
+                      f"{n_tokens / elapsed:>12.0f} | {len(text) / elapsed / 1e6:>8.2f} | {spans_elapsed * 1000:>10.1f}")
+            print("-" * 88)
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="LexBuilder 性能基准")
+    cli.add_argument("--keywords", type=int, nargs="*", default=[200, 1000],
+                     help="合成规则集的关键字数量")
+    cli.add_argument("--scan-kb", type=int, default=256, help="扫描语料大小（KB），0 表示跳过扫描测试")
+    cli.add_argument("--repeat", type=int, default=3, help="每项重复次数（取最短时间）")
+    cli.add_argument("--rows", choices=LexBuilder.ROWS, default="full",
+                     help="扫描测试中 table / flat 后端转移表的编码（见 LexBuilder 的 rows 参数）")
+    args = cli.parse_args()
+
+    cases = list(CONFIGS.items())
+    temp_files = []
+    for n in args.keywords:
+        path = write_temp_rules(synthetic_rules(n))
+        temp_files.append(path)
+        cases.append((f"synthetic-{n}", path))
+
+    try:
+        run_build_bench(cases, args.repeat)
+        if args.scan_kb > 0:
+            run_scan_bench(args.scan_kb, args.repeat, args.rows)
+    finally:
+        for path in temp_files:
+            os.remove(path)
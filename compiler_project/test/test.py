@@ -15,6 +15,7 @@ sys.path.append(PROJECT_ROOT)
 try:
     from generated_compiler.lexer import Lexer, Token
     from generated_compiler.parser import parse
+    from generated_compiler import tokens as TOKENS
 except ImportError as e:
     print("❌ 无法导入 generated_compiler。请先运行 generator_main.py")
     sys.exit(1)
@@ -159,10 +160,10 @@ def run_suite(mode, pattern, extractor, summarizer, default_code):
             # 2. Parse
             print("\n   [2. 语法分析]")
             print("   " + "."*40)
-            token_types = [t.type for t in tokens]
+            token_types = [t.kind for t in tokens]
             # SQL 不需要结束符，PL/0 和 C 可能需要 EOF 标记，这里视文法而定
-            # 为了通用性，如果 generator 支持，通常加 $
-            if mode != 'SQL': token_types.append('$') 
+            # 为了通用性，如果 generator 支持，通常加 $（种类号 EOF）
+            if mode != 'SQL': token_types.append(TOKENS.EOF) 
 
             success = parse(token_types, verbose=True)
             print("   " + "."*40)
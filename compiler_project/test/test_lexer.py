@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+test_lexer.py - 生成的 lexer 的差分测试：三种语言 × 全部后端，
+str / bytes / stream / tokenize_spans / relex 都与 table 后端的 tokenize() 比较，
+另外比较 parallel_spans 与串行扫描、profile 的计数与 tokenize_spans；
+非默认的生成选项（rows / construction / state_sets / fold_keywords / linear）× 后端同样与 table 后端比较，
+并检查 re 后端拒绝生成的规则集。生成的 lexer 写在临时目录里，测试结束后删除。
+用法: python test/test_lexer.py [--cases 200] [--seed 0]（也可以用 pytest 运行）
+"""
+
+import sys
+import os
+import random
+import shutil
+import argparse
+import tempfile
+import importlib
+from collections import Counter
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(TEST_DIR, ".."))
+sys.path.append(PROJECT_ROOT)
+sys.path.append(TEST_DIR)
+
+from generator.lex_builder import LexBuilder
+from benchmark import CONFIGS, BACKENDS
+
+SAMPLES = {
+    "SQL": ["sql_test_code_right.txt", "sql_test_code_false.txt"],
+    "PL/0": ["PL0_test_code_right.txt", "PL0_test_code_false.txt"],
+    "Mini-C": ["C_test_code_right.txt", "C_test_code_false.txt"],
+}
+
+DFA_BACKENDS = [backend for backend in BACKENDS if backend != "lazy"]   # 生成时确定化的后端
+
+# 非默认的生成选项及其适用的后端：各组合的输出都须与默认选项的 table 后端相同（见 check_options）
+OPTION_VARIANTS = [
+    ({"rows": "compact"}, ["table", "flat"]),
+    ({"rows": "compact", "fold_keywords": False}, ["table", "flat"]),
+    ({"construction": "direct"}, DFA_BACKENDS),
+    ({"state_sets": "frozenset"}, DFA_BACKENDS),
+    ({"fold_keywords": False}, BACKENDS),
+    ({"linear": "strict"}, BACKENDS),
+    ({"linear": "off"}, BACKENDS),
+]
+
+# re 后端拒绝的规则集（ambiguous: 有歧义，re 回溯是指数级的；unbounded: 回退距离没有上界）和对应的病态输入
+RE_REFUSED = {
+    "ambiguous": ("A (a|a)+\nB (a|a)+b\nWS [ ]+\n", "a" * 40 + " ab"),
+    "unbounded": ("SLASH /\nCOMMENT /\\*[^*]*\\*/\nWS [ ]+\n", "/* /* / /*/ " * 10 + "/*" + " " * 40),
+}
+
+_OUT_DIR = None
+_MODULES = {}
+
+# =========================================================
+# 通用工具
+# =========================================================
+
+def out_dir():
+    """
+    生成的 lexer 的临时目录，第一次用到时创建并加入 sys.path（parallel_spans 的 worker 进程按模块名 import）。
+    pytest 在本模块的测试结束后调用 teardown_module 删除它，直接运行时 main() 结束前删除。
+    """
+    global _OUT_DIR
+    if _OUT_DIR is None:
+        _OUT_DIR = tempfile.mkdtemp(prefix="test_lexer_")
+        sys.path.insert(0, _OUT_DIR)
+    return _OUT_DIR
+
+def teardown_module():
+    global _OUT_DIR
+    if _OUT_DIR is None:
+        return
+    sys.path.remove(_OUT_DIR)
+    for name in [name for name, module in sys.modules.items()
+                 if (getattr(module, "__file__", None) or "").startswith(_OUT_DIR)]:
+        del sys.modules[name]
+    _MODULES.clear()
+    shutil.rmtree(_OUT_DIR, ignore_errors=True)
+    _OUT_DIR = None
+
+def lexer_module(lang, backend, instrument=False, **options):
+    """生成并 import 一个 lexer 模块（同一组参数只生成一次）；options 为其余的 LexBuilder 选项。"""
+    key = (lang, backend, instrument, tuple(sorted(options.items())))
+    if key not in _MODULES:
+        name = f"lexer_{len(_MODULES)}"
+        LexBuilder(CONFIGS[lang], backend=backend, instrument=instrument, **options).run(
+            os.path.join(out_dir(), name + ".py"))
+        _MODULES[key] = importlib.import_module(name)
+    return _MODULES[key]
+
+def rules_module(name, rules, **options):
+    """由规则文本生成并 import 一个 lexer 模块（规则写到输出目录的 .lex 文件里）。"""
+    path = os.path.join(out_dir(), name + ".lex")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(rules)
+    LexBuilder(path, **options).run(os.path.join(out_dir(), name + ".py"))
+    return importlib.import_module(name)
+
+def sample_texts(lang, cases, seed):
+    """测试文件本身，加上由其中的词、空白和个别非 ASCII 字符随机拼成的文本（不少会在 token 中间截断或出错）。"""
+    rng = random.Random(seed)
+    texts = []
+    for fname in SAMPLES[lang]:
+        with open(os.path.join(TEST_DIR, fname), encoding="utf-8") as f:
+            texts.append(f.read())
+    corpus = "\n".join(texts)
+    words = corpus.split() + ["--é注释\n", "// é注释\n", "'é'", "\"中文\""]
+    for _ in range(cases):
+        if rng.random() < 0.3:
+            start = rng.randrange(len(corpus))
+            texts.append(corpus[start:start + rng.randint(1, 120)])
+        else:
+            parts = [rng.choice(words) + rng.choice(["", " ", " ", "\n", "\t"]) for _ in range(rng.randint(0, 40))]
+            texts.append("".join(parts))
+    return texts
+
+def token_list(tokens):
+    return [(t.type, t.value, t.line, t.col) for t in tokens]
+
+def outcome(scan):
+    """扫描结果；词法错误时为 ('ERR', 消息)，让出错的输入也能比较。"""
+    try:
+        return scan()
+    except SyntaxError as e:
+        return ("ERR", str(e))
+
+def spans_tuple(spans):
+    return list(spans.kinds), list(spans.starts), list(spans.ends)
+
+def chunked(text, rng):
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, 16)
+        yield text[i:i + size]
+        i += size
+
+# =========================================================
+# 检查项
+# =========================================================
+
+def check_backends(cases=200, seed=0):
+    """每个后端的 tokenize / bytes / stream / tokenize_spans 都与 table 后端的 tokenize() 一致。"""
+    for lang in CONFIGS:
+        reference = lexer_module(lang, "table")
+        texts = sample_texts(lang, cases, seed)
+        for backend in BACKENDS:
+            module = lexer_module(lang, backend)
+            rng = random.Random(seed)
+            for text in texts:
+                expected = outcome(lambda: token_list(reference.Lexer(text).tokenize()))
+                data = text.encode("utf-8")
+                results = {
+                    "tokenize": outcome(lambda: token_list(module.Lexer(text).tokenize())),
+                    "bytes": outcome(lambda: token_list(module.Lexer(data).tokenize())),
+                    "stream": outcome(lambda: token_list(module.Lexer.stream(chunked(text, rng)))),
+                    "stream bytes": outcome(lambda: token_list(module.Lexer.stream(chunked(data, rng)))),
+                    "spans": outcome(lambda: token_list(module.Lexer(text).tokenize_spans())),
+                    "spans bytes": outcome(lambda: token_list(module.Lexer(data).tokenize_spans())),
+                }
+                for method, got in results.items():
+                    assert got == expected, f"{lang} {backend} {method} differs on {text!r}:\n{got}\n{expected}"
+
+def check_options(cases=50, seed=0):
+    """
+    OPTION_VARIANTS 中的每组选项 × 适用的后端：tokenize / bytes / tokenize_spans 与默认选项的 table 后端一致。
+    linear="strict" 时 re 后端遇到需要回退的规则集（见 LexBuilder.memo_states）须拒绝生成，其余情况须能生成。
+    """
+    for lang in CONFIGS:
+        reference = lexer_module(lang, "table")
+        texts = sample_texts(lang, cases, seed)
+        for options, backends in OPTION_VARIANTS:
+            builder = LexBuilder(CONFIGS[lang], **options)
+            backtracks = bool(builder.memo_states(*builder.build_dfa()[:2]))
+            for backend in backends:
+                label = f"{lang} {backend} {options}"
+                if backend == "re" and options.get("linear") == "strict" and backtracks:
+                    try:
+                        lexer_module(lang, backend, **options)
+                    except ValueError:
+                        continue
+                    raise AssertionError(f"{label}: re backend should refuse rules that need backtracking")
+                module = lexer_module(lang, backend, **options)
+                for text in texts:
+                    expected = outcome(lambda: token_list(reference.Lexer(text).tokenize()))
+                    data = text.encode("utf-8")
+                    results = {
+                        "tokenize": outcome(lambda: token_list(module.Lexer(text).tokenize())),
+                        "bytes": outcome(lambda: token_list(module.Lexer(data).tokenize())),
+                        "spans": outcome(lambda: token_list(module.Lexer(text).tokenize_spans())),
+                        "spans bytes": outcome(lambda: token_list(module.Lexer(data).tokenize_spans())),
+                    }
+                    for method, got in results.items():
+                        assert got == expected, f"{label} {method} differs on {text!r}:\n{got}\n{expected}"
+
+def check_re_refused():
+    """re 后端拒绝 RE_REFUSED 中的规则集；其余后端照常生成，在病态输入上与 table 后端一致。"""
+    for label, (rules, text) in RE_REFUSED.items():
+        try:
+            rules_module(f"refused_{label}_re", rules, backend="re")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"re backend should refuse the {label} rules")
+        reference = rules_module(f"refused_{label}_table", rules, backend="table")
+        for backend in BACKENDS:
+            if backend in ("re", "table"):
+                continue
+            module = rules_module(f"refused_{label}_{backend}", rules, backend=backend)
+            for data in (text, text.encode("utf-8")):
+                expected = outcome(lambda: token_list(reference.Lexer(data).tokenize()))
+                got = outcome(lambda: token_list(module.Lexer(data).tokenize()))
+                assert got == expected, f"{backend} differs from table on the {label} rules: {got}\n{expected}"
+
+def check_relex(cases=200, seed=0):
+    """relex 的结果与对编辑后的文本整体 tokenize_spans 相同（str 与 bytes 输入）。"""
+    for lang in CONFIGS:
+        texts = sample_texts(lang, cases, seed)
+        for backend in BACKENDS:
+            module = lexer_module(lang, backend)
+            rng = random.Random(seed)
+            for text in texts:
+                insert = rng.choice(texts)[:rng.randint(0, 12)]
+                offset = rng.randint(0, len(text))
+                deleted = rng.randint(0, min(12, len(text) - offset))
+                for old, new in ((text, insert), (text.encode("utf-8"), insert.encode("utf-8"))):
+                    if isinstance(old, bytes):
+                        # 编辑位置落在字符边界上
+                        offset_b = len(text[:offset].encode("utf-8"))
+                        deleted_b = len(text[offset:offset + deleted].encode("utf-8"))
+                        edit = (offset_b, deleted_b)
+                    else:
+                        edit = (offset, deleted)
+                    try:
+                        spans = module.Lexer(old).tokenize_spans()
+                    except SyntaxError:
+                        continue
+                    edited = old[:edit[0]] + new + old[edit[0] + edit[1]:]
+                    expected = outcome(lambda: spans_tuple(module.Lexer(edited).tokenize_spans()))
+                    got = outcome(lambda: spans_tuple(module.Lexer.relex(spans, edit[0], edit[1], new)[0]))
+                    assert got == expected, f"{lang} {backend} relex differs on {old!r} edit {edit} -> {new!r}"
+
+def check_relex_unaligned(n=2000):
+    """
+    编辑让之后的 token 边界全部错开（PAIR aa / A a 在 "a" * n 前插入 "a"），relex 一直追不上旧边界：
+    结果仍与整体重扫相同，且只进入扫描方法一次（逐个旧 token 重新进入时每次都要准备整个缓冲区，是平方级的）。
+    """
+    rules = "PAIR aa\nA a\nWS [ ]+\n"
+    for backend in BACKENDS:
+        module = rules_module(f"unaligned_{backend}", rules, backend=backend)
+        for text, inserted in (("a" * n, "a"), (b"a" * n, b"a")):
+            spans = module.Lexer(text).tokenize_spans()
+            scan = "_spans" if isinstance(text, str) else "_spans_bytes"
+            original, calls = getattr(module.Lexer, scan), []
+
+            def counted(self, *args):
+                calls.append(args)
+                return original(self, *args)
+            setattr(module.Lexer, scan, counted)
+            try:
+                got = spans_tuple(module.Lexer.relex(spans, 0, 0, inserted)[0])
+            finally:
+                setattr(module.Lexer, scan, original)
+            assert got == spans_tuple(module.Lexer(inserted + text).tokenize_spans()), f"{backend} unaligned relex differs"
+            assert len(calls) == 1, f"{backend} unaligned relex entered {scan} {len(calls)} times"
+
+def check_parallel(seed=0):
+    """parallel_spans 把文件切成多块并行扫描，结果与 from_path(path).tokenize_spans() 相同。"""
+    rng = random.Random(seed)
+    for lang in CONFIGS:
+        reference = lexer_module(lang, "table")
+        # 拼接能正确扫描的文本，让各块都有实际的 token 可比
+        texts = [t for t in sample_texts(lang, 200, seed)
+                 if not isinstance(outcome(reference.Lexer(t).tokenize), tuple)]
+        text = "\n".join(texts * 5)
+        path = os.path.join(out_dir(), f"parallel_{list(CONFIGS).index(lang)}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        for backend in BACKENDS:
+            module = lexer_module(lang, backend)
+            expected = outcome(lambda: spans_tuple(module.Lexer.from_path(path).tokenize_spans()))
+            got = outcome(lambda: spans_tuple(module.Lexer.parallel_spans(path, workers=rng.randint(2, 4),
+                                                                          min_chunk=rng.randint(16, 256))))
+            assert got == expected, f"{lang} {backend} parallel_spans differs from the serial scan"
+
+def check_profile(cases=50, seed=0):
+    """profile 的 token 个数与 tokenize_spans 一致（跳过的 token 除外），各种类的总长度之和等于输入长度。"""
+    for lang in CONFIGS:
+        for backend in BACKENDS:
+            module = lexer_module(lang, backend, instrument=True)
+            for text in sample_texts(lang, cases, seed):
+                for data in (text, text.encode("utf-8")):
+                    try:
+                        spans = module.Lexer(data).tokenize_spans()
+                    except SyntaxError:
+                        continue
+                    stats = module.Lexer(data).profile()
+                    counts = {kind: n for kind, n in stats.counts.items() if kind not in module.SKIP_KINDS}
+                    assert counts == dict(Counter(spans.kinds)), f"{lang} {backend} profile counts differ on {data!r}"
+                    assert sum(stats.lengths.values()) == len(data), f"{lang} {backend} profile lengths on {data!r}"
+
+def check_caseless():
+    """%caseless 关键字只按 ASCII 字母忽略大小写：'\u212aey'（KELVIN SIGN）在各后端、str / bytes、折叠与否下都不是关键字。"""
+    rules = "KW key\n%caseless KW\nID [^ \\n]+\nWS [ \\n]+\n"
+    text = "\u212aey KEY kEy \u212aEY"
+    expected = ["ID", "KW", "KW", "ID"]
+    for backend in BACKENDS:
+        for fold in (True, False):
+            module = rules_module(f"caseless_{backend}_{fold}", rules, backend=backend, fold_keywords=fold)
+            for data in (text, text.encode("utf-8")):
+                got = [t.type for t in module.Lexer(data).tokenize()]
+                assert got == expected, f"{backend} fold_keywords={fold} caseless keywords on {data!r}: {got}"
+
+# pytest 入口
+def test_backends():
+    check_backends()
+
+def test_options():
+    check_options()
+
+def test_re_refused():
+    check_re_refused()
+
+def test_relex():
+    check_relex()
+
+def test_relex_unaligned():
+    check_relex_unaligned()
+
+def test_parallel():
+    check_parallel()
+
+def test_profile():
+    check_profile()
+
+def test_caseless():
+    check_caseless()
+
+def main():
+    parser = argparse.ArgumentParser(description="生成的 lexer 差分测试")
+    parser.add_argument("--cases", type=int, default=200, help="每种语言随机生成的文本数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    checks = [
+        ("后端 × str / bytes / stream / spans", lambda: check_backends(args.cases, args.seed)),
+        ("生成选项 × 后端", lambda: check_options(args.cases // 4, args.seed)),
+        ("re 后端拒绝的规则", check_re_refused),
+        ("relex", lambda: check_relex(args.cases, args.seed)),
+        ("relex 边界错开", check_relex_unaligned),
+        ("parallel_spans", lambda: check_parallel(args.seed)),
+        ("profile", lambda: check_profile(args.cases // 4, args.seed)),
+        ("%caseless 非 ASCII", check_caseless),
+    ]
+    failed = 0
+    try:
+        for label, check in checks:
+            try:
+                check()
+                print(f"✅ {label}")
+            except AssertionError as e:
+                failed += 1
+                print(f"❌ {label}: {e}")
+    finally:
+        teardown_module()
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()